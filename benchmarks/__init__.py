@@ -0,0 +1,7 @@
+"""
+Micro-benchmarks for the EV Charge Control Panel's hot paths.
+
+Usage:
+    python -m benchmarks             # compare against benchmarks/baseline.json
+    python -m benchmarks --update    # record a new baseline
+"""
@@ -0,0 +1,125 @@
+"""
+Benchmarks of the domain, scheduler and visualization hot paths.
+"""
+
+from datetime import datetime, time, timedelta
+from itertools import cycle
+
+from benchmarks.runner import Benchmark
+from src.domain.models import BatteryState, ChargeSchedule, ChargerState, DemoAdminState
+
+START_TIME = datetime(2025, 1, 1, 12, 0)
+SCHEDULE = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+CHARGER_STATE = ChargerState(car_is_charging=False, charge_is_override=False)
+BATTERY_STATE = BatteryState(current_soc=0.2, target_soc=0.8)
+
+# Forecast lengths from the chart's default up to a long horizon
+FORECAST_PERIODS = (9, 100, 1000, 10_000)
+# A 10,000 period chart takes seconds to build, which would dominate the suite
+PLOT_PERIODS = (9, 100, 1000)
+
+# A day of half-hourly times, so both sides of the schedule are measured
+DAY = [START_TIME + timedelta(minutes=30 * i) for i in range(48)]
+
+
+def _update_charger_state():
+    from src.domain.charging import update_charger_state
+
+    demo_states = cycle(
+        DemoAdminState(car_is_plugged_in=True, current_time=current_time)
+        for current_time in DAY
+    )
+    return lambda: update_charger_state(CHARGER_STATE, next(demo_states), SCHEDULE)
+
+
+def _is_in_scheduled_window():
+    from src.domain.charging import is_in_scheduled_window
+
+    times = cycle(DAY)
+    return lambda: is_in_scheduled_window(next(times), SCHEDULE)
+
+
+def _project_battery_state():
+    from src.domain.battery import project_battery_state
+
+    charging = ChargerState(car_is_charging=True, charge_is_override=False)
+    return lambda: project_battery_state(BATTERY_STATE, charging, 0.5)
+
+
+def _use_session_state() -> DemoAdminState:
+    """Put a plugged-in car in the session state and return its demo state."""
+    import streamlit as st
+    from streamlit.logger import set_log_level
+
+    from src.services import state_manager
+    from src.services.state_backends import SessionStateBackend
+
+    # Session state works outside a Streamlit run, but warns on every access
+    set_log_level("error")
+
+    demo_state = DemoAdminState(car_is_plugged_in=True, current_time=START_TIME)
+    st.session_state.battery_state = BATTERY_STATE
+    st.session_state.charger_state = CHARGER_STATE
+    st.session_state.charge_schedule = SCHEDULE
+    st.session_state.demo_state = demo_state
+    state_manager.set_state_backend(SessionStateBackend())
+    return demo_state
+
+
+def _uncached_future_states(demo_state: DemoAdminState, num_periods: int):
+    """Project future states without reusing an earlier forecast."""
+    from src.services.forecast_cache import forecast_cache
+    from src.services.scheduler import get_future_states
+
+    forecast_cache.clear()
+    return get_future_states(demo_state, num_periods)
+
+
+def _get_future_states(num_periods: int):
+    def setup():
+        demo_state = _use_session_state()
+        return lambda: _uncached_future_states(demo_state, num_periods)
+
+    return setup
+
+
+def _convert_states_to_dataframe(num_periods: int):
+    def setup():
+        from src.ui.visualization import _convert_states_to_dataframe
+
+        states = _uncached_future_states(_use_session_state(), num_periods)
+        return lambda: _convert_states_to_dataframe(states)
+
+    return setup
+
+
+def _plot_charge_forecast(num_periods: int):
+    def setup():
+        from src.ui.visualization import plot_charge_forecast
+
+        states = _uncached_future_states(_use_session_state(), num_periods)
+        return lambda: plot_charge_forecast(states, START_TIME)
+
+    return setup
+
+
+BENCHMARKS = [
+    Benchmark("domain.update_charger_state", _update_charger_state),
+    Benchmark("domain.is_in_scheduled_window", _is_in_scheduled_window),
+    Benchmark("domain.project_battery_state", _project_battery_state),
+    *(
+        Benchmark(f"scheduler.get_future_states[{n}]", _get_future_states(n))
+        for n in FORECAST_PERIODS
+    ),
+    *(
+        Benchmark(
+            f"visualization.convert_states_to_dataframe[{n}]",
+            _convert_states_to_dataframe(n),
+        )
+        for n in FORECAST_PERIODS
+    ),
+    *(
+        Benchmark(f"visualization.plot_charge_forecast[{n}]", _plot_charge_forecast(n))
+        for n in PLOT_PERIODS
+    ),
+]
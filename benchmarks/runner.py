@@ -0,0 +1,350 @@
+"""
+Benchmark runner for the EV Charge Control Panel.
+Measures speed and memory of each benchmark and compares them with a stored baseline.
+
+Each benchmark is timed alongside a fixed calibration workload, and speed is
+compared relative to it, so a baseline recorded on one machine still holds on
+a faster or slower one.
+"""
+
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import statistics
+import sys
+import tracemalloc
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Callable, Optional, Sequence
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+MIN_ROUND_SECONDS = 0.05  # Each timed round calls a benchmark for at least this long
+ROUNDS = 7  # Timed rounds per benchmark, each paired with a calibration round
+# Drop in relative speed that counts as a regression; it varies by up to a
+# third between runs on shared machines
+MAX_SLOWDOWN = 0.4
+MAX_MEMORY_GROWTH = 0.25  # Growth in peak memory or allocations that counts as one
+MEMORY_SLACK_KIB = 16.0  # Peak memory growth always allowed, for tiny benchmarks
+ALLOCATION_SLACK = 16  # Allocations always allowed, for tiny benchmarks
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """
+    A function to measure.
+
+    Attributes:
+        name: Name of the benchmark, unique within the suite
+        setup: Builds the inputs once and returns the call to measure
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], object]]
+
+
+@dataclass(frozen=True)
+class Measurement:
+    """
+    Speed and memory of one benchmark.
+
+    Attributes:
+        ops_per_sec: Calls per second in the fastest round
+        allocations: Memory blocks a call leaves allocated, its result included
+        peak_kib: Peak memory a call uses on top of what was already allocated
+        relative_speed: Calls in the time of one calibration call, which
+            carries across machines
+    """
+
+    ops_per_sec: float
+    allocations: int
+    peak_kib: float
+    relative_speed: float
+
+
+def _calibration() -> object:
+    """A fixed mix of the object, dict and sorting work the hot paths do."""
+    counts = {f"vehicle-{i}": i % 7 for i in range(200)}
+    return sorted(counts.items(), key=lambda item: item[1])
+
+
+def _time_calls(call: Callable[[], object], number: int) -> float:
+    """Time a number of calls in seconds."""
+    start = perf_counter()
+    for _ in range(number):
+        call()
+    return perf_counter() - start
+
+
+def _measure_memory(call: Callable[[], object]) -> tuple[int, float]:
+    """Count the blocks one call leaves allocated and its peak memory."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        result = call()  # noqa: F841 - kept alive so it is counted
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    # Leave out the snapshots' own bookkeeping
+    own = tracemalloc.Filter(False, tracemalloc.__file__)
+    changes = after.filter_traces([own]).compare_to(
+        before.filter_traces([own]), "traceback"
+    )
+    allocations = sum(max(change.count_diff, 0) for change in changes)
+    return allocations, (peak_bytes - start_bytes) / 1024
+
+
+def _calls_per_round(call: Callable[[], object], min_round_seconds: float) -> int:
+    """Double the number of calls until they last min_round_seconds."""
+    number = 1
+    while _time_calls(call, number) < min_round_seconds:
+        number *= 2
+    return number
+
+
+def measure(
+    benchmark: Benchmark,
+    min_round_seconds: float = MIN_ROUND_SECONDS,
+    rounds: int = ROUNDS,
+) -> Measurement:
+    """
+    Measure a benchmark's speed and memory.
+
+    Calls per round are doubled until a round lasts min_round_seconds, and
+    the fastest of the rounds is kept, as slower ones only add noise. Each
+    round is paired with a round of the calibration, timed under the same
+    load, and the median of the pairs gives the relative speed.
+
+    Args:
+        benchmark: Benchmark to measure
+        min_round_seconds: Shortest time a timed round may take
+        rounds: Number of timed rounds
+
+    Returns:
+        Measurement: Speed and memory of the benchmark
+    """
+    call = benchmark.setup()
+    # Warm up caches and lazy imports before anything is measured
+    call()
+
+    number = _calls_per_round(call, min_round_seconds)
+    calibration_number = _calls_per_round(_calibration, min_round_seconds)
+    seconds_per_call = []
+    relative_speeds = []
+    for _ in range(rounds):
+        calibration_seconds = (
+            _time_calls(_calibration, calibration_number) / calibration_number
+        )
+        seconds_per_call.append(_time_calls(call, number) / number)
+        relative_speeds.append(calibration_seconds / seconds_per_call[-1])
+    best = min(seconds_per_call)
+
+    allocations, peak_kib = _measure_memory(call)
+    return Measurement(
+        ops_per_sec=1 / best if best > 0 else float("inf"),
+        allocations=allocations,
+        peak_kib=peak_kib,
+        relative_speed=statistics.median(relative_speeds),
+    )
+
+
+def find_regressions(
+    results: dict[str, Measurement],
+    baseline: dict[str, Measurement],
+    max_slowdown: float = MAX_SLOWDOWN,
+    max_memory_growth: float = MAX_MEMORY_GROWTH,
+    check_memory: bool = False,
+) -> list[str]:
+    """
+    Compare measurements with a baseline.
+
+    Speed is compared relative to the calibration, so it does not depend on
+    the machine. Allocations and peak memory change with the Python and
+    library versions, so they are only compared when asked for. Benchmarks
+    missing from the baseline are new, not regressions.
+
+    Args:
+        results: Measurement of each benchmark
+        baseline: Baseline measurement of each benchmark
+        max_slowdown: Fraction of relative speed that may be lost
+        max_memory_growth: Fraction by which memory and allocations may grow
+        check_memory: Whether to compare allocations and peak memory
+
+    Returns:
+        list[str]: Description of each regression
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+
+        if result.relative_speed < expected.relative_speed * (1 - max_slowdown):
+            regressions.append(
+                f"{name}: {result.relative_speed:,.4g} calls per calibration call, "
+                f"baseline {expected.relative_speed:,.4g}"
+            )
+        if not check_memory:
+            continue
+        if result.peak_kib > (
+            expected.peak_kib * (1 + max_memory_growth) + MEMORY_SLACK_KIB
+        ):
+            regressions.append(
+                f"{name}: peak {result.peak_kib:,.1f} KiB, "
+                f"baseline {expected.peak_kib:,.1f} KiB"
+            )
+        if result.allocations > (
+            expected.allocations * (1 + max_memory_growth) + ALLOCATION_SLACK
+        ):
+            regressions.append(
+                f"{name}: {result.allocations:,} allocations, "
+                f"baseline {expected.allocations:,}"
+            )
+    return regressions
+
+
+def load_baseline(path: str) -> dict[str, Measurement]:
+    """
+    Read a baseline, or an empty one if there is none.
+
+    Args:
+        path: JSON file of measurements by benchmark name
+
+    Returns:
+        dict[str, Measurement]: Baseline measurement of each benchmark
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return {name: Measurement(**values) for name, values in json.load(file).items()}
+
+
+def save_baseline(path: str, results: dict[str, Measurement]) -> None:
+    """
+    Write measurements as the new baseline, merged into the current one.
+
+    Args:
+        path: JSON file of measurements by benchmark name
+        results: Measurement of each benchmark run
+    """
+    baseline = {**load_baseline(path), **results}
+    with open(path, "w") as file:
+        json.dump(
+            {name: asdict(baseline[name]) for name in sorted(baseline)},
+            file,
+            indent=2,
+        )
+        file.write("\n")
+
+
+def _format_row(name: str, result: Measurement, expected: Optional[Measurement]) -> str:
+    """Format one line of the report."""
+    change = (
+        f"{result.relative_speed / expected.relative_speed - 1:+7.1%}"
+        if expected
+        else "    new"
+    )
+    return (
+        f"{name:<48} {result.ops_per_sec:>14,.1f} {change} "
+        f"{result.allocations:>12,} {result.peak_kib:>12,.1f}"
+    )
+
+
+def matches(name: str, pattern: str) -> bool:
+    """
+    Check whether a benchmark is selected by a command line pattern.
+
+    Names contain brackets, e.g. "scheduler.get_future_states[9]", which a
+    glob reads as a character class, so a pattern is first taken literally.
+
+    Args:
+        name: Benchmark name
+        pattern: Part of a name, or a glob
+
+    Returns:
+        bool: Whether the pattern selects the benchmark
+    """
+    return pattern in name or fnmatch.fnmatchcase(name, pattern)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+
+    Args:
+        argv: Arguments (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the hot paths and compare them with a baseline.",
+    )
+    parser.add_argument(
+        "patterns",
+        nargs="*",
+        help="only run benchmarks containing these names or matching these globs",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument(
+        "--update", action="store_true", help="record the results as the baseline"
+    )
+    parser.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN)
+    parser.add_argument("--max-memory-growth", type=float, default=MAX_MEMORY_GROWTH)
+    parser.add_argument(
+        "--check-memory",
+        action="store_true",
+        help="also fail on growth in allocations or peak memory",
+    )
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--min-round-seconds", type=float, default=MIN_ROUND_SECONDS)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the benchmarks and exit with an error on any regression."""
+    # Deferred so the runner can be imported without the app's dependencies
+    from benchmarks.cases import BENCHMARKS
+
+    args = parse_args(argv)
+    benchmarks = [
+        benchmark
+        for benchmark in BENCHMARKS
+        if not args.patterns
+        or any(matches(benchmark.name, pattern) for pattern in args.patterns)
+    ]
+    baseline = load_baseline(args.baseline)
+
+    print(
+        f"{'benchmark':<48} {'ops/sec':>14} {'change':>7} {'allocations':>12} "
+        f"{'peak KiB':>12}"
+    )
+    results = {}
+    for benchmark in benchmarks:
+        result = measure(benchmark, args.min_round_seconds, args.rounds)
+        results[benchmark.name] = result
+        print(_format_row(benchmark.name, result, baseline.get(benchmark.name)))
+
+    if args.update:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = find_regressions(
+        results,
+        baseline,
+        args.max_slowdown,
+        args.max_memory_growth,
+        args.check_memory,
+    )
+    if regressions:
+        print("\nRegressions:", *regressions, sep="\n  ", file=sys.stderr)
+        sys.exit(1)
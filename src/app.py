@@ -18,12 +18,16 @@ def main():
         layout=UI_LAYOUT,
     )
 
-    # Initialize session state
+    # Pick up changes made by other sessions, then initialize session state
+    state_manager.refresh_state()
     state_manager.init_session_state()
 
     # Display the main panel
     main_panel()
 
+    # Persist this run's changes in one batch
+    state_manager.flush_state()
+
 
 if __name__ == "__main__":
     main()
@@ -2,6 +2,7 @@
 Configuration for the EV Charge Control Panel application.
 """
 
+import os
 from datetime import time
 
 # Battery Settings
@@ -18,6 +19,21 @@ DEFAULT_SCHEDULE_START = time(2, 0)  # Default schedule start (2:00 AM)
 DEFAULT_SCHEDULE_END = time(5, 0)  # Default schedule end (5:00 AM)
 DEFAULT_SCHEDULE_ENABLED = True  # Whether schedule is enabled by default
 
+# Override Expiry Settings
+OVERRIDE_WHEEL_TICK_SECONDS = 60  # Resolution of the override expiry timing wheel
+OVERRIDE_WHEEL_SLOTS = 512  # Slots in the wheel, so one turn is about 8.5 hours
+
+# Load Balancing Settings
+LOAD_BALANCE_HORIZON_HOURS = 24.0  # Deadline assumed for cars without a departure
+
+# Simulation Settings
+SIMULATION_SHARD_SIZE = 1000  # Vehicles simulated per worker task and output file
+
+# History Settings
+HISTORY_INDEX_STRIDE = 256  # Records per entry of a vehicle history's time index
+HISTORY_ROLLUP_MINUTES = (5, 60, 24 * 60)  # Bucket widths of the history rollups
+HISTORY_RETENTION_DAYS = 30  # Raw history older than this is dropped by compaction
+
 # UI Settings
 UI_PAGE_TITLE = "EV Charge Control Panel"
 UI_PAGE_ICON = "⚡"
@@ -26,3 +42,15 @@ UI_LAYOUT = "wide"  # Can be "wide" or "centered"
 # Chart Settings
 PERIOD_MINUTES = 30  # Time period for charge forecasting
 FORECAST_PERIODS = 9  # Number of periods to forecast
+PLAN_SLOT_MINUTES = 5  # Time slot for tariff-aware charge planning
+CHART_MAX_POINTS = 1000  # Above this, the forecast line is downsampled (WebGL)
+
+# Forecast Cache Settings
+FORECAST_CACHE_MAX_ENTRIES = 1024  # Maximum number of cached forecasts
+FORECAST_CACHE_MAX_BYTES = 16 * 1024 * 1024  # Maximum size of cached forecasts
+
+# State Storage Settings
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "session")  # "session" or "sqlite"
+STATE_DB_PATH = os.environ.get("STATE_DB_PATH", "ev_state.db")  # SQLite database
+DEFAULT_VEHICLE_ID = "default"  # Vehicle used when none is given in the URL
+STATE_COMMIT_ATTEMPTS = 3  # Tries for a command before a conflict is reported
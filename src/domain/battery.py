@@ -3,8 +3,19 @@ Battery domain logic for the EV Charge Control Panel.
 Handles battery state calculations and charge estimation.
 """
 
+from datetime import datetime
+from typing import Optional, Union
+
+import numpy as np
+
 from src.config import BATTERY_CAPACITY_KWH, DEFAULT_SOC
-from src.domain.models import BatteryState, ChargerState
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    intern_state,
+)
+from src.domain.schedule import FleetScheduleIndex
 
 
 def initialize_battery_state() -> BatteryState:
@@ -14,8 +25,10 @@ def initialize_battery_state() -> BatteryState:
     Returns:
         BatteryState: New battery state object
     """
-    return BatteryState(
-        current_soc=DEFAULT_SOC,
+    return intern_state(
+        BatteryState(
+            current_soc=DEFAULT_SOC,
+        )
     )
 
 
@@ -47,18 +60,218 @@ def project_battery_state(
         duration_hours: Duration to project forward in hours
 
     Returns:
-        BatteryState: Projected battery state
+        BatteryState: Projected battery state (the same instance if unchanged)
     """
     if not charger_state.car_is_charging:
         # If not charging, battery state doesn't change
-        return BatteryState(
-            current_soc=battery_state.current_soc, target_soc=battery_state.target_soc
-        )
+        return battery_state
 
     # Calculate charge added
     charge_added = calculate_charge_added(charger_state.charge_rate_kw, duration_hours)
 
     # Add charge, but don't exceed target
     new_soc = min(battery_state.current_soc + charge_added, battery_state.target_soc)
+    if new_soc == battery_state.current_soc:
+        return battery_state
 
+    # A projected SoC is rarely seen twice, so it is not worth interning
     return BatteryState(current_soc=new_soc, target_soc=battery_state.target_soc)
+
+
+def calculate_energy_to_soc(
+    current_soc: Union[float, np.ndarray], to_soc: Union[float, np.ndarray]
+) -> Union[float, np.ndarray]:
+    """
+    Calculate the energy needed to raise the state of charge to a given level.
+    Accepts scalars or NumPy arrays.
+
+    Args:
+        current_soc: Current state of charge (0.0 to 1.0)
+        to_soc: State of charge to reach (0.0 to 1.0)
+
+    Returns:
+        Union[float, np.ndarray]: Energy needed in kWh (0.0 if already at or
+            above the level)
+    """
+    return (np.maximum(np.subtract(to_soc, current_soc), 0.0) * BATTERY_CAPACITY_KWH)[
+        ()
+    ]
+
+
+def calculate_charge_duration(
+    charge_rate_kw: Union[float, np.ndarray],
+    current_soc: Union[float, np.ndarray],
+    to_soc: Union[float, np.ndarray],
+) -> Union[float, np.ndarray]:
+    """
+    Calculate how long the car must actively charge to reach a given level.
+    The inverse of calculate_charge_added. Accepts scalars or NumPy arrays.
+
+    Args:
+        charge_rate_kw: Charging rate in kilowatts
+        current_soc: Current state of charge (0.0 to 1.0)
+        to_soc: State of charge to reach (0.0 to 1.0)
+
+    Returns:
+        Union[float, np.ndarray]: Charging time in hours (inf if energy is
+            needed at a zero rate)
+    """
+    energy_needed = calculate_energy_to_soc(current_soc, to_soc)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(
+            energy_needed > 0, np.divide(energy_needed, charge_rate_kw), 0.0
+        )[()]
+
+
+def estimate_fleet_time_to_soc(
+    current_time: datetime,
+    current_soc: np.ndarray,
+    target_soc: np.ndarray,
+    charge_rate_kw: np.ndarray,
+    car_is_plugged_in: np.ndarray,
+    charge_is_override: np.ndarray,
+    override_end_time: np.ndarray,
+    schedules: FleetScheduleIndex,
+    to_soc: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Estimate when each of many batteries reaches a given state of charge.
+
+    Args:
+        current_time: Current time
+        current_soc: Current state of charge of each battery, shape (N,)
+        target_soc: Target state of charge of each battery, shape (N,)
+        charge_rate_kw: Charging rate of each charger in kW, shape (N,)
+        car_is_plugged_in: Plug state of each car, shape (N,)
+        charge_is_override: Whether each charger has an override, shape (N,)
+        override_end_time: Override end times (NaT if none), shape (N,)
+        schedules: Schedule index of each charger
+        to_soc: State of charge to reach per battery (defaults to the targets)
+
+    Returns:
+        np.ndarray: Times as datetime64[us] (NaT where the level is never reached)
+    """
+    if to_soc is None:
+        to_soc = target_soc
+
+    now = np.datetime64(current_time, "us")
+    one_hour = np.timedelta64(1, "h")
+
+    # Override hours left, treating an override without an end as endless
+    override_hours = np.where(
+        charge_is_override & car_is_plugged_in,
+        np.where(
+            np.isnat(override_end_time),
+            np.inf,
+            np.maximum((override_end_time - now) / one_hour, 0.0),
+        ),
+        0.0,
+    )
+
+    # Charging runs through the override, then only inside the schedule
+    needed = calculate_charge_duration(charge_rate_kw, current_soc, to_soc)
+    remaining = np.maximum(needed - override_hours, 0.0)
+    override_end = now + np.where(
+        np.isfinite(override_hours), override_hours * 3600 * 1_000_000, 0.0
+    ).round().astype("timedelta64[us]")
+    hours = np.where(
+        remaining > 0,
+        override_hours + schedules.hours_to_charge(override_end, remaining),
+        needed,
+    )
+
+    # Charging stops at the target, so nothing above it is ever reached
+    reachable = (
+        np.isfinite(hours)
+        & (car_is_plugged_in | (needed == 0))
+        & (to_soc <= np.maximum(target_soc, current_soc))
+    )
+    offsets = np.where(reachable, hours, 0.0) * 3600 * 1_000_000
+    return np.where(
+        reachable,
+        now + offsets.round().astype("timedelta64[us]"),
+        np.datetime64("NaT", "us"),
+    )
+
+
+def estimate_time_to_soc(
+    battery_state: BatteryState,
+    charger_state: ChargerState,
+    schedule: ChargeSchedule,
+    current_time: datetime,
+    car_is_plugged_in: bool = True,
+    to_soc: Optional[float] = None,
+) -> Optional[datetime]:
+    """
+    Estimate when the battery reaches a given state of charge.
+
+    Args:
+        battery_state: Current battery state
+        charger_state: Current charger state
+        schedule: Current charge schedule
+        current_time: Current time
+        car_is_plugged_in: Whether the car is plugged in
+        to_soc: State of charge to reach (defaults to the target)
+
+    Returns:
+        Optional[datetime]: When the level is reached, or None if it never is
+    """
+    # Estimate for a fleet of one
+    eta = estimate_fleet_time_to_soc(
+        current_time,
+        np.array([battery_state.current_soc]),
+        np.array([battery_state.target_soc]),
+        np.array([charger_state.charge_rate_kw], dtype=float),
+        np.array([car_is_plugged_in]),
+        np.array([charger_state.charge_is_override]),
+        np.array([charger_state.override_end_time or "NaT"], dtype="datetime64[us]"),
+        FleetScheduleIndex.from_schedules([schedule]),
+        None if to_soc is None else np.array([to_soc]),
+    )[0]
+    return None if np.isnat(eta) else eta.item()
+
+
+def project_soc_trajectory(
+    current_soc: np.ndarray,
+    target_soc: np.ndarray,
+    charge_rate_kw: np.ndarray,
+    is_charging: np.ndarray,
+    duration_hours: float,
+) -> np.ndarray:
+    """
+    Vectorized version of repeatedly applying project_battery_state.
+
+    Each column is the state of charge at the end of one period, exactly as if
+    project_battery_state had been called period after period.
+
+    Args:
+        current_soc: Starting state of charge of each battery, shape (N,)
+        target_soc: Target state of charge of each battery, shape (N,)
+        charge_rate_kw: Charging rate of each charger in kW, shape (N,)
+        is_charging: Whether each car charges in each period, shape (N, T)
+        duration_hours: Duration of each period in hours
+
+    Returns:
+        np.ndarray: Projected state of charge of shape (N, T)
+    """
+    soc = np.where(
+        is_charging,
+        calculate_charge_added(charge_rate_kw, duration_hours)[:, None],
+        0.0,
+    )
+    if not soc.shape[1]:
+        return soc
+
+    # Accumulating left to right from the start SoC reproduces the
+    # period-by-period additions; charge only ever increases, so clamping the
+    # running total gives the same result as clamping at every step
+    soc[:, 0] += current_soc
+    np.add.accumulate(soc, axis=1, out=soc)
+    np.minimum(soc, target_soc[:, np.newaxis], out=soc)
+
+    # SoC above target is only clamped once the car has actually charged
+    above = current_soc > target_soc
+    if above.any():
+        has_charged = np.logical_or.accumulate(is_charging[above], axis=1)
+        soc[above] = np.where(has_charged, soc[above], current_soc[above, np.newaxis])
+    return soc
@@ -3,10 +3,27 @@ Charging domain logic for the EV Charge Control Panel.
 Handles charge state management, scheduling, and overrides.
 """
 
-from datetime import datetime, time, timedelta
+from datetime import date, datetime, time, timedelta
+from typing import Union
+
+import numpy as np
 
 from src.config import DEFAULT_OVERRIDE_MINUTES, DEFAULT_CHARGE_RATE_KW
-from src.domain.models import ChargeSchedule, ChargerState, DemoAdminState
+from src.domain.models import (
+    EVERY_DAY,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    evolve,
+    intern_state,
+)
+from src.domain.schedule import (
+    FleetScheduleIndex,
+    index_schedule,
+    minute_slot,
+    schedule_bitmap,
+    schedule_windows,
+)
 
 
 def initialize_charger_state() -> ChargerState:
@@ -16,35 +33,98 @@ def initialize_charger_state() -> ChargerState:
     Returns:
         ChargerState: New charger state object
     """
-    return ChargerState(
-        car_is_charging=False,
-        charge_is_override=False,
-        charge_rate_kw=DEFAULT_CHARGE_RATE_KW,
-        override_minutes=DEFAULT_OVERRIDE_MINUTES,
-        override_end_time=None,
+    return intern_state(
+        ChargerState(
+            car_is_charging=False,
+            charge_is_override=False,
+            charge_rate_kw=DEFAULT_CHARGE_RATE_KW,
+            override_minutes=DEFAULT_OVERRIDE_MINUTES,
+            override_end_time=None,
+        )
     )
 
 
-def is_in_scheduled_window(current_time: time, schedule: ChargeSchedule) -> bool:
+def is_in_scheduled_window(
+    current_time: Union[datetime, time], schedule: ChargeSchedule
+) -> bool:
     """
     Check if the current time is within the scheduled charging window.
 
     Args:
-        current_time: Current time to check
+        current_time: Current time to check (a time of day is enough for
+            schedules whose windows apply every day)
         schedule: Charge schedule to check against
 
     Returns:
-        bool: True if in the scheduled window, False otherwise
+        bool: True if in a scheduled window, False otherwise
+
+    Raises:
+        ValueError: If given a time of day for a schedule with weekday windows
     """
-    if not schedule.is_enabled:
-        return False
+    if isinstance(current_time, time):
+        if any(set(w.weekdays) != set(EVERY_DAY) for w in schedule_windows(schedule)):
+            raise ValueError("A date is needed to check a schedule by weekday")
+        current_time = datetime.combine(date.min, current_time)
 
-    if schedule.start_time <= schedule.end_time:
-        # Normal window (e.g., 2am-5am)
-        return schedule.start_time <= current_time <= schedule.end_time
-    else:
-        # Overnight window (e.g., 10pm-6am)
-        return current_time >= schedule.start_time or current_time <= schedule.end_time
+    bitmap = schedule_bitmap(schedule)
+    if bitmap is not None:
+        return bool(bitmap[minute_slot(current_time)])
+    return index_schedule(schedule).contains(current_time)
+
+
+def schedule_transitions(
+    schedule: ChargeSchedule, start_time: datetime, end_time: datetime
+) -> list[datetime]:
+    """
+    List the instants strictly between two times where the schedule starts or ends.
+
+    Args:
+        schedule: Charge schedule to check
+        start_time: Start of the range (exclusive)
+        end_time: End of the range (exclusive)
+
+    Returns:
+        list[datetime]: Sorted schedule start and end instants in the range
+    """
+    return index_schedule(schedule).transitions_between(start_time, end_time)
+
+
+def charging_masks(
+    times: np.ndarray,
+    car_is_plugged_in: np.ndarray,
+    charge_is_override: np.ndarray,
+    override_end_time: np.ndarray,
+    schedules: FleetScheduleIndex,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorized version of update_charger_state for many chargers and times.
+
+    Applies the same rules: overrides expire at their end time, unplugged cars
+    never charge, an active override always charges and otherwise the
+    schedule decides.
+
+    Args:
+        times: Points in time to evaluate, datetime64 of shape (T,)
+        car_is_plugged_in: Plug state of each car, shape (N,)
+        charge_is_override: Whether each charger has an override, shape (N,)
+        override_end_time: Override end times (NaT if none), shape (N,)
+        schedules: Schedule index of each charger
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Charging and override masks of shape (N, T)
+    """
+    t = times[np.newaxis, :]
+    end = override_end_time[:, np.newaxis]
+
+    # An override without an end time never expires
+    override_active = charge_is_override[:, np.newaxis] & (np.isnat(end) | (t < end))
+
+    in_schedule = schedules.contains(times)
+
+    plugged_in = car_is_plugged_in[:, np.newaxis]
+    is_charging = plugged_in & (override_active | in_schedule)
+
+    return is_charging, override_active
 
 
 def update_charger_state(
@@ -59,42 +139,39 @@ def update_charger_state(
         schedule: Current charge schedule
 
     Returns:
-        ChargerState: Updated charger state
-    """
-    # Make a copy of the current state
-    new_state = ChargerState(
-        car_is_charging=charger_state.car_is_charging,
-        charge_is_override=charger_state.charge_is_override,
-        charge_rate_kw=charger_state.charge_rate_kw,
-        override_minutes=charger_state.override_minutes,
-        override_end_time=charger_state.override_end_time,
-    )
+        ChargerState: Updated charger state (the same instance if unchanged)
+    """
+    charge_is_override = charger_state.charge_is_override
+    override_end_time = charger_state.override_end_time
 
     # Check if override has expired
     if (
-        new_state.charge_is_override
-        and new_state.override_end_time
-        and demo_state.current_time >= new_state.override_end_time
+        charge_is_override
+        and override_end_time
+        and demo_state.current_time >= override_end_time
     ):
         # Reset override status
-        new_state.charge_is_override = False
-        new_state.override_end_time = None
+        charge_is_override = False
+        override_end_time = None
 
     # Determine charging state
     if demo_state.car_is_plugged_in:
-        if new_state.charge_is_override:
-            new_state.car_is_charging = True
+        if charge_is_override:
+            car_is_charging = True
         else:
             # Check if current time is in scheduled window
-            in_schedule = is_in_scheduled_window(
-                demo_state.current_time.time(), schedule
-            )
-            new_state.car_is_charging = in_schedule and schedule.is_enabled
+            in_schedule = is_in_scheduled_window(demo_state.current_time, schedule)
+            car_is_charging = in_schedule and schedule.is_enabled
     else:
         # Can't charge if not plugged in
-        new_state.car_is_charging = False
+        car_is_charging = False
 
-    return new_state
+    return evolve(
+        charger_state,
+        car_is_charging=car_is_charging,
+        charge_is_override=charge_is_override,
+        override_end_time=override_end_time,
+    )
 
 
 def start_override_charge(
@@ -114,11 +191,10 @@ def start_override_charge(
     override_end_time = current_time + timedelta(minutes=charger_state.override_minutes)
 
     # Create new state with override active
-    return ChargerState(
+    return evolve(
+        charger_state,
         car_is_charging=True,
         charge_is_override=True,
-        charge_rate_kw=charger_state.charge_rate_kw,
-        override_minutes=charger_state.override_minutes,
         override_end_time=override_end_time,
     )
 
@@ -133,15 +209,28 @@ def stop_override_charge(charger_state: ChargerState) -> ChargerState:
     Returns:
         ChargerState: Updated charger state with override stopped
     """
-    return ChargerState(
+    return evolve(
+        charger_state,
         car_is_charging=False,
         charge_is_override=False,
-        charge_rate_kw=charger_state.charge_rate_kw,
-        override_minutes=charger_state.override_minutes,
         override_end_time=None,
     )
 
 
+def end_override(charger_state: ChargerState) -> ChargerState:
+    """
+    End an override, handing charging back to the schedule.
+    Whether the car keeps charging is left to the next update_charger_state.
+
+    Args:
+        charger_state: Current charger state
+
+    Returns:
+        ChargerState: Updated charger state with no override
+    """
+    return evolve(charger_state, charge_is_override=False, override_end_time=None)
+
+
 def disable_scheduled_charge(charger_state: ChargerState) -> ChargerState:
     """
     Disable the current scheduled charging.
@@ -153,10 +242,4 @@ def disable_scheduled_charge(charger_state: ChargerState) -> ChargerState:
     Returns:
         ChargerState: Updated charger state with charging disabled
     """
-    return ChargerState(
-        car_is_charging=False,
-        charge_is_override=charger_state.charge_is_override,
-        charge_rate_kw=charger_state.charge_rate_kw,
-        override_minutes=charger_state.override_minutes,
-        override_end_time=charger_state.override_end_time,
-    )
+    return evolve(charger_state, car_is_charging=False)
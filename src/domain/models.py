@@ -1,10 +1,18 @@
 """
 Core domain models for the EV Charge Control Panel application.
+
+The state models are immutable, slotted and hashable. Transitions build new
+states with evolve, which hands back an existing equal instance instead of
+allocating a copy, so an unchanged state can be detected by identity.
 """
 
-from dataclasses import dataclass
+import threading
+import weakref
+from dataclasses import dataclass, fields, replace
 from datetime import datetime, time
-from typing import Optional
+from typing import Any, Iterable, Optional, TypeVar
+
+import numpy as np
 
 from src.config import (
     DEFAULT_CHARGE_RATE_KW,
@@ -12,8 +20,112 @@ from src.config import (
     DEFAULT_TARGET_SOC,
 )
 
+T = TypeVar("T")
 
-@dataclass
+# Canonical instance of each live state, keyed by its type and field values
+_interned: "weakref.WeakValueDictionary[tuple, Any]" = weakref.WeakValueDictionary()
+_interned_lock = threading.Lock()
+# Field names of each model, in __init__ order
+_field_names: dict[type, tuple[str, ...]] = {}
+
+
+def _getstate(self) -> list:
+    return [getattr(self, field.name) for field in fields(self)]
+
+
+def _setstate(self, state: list) -> None:
+    for field, value in zip(fields(self), state):
+        object.__setattr__(self, field.name, value)
+
+
+def _frozen_model(cls: type) -> type:
+    """
+    Make a class a frozen dataclass with __slots__.
+
+    Equivalent to dataclass(frozen=True, slots=True), which needs Python 3.10.
+    A __weakref__ slot is kept so instances can be interned.
+
+    Args:
+        cls: Class to convert
+
+    Returns:
+        type: Frozen, slotted dataclass
+    """
+    cls = dataclass(frozen=True)(cls)
+    names = tuple(field.name for field in fields(cls))
+
+    # Field defaults live on the generated __init__, so the class attributes
+    # holding them can make way for the slots
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in names and key not in ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = names + ("__weakref__",)
+    # Frozen instances can't be restored with setattr when copied or pickled
+    namespace["__getstate__"] = _getstate
+    namespace["__setstate__"] = _setstate
+
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    _field_names[slotted] = names
+    return slotted
+
+
+def intern_state(state: T) -> T:
+    """
+    Get the canonical instance of a state.
+
+    Args:
+        state: State to intern
+
+    Returns:
+        The live instance equal to state, or state itself if there is none
+    """
+    key = (type(state), *_getstate(state))
+    with _interned_lock:
+        canonical = _interned.get(key)
+        if canonical is None:
+            _interned[key] = canonical = state
+    return canonical
+
+
+def evolve(state: T, **changes: Any) -> T:
+    """
+    Get a state with some fields changed, like dataclasses.replace.
+
+    Returns state itself when no field actually changes, and otherwise the
+    interned instance of the result. The instance is looked up by its field
+    values first, so nothing is built when an equal state is live.
+
+    Args:
+        state: State to start from
+        changes: New field values by name
+
+    Returns:
+        State with the changes applied
+    """
+    for name, value in changes.items():
+        if getattr(state, name) != value:
+            break
+    else:
+        return state
+
+    cls = type(state)
+    names = _field_names.get(cls)
+    if names is None:
+        return intern_state(replace(state, **changes))
+    values = tuple(
+        changes[name] if name in changes else getattr(state, name) for name in names
+    )
+    # Reading without the lock is safe, as a miss is settled by intern_state
+    canonical = _interned.get((cls, *values))
+    if canonical is not None:
+        return canonical
+    return intern_state(cls(*values))
+
+
+@_frozen_model
 class DemoAdminState:
     """State controlled from the admin panel for demo/simulation purposes."""
 
@@ -21,7 +133,7 @@ class DemoAdminState:
     current_time: datetime
 
 
-@dataclass
+@_frozen_model
 class BatteryState:
     """
     Represents the state of the car's battery.
@@ -35,23 +147,73 @@ class BatteryState:
     target_soc: float = DEFAULT_TARGET_SOC
 
 
-@dataclass
+# Weekdays as numbered by datetime.weekday (Monday is 0)
+EVERY_DAY = (0, 1, 2, 3, 4, 5, 6)
+
+
+@_frozen_model
+class ScheduleWindow:
+    """
+    A charging window that recurs on some days of the week.
+
+    A window ending before it starts runs overnight, into the next day.
+
+    Attributes:
+        start_time: Start time of day (inclusive)
+        end_time: End time of day (inclusive)
+        weekdays: Days the window starts on, Monday is 0 (default every day)
+    """
+
+    start_time: time
+    end_time: time
+    weekdays: tuple[int, ...] = EVERY_DAY
+
+
+@_frozen_model
 class ChargeSchedule:
     """
-    Represents a scheduled charging window.
+    Represents the scheduled charging windows.
 
     Attributes:
         start_time: Daily start time (e.g., 2:00 AM)
         end_time: Daily end time (e.g., 5:00 AM)
         is_enabled: Whether the schedule is currently active
+        windows: Windows to charge in, replacing the daily start to end
+            window when given
     """
 
     start_time: time
     end_time: time
     is_enabled: bool = True
+    windows: tuple[ScheduleWindow, ...] = ()
 
+    @classmethod
+    def from_windows(
+        cls, windows: Iterable[ScheduleWindow], is_enabled: bool = True
+    ) -> "ChargeSchedule":
+        """
+        Build a schedule from any number of windows.
 
-@dataclass
+        The daily start and end times are taken from the first window, for
+        display where only one window can be shown.
+
+        Args:
+            windows: Windows to charge in (at least one)
+            is_enabled: Whether the schedule is active
+
+        Returns:
+            ChargeSchedule: Schedule charging in the given windows
+        """
+        windows = tuple(windows)
+        return cls(
+            start_time=windows[0].start_time,
+            end_time=windows[0].end_time,
+            is_enabled=is_enabled,
+            windows=windows,
+        )
+
+
+@_frozen_model
 class ChargerState:
     """
     Represents the state of the car's charger.
@@ -71,7 +233,7 @@ class ChargerState:
     override_end_time: Optional[datetime] = None
 
 
-@dataclass
+@_frozen_model
 class CombinedState:
     """
     Helper class for grouping time, battery, and charger states together.
@@ -86,3 +248,71 @@ class CombinedState:
     time: datetime
     battery_state: BatteryState
     charger_state: ChargerState
+
+
+@dataclass
+class ForecastFrame:
+    """
+    Columnar forecast for a single car, with one entry per period.
+    Used in place of a list of CombinedState for forecasting and visualization.
+
+    Attributes:
+        times: Start of each period (datetime64[us])
+        soc: State of charge at the end of each period
+        is_charging: Whether the car charges during each period
+        is_override: Whether charging during each period is from an override
+    """
+
+    times: np.ndarray
+    soc: np.ndarray
+    is_charging: np.ndarray
+    is_override: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def from_states(cls, states: list[CombinedState]) -> "ForecastFrame":
+        """
+        Build a frame from a list of CombinedState objects.
+
+        Args:
+            states: Combined states, one per period
+
+        Returns:
+            ForecastFrame: Columnar forecast
+        """
+        return cls(
+            times=np.array([state.time for state in states], dtype="datetime64[us]"),
+            soc=np.array(
+                [state.battery_state.current_soc for state in states], dtype=float
+            ),
+            is_charging=np.array(
+                [state.charger_state.car_is_charging for state in states], dtype=bool
+            ),
+            is_override=np.array(
+                [state.charger_state.charge_is_override for state in states],
+                dtype=bool,
+            ),
+        )
+
+
+@_frozen_model
+class ForecastSegment:
+    """
+    A stretch of time over which charging behaviour does not change.
+    State of charge moves linearly from the start state to the end state.
+
+    Attributes:
+        start_time: When the segment starts (inclusive)
+        end_time: When the segment ends (exclusive)
+        start_battery_state: Battery state at the start of the segment
+        end_battery_state: Battery state at the end of the segment
+        charger_state: Charger state throughout the segment
+    """
+
+    start_time: datetime
+    end_time: datetime
+    start_battery_state: BatteryState
+    end_battery_state: BatteryState
+    charger_state: ChargerState
@@ -0,0 +1,571 @@
+"""
+Schedule indexing for the EV Charge Control Panel.
+Normalises a schedule's windows into sorted, merged intervals over the week,
+so membership and next-transition queries are binary searches.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from src.domain.models import ChargeSchedule, ScheduleWindow
+
+MICROSECONDS_PER_MINUTE = 60 * 1_000_000
+MICROSECONDS_PER_HOUR = 60 * MICROSECONDS_PER_MINUTE
+MICROSECONDS_PER_DAY = 24 * MICROSECONDS_PER_HOUR
+MICROSECONDS_PER_WEEK = 7 * MICROSECONDS_PER_DAY
+MINUTES_PER_WEEK = MICROSECONDS_PER_WEEK // MICROSECONDS_PER_MINUTE
+
+# A Monday, so week offsets of datetime64 values can be taken from it
+_MONDAY = np.datetime64("1970-01-05", "us")
+
+
+def time_offset(value: time) -> int:
+    """
+    Get a time of day as microseconds since midnight.
+
+    Args:
+        value: Time of day
+
+    Returns:
+        int: Microseconds since midnight
+    """
+    return (
+        (value.hour * 60 + value.minute) * 60 + value.second
+    ) * 1_000_000 + value.microsecond
+
+
+def week_offset(value: datetime) -> int:
+    """
+    Get a point in time as microseconds since the start of its week.
+
+    Args:
+        value: Point in time
+
+    Returns:
+        int: Microseconds since Monday midnight
+    """
+    return value.weekday() * MICROSECONDS_PER_DAY + time_offset(value.time())
+
+
+def week_offsets(times: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of week_offset.
+
+    Args:
+        times: Points in time, datetime64
+
+    Returns:
+        np.ndarray: Microseconds since Monday midnight, int64
+    """
+    return (times - _MONDAY).astype("timedelta64[us]").astype(
+        np.int64
+    ) % MICROSECONDS_PER_WEEK
+
+
+def minute_slot(value: datetime) -> int:
+    """
+    Get the schedule bitmap slot of a point in time.
+
+    Slot 2m is the instant minute m of the week starts, and slot 2m + 1 is
+    the rest of that minute.
+
+    Args:
+        value: Point in time
+
+    Returns:
+        int: Slot index
+    """
+    minute, within = divmod(week_offset(value), MICROSECONDS_PER_MINUTE)
+    return 2 * minute + (within > 0)
+
+
+def minute_slots(times: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of minute_slot.
+
+    Args:
+        times: Points in time, datetime64
+
+    Returns:
+        np.ndarray: Slot indexes, int64
+    """
+    minutes, within = np.divmod(week_offsets(times), MICROSECONDS_PER_MINUTE)
+    return 2 * minutes + (within > 0)
+
+
+def schedule_windows(schedule: ChargeSchedule) -> tuple[ScheduleWindow, ...]:
+    """
+    Get the windows a schedule charges in.
+
+    Args:
+        schedule: Charge schedule
+
+    Returns:
+        tuple[ScheduleWindow, ...]: The schedule's windows, or its daily window
+    """
+    return schedule.windows or (
+        ScheduleWindow(start_time=schedule.start_time, end_time=schedule.end_time),
+    )
+
+
+def window_intervals(window: ScheduleWindow) -> Iterator[tuple[int, int]]:
+    """
+    List the closed intervals of the week a window covers.
+
+    Args:
+        window: Charging window
+
+    Yields:
+        tuple[int, int]: Start and end in microseconds since Monday midnight
+    """
+    start = time_offset(window.start_time)
+    end = time_offset(window.end_time)
+
+    for day in sorted(set(window.weekdays)):
+        day_start = day * MICROSECONDS_PER_DAY
+        if start <= end:
+            yield day_start + start, day_start + end
+        elif day < 6:
+            # Overnight, into the next day
+            yield day_start + start, day_start + MICROSECONDS_PER_DAY + end
+        else:
+            # Sunday night wraps around to Monday morning
+            yield day_start + start, MICROSECONDS_PER_WEEK
+            yield 0, end
+
+
+def merge_intervals(intervals: Iterable[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Sort closed intervals and merge those that overlap or adjoin.
+
+    Args:
+        intervals: Start and end (inclusive) of each interval, in microseconds
+
+    Returns:
+        list[tuple[int, int]]: Sorted, disjoint intervals
+    """
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        # Times have microsecond resolution, so adjoining intervals leave no gap
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _week_start(value: datetime) -> datetime:
+    """Get Monday midnight of the week containing a point in time."""
+    midnight = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight - timedelta(days=value.weekday())
+
+
+@dataclass(frozen=True)
+class ScheduleIndex:
+    """
+    A schedule's charging time as sorted, disjoint intervals of the week.
+
+    Offsets are in microseconds since Monday midnight, and intervals include
+    both ends, matching the inclusive end of a schedule window. An interval
+    running to the end of the week ends at MICROSECONDS_PER_WEEK, the same
+    instant as offset 0 of the next week.
+
+    Attributes:
+        starts: Start of each interval
+        ends: End of each interval (inclusive)
+        transitions: Offsets where a window starts or ends, sorted
+    """
+
+    starts: tuple[int, ...]
+    ends: tuple[int, ...]
+    transitions: tuple[int, ...]
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[tuple[int, int]]) -> "ScheduleIndex":
+        """
+        Build an index from any closed intervals of the week.
+
+        Args:
+            intervals: Start and end (inclusive) of each interval, in microseconds
+
+        Returns:
+            ScheduleIndex: Index of the merged intervals
+        """
+        merged = merge_intervals(intervals)
+        starts = tuple(start for start, _ in merged)
+        ends = tuple(end for _, end in merged)
+
+        # The end of the week is offset 0 of the next, so it is counted there
+        transitions = (set(starts) | set(ends)) - {MICROSECONDS_PER_WEEK}
+        if merged and ends[-1] == MICROSECONDS_PER_WEEK:
+            if starts[0] == 0 and ends[0] > 0:
+                # Charging across the end of the week is one stretch, not two
+                transitions.discard(0)
+            else:
+                # Charging stops at Monday midnight
+                transitions.add(0)
+
+        return cls(starts=starts, ends=ends, transitions=tuple(sorted(transitions)))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def contains(self, at: datetime) -> bool:
+        """
+        Check whether a point in time is inside the schedule.
+
+        Args:
+            at: Point in time
+
+        Returns:
+            bool: True if a window covers it
+        """
+        offset = week_offset(at)
+        index = bisect_right(self.starts, offset) - 1
+        return index >= 0 and offset <= self.ends[index]
+
+    def next_transition(self, after: datetime) -> Optional[datetime]:
+        """
+        Find the first instant after a given time where a window starts or ends.
+
+        Args:
+            after: Point in time (exclusive)
+
+        Returns:
+            Optional[datetime]: Next transition, or None if the schedule never changes
+        """
+        if not self.transitions:
+            return None
+
+        week_start = _week_start(after)
+        index = bisect_right(self.transitions, week_offset(after))
+        if index == len(self.transitions):
+            # Wrap around to the first transition of next week
+            week_start += timedelta(weeks=1)
+            index = 0
+        return week_start + timedelta(microseconds=self.transitions[index])
+
+    def transitions_between(
+        self, start_time: datetime, end_time: datetime
+    ) -> list[datetime]:
+        """
+        List the instants strictly between two times where a window starts or ends.
+
+        Args:
+            start_time: Start of the range (exclusive)
+            end_time: End of the range (exclusive)
+
+        Returns:
+            list[datetime]: Sorted transitions in the range
+        """
+        transitions = []
+        instant = self.next_transition(start_time)
+        while instant is not None and instant < end_time:
+            transitions.append(instant)
+            instant = self.next_transition(instant)
+        return transitions
+
+    def scheduled_hours_between(
+        self, start_times: np.ndarray, end_times: np.ndarray
+    ) -> np.ndarray:
+        """
+        Measure the scheduled time between pairs of points in time.
+
+        Args:
+            start_times: Start of each range, datetime64
+            end_times: End of each range, datetime64 of the same shape
+
+        Returns:
+            np.ndarray: Hours inside the schedule in each range
+        """
+        return (
+            self._scheduled_time(end_times) - self._scheduled_time(start_times)
+        ) / MICROSECONDS_PER_HOUR
+
+    def _scheduled_time(self, times: np.ndarray) -> np.ndarray:
+        """Scheduled microseconds between a fixed Monday and each point in time."""
+        if not self.starts:
+            return np.zeros(np.shape(times), dtype=np.int64)
+
+        starts = np.array(self.starts, dtype=np.int64)
+        durations = np.array(self.ends, dtype=np.int64) - starts
+        before = np.concatenate([[0], np.cumsum(durations)])
+
+        elapsed = (times - _MONDAY).astype("timedelta64[us]").astype(np.int64)
+        offsets = week_offsets(times)
+        index = np.searchsorted(starts, offsets, side="right") - 1
+        safe_index = np.maximum(index, 0)
+        within = np.where(
+            index >= 0,
+            before[safe_index]
+            + np.clip(offsets - starts[safe_index], 0, durations[safe_index]),
+            0,
+        )
+        return (elapsed // MICROSECONDS_PER_WEEK) * before[-1] + within
+
+    def hours_to_charge(self, start_time: datetime, hours: float) -> float:
+        """
+        Find how long it takes to spend some hours inside the schedule.
+
+        Args:
+            start_time: When to start counting
+            hours: Hours of scheduled time needed
+
+        Returns:
+            float: Wall-clock hours taken (inf if the schedule is empty)
+        """
+        return float(
+            FleetScheduleIndex.from_indexes([self]).hours_to_charge(
+                np.array([start_time], dtype="datetime64[us]"), np.array([hours])
+            )[0]
+        )
+
+
+@lru_cache(maxsize=1024)
+def index_schedule(schedule: ChargeSchedule) -> ScheduleIndex:
+    """
+    Get the index of a schedule's charging time.
+
+    Schedules are immutable, so the index is built once per schedule.
+
+    Args:
+        schedule: Charge schedule
+
+    Returns:
+        ScheduleIndex: Index of the schedule (empty if it is disabled)
+    """
+    if not schedule.is_enabled:
+        return ScheduleIndex.from_intervals([])
+
+    return ScheduleIndex.from_intervals(
+        interval
+        for window in schedule_windows(schedule)
+        for interval in window_intervals(window)
+    )
+
+
+@lru_cache(maxsize=1024)
+def schedule_bitmap(schedule: ChargeSchedule) -> Optional[np.ndarray]:
+    """
+    Compile a schedule into a minute-of-week bitmap.
+
+    Schedules are immutable, so editing one makes a new schedule and a new
+    bitmap. Only schedules whose windows start and end on whole minutes can
+    be compiled; the rest are looked up with their index.
+
+    Args:
+        schedule: Charge schedule
+
+    Returns:
+        Optional[np.ndarray]: Read-only boolean array indexed by minute_slots,
+            or None if the schedule is not on whole minutes
+    """
+    index = index_schedule(schedule)
+    if any(offset % MICROSECONDS_PER_MINUTE for offset in index.starts + index.ends):
+        return None
+
+    bitmap = np.zeros(2 * MINUTES_PER_WEEK, dtype=bool)
+    for start, end in zip(index.starts, index.ends):
+        first = 2 * (start // MICROSECONDS_PER_MINUTE)
+        # Ends are inclusive, so the instant the end minute starts is the last slot
+        last = 2 * (end // MICROSECONDS_PER_MINUTE)
+        bitmap[first : last + 1] = True
+    bitmap.flags.writeable = False
+    return bitmap
+
+
+@dataclass
+class FleetScheduleIndex:
+    """
+    The schedule indexes of many vehicles packed into flat arrays.
+
+    Vehicle n's intervals are shifted n weeks later, so that a single
+    searchsorted answers queries for every vehicle at once. When every
+    schedule compiles to a bitmap, membership is a gather instead.
+
+    Attributes:
+        starts: Shifted interval starts in microseconds, int64 of shape (M,)
+        ends: Shifted interval ends (inclusive), int64 of shape (M,)
+        num_schedules: Number of vehicles
+        bitmaps: Distinct schedule bitmaps, bool of shape (K, 2 * MINUTES_PER_WEEK)
+        bitmap_rows: Row of bitmaps used by each vehicle, shape (N,)
+    """
+
+    starts: np.ndarray
+    ends: np.ndarray
+    num_schedules: int
+    bitmaps: Optional[np.ndarray] = None
+    bitmap_rows: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_schedules(
+        cls, schedules: Sequence[ChargeSchedule]
+    ) -> "FleetScheduleIndex":
+        """
+        Pack the indexes of many schedules.
+
+        Args:
+            schedules: Charge schedule of each vehicle
+
+        Returns:
+            FleetScheduleIndex: Packed indexes
+        """
+        fleet = cls.from_indexes([index_schedule(schedule) for schedule in schedules])
+
+        # Fleets share few distinct schedules, so each bitmap is stored once
+        rows: dict[ChargeSchedule, int] = {}
+        bitmaps = []
+        for schedule in schedules:
+            if schedule not in rows:
+                bitmap = schedule_bitmap(schedule)
+                if bitmap is None:
+                    return fleet
+                rows[schedule] = len(bitmaps)
+                bitmaps.append(bitmap)
+
+        if bitmaps:
+            fleet.bitmaps = np.stack(bitmaps)
+            fleet.bitmap_rows = np.array(
+                [rows[schedule] for schedule in schedules], dtype=np.int64
+            )
+        return fleet
+
+    @classmethod
+    def from_indexes(cls, indexes: Sequence[ScheduleIndex]) -> "FleetScheduleIndex":
+        """
+        Pack many schedule indexes.
+
+        Args:
+            indexes: Schedule index of each vehicle
+
+        Returns:
+            FleetScheduleIndex: Packed indexes
+        """
+        owners = np.repeat(
+            np.arange(len(indexes), dtype=np.int64), [len(index) for index in indexes]
+        )
+        shifts = owners * MICROSECONDS_PER_WEEK
+
+        def pack(values: Iterable[int]) -> np.ndarray:
+            return np.fromiter(values, dtype=np.int64, count=len(owners)) + shifts
+
+        return cls(
+            starts=pack(start for index in indexes for start in index.starts),
+            ends=pack(end for index in indexes for end in index.ends),
+            num_schedules=len(indexes),
+        )
+
+    def __len__(self) -> int:
+        return self.num_schedules
+
+    def _shifts(self) -> np.ndarray:
+        return np.arange(self.num_schedules, dtype=np.int64) * MICROSECONDS_PER_WEEK
+
+    def _owners(self) -> np.ndarray:
+        return self.starts // MICROSECONDS_PER_WEEK
+
+    def contains(self, times: np.ndarray) -> np.ndarray:
+        """
+        Check which vehicles' schedules cover which points in time.
+
+        Args:
+            times: Points in time, datetime64 of shape (T,)
+
+        Returns:
+            np.ndarray: Boolean mask of shape (N, T)
+        """
+        if self.bitmaps is not None:
+            return self.bitmaps[
+                self.bitmap_rows[:, np.newaxis], minute_slots(times)[np.newaxis, :]
+            ]
+
+        vehicles = np.arange(self.num_schedules)
+        queries = week_offsets(times)[np.newaxis, :] + self._shifts()[:, np.newaxis]
+        if not len(self.starts):
+            return np.zeros(queries.shape, dtype=bool)
+
+        index = np.searchsorted(self.starts, queries, side="right") - 1
+        safe_index = np.maximum(index, 0)
+        return (
+            (index >= 0)
+            & (self._owners()[safe_index] == vehicles[:, np.newaxis])
+            & (queries <= self.ends[safe_index])
+        )
+
+    def hours_to_charge(self, start_times: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        """
+        Find how long each vehicle takes to spend some hours inside its schedule.
+
+        Args:
+            start_times: When each vehicle starts counting, datetime64 of shape (N,)
+            hours: Hours of scheduled time needed by each vehicle, shape (N,)
+
+        Returns:
+            np.ndarray: Wall-clock hours taken (inf where the schedule is empty)
+        """
+        hours = np.asarray(hours, dtype=float)
+        if not len(self.starts):
+            return np.where(hours > 0, np.inf, 0.0)
+
+        shifts = self._shifts()
+        owner = self._owners()
+        durations = self.ends - self.starts
+
+        # Scheduled time before the end of each interval, counted from the
+        # start of its own vehicle's week
+        totals = np.cumsum(durations)
+        firsts = np.searchsorted(owner, np.arange(self.num_schedules))
+        bases = np.concatenate([[0], totals])[firsts]
+        cumulative = totals - bases[owner]
+        weekly = np.bincount(
+            owner, weights=durations, minlength=self.num_schedules
+        ).astype(np.int64)
+
+        # Scheduled time already past at the start, within its week
+        offsets = week_offsets(start_times)
+        index = np.searchsorted(self.starts, shifts + offsets, side="right") - 1
+        safe_index = np.maximum(index, 0)
+        own = (index >= 0) & (owner[safe_index] == np.arange(self.num_schedules))
+        elapsed = np.where(
+            own,
+            cumulative[safe_index]
+            - durations[safe_index]
+            + np.clip(
+                shifts + offsets - self.starts[safe_index], 0, durations[safe_index]
+            ),
+            0,
+        )
+
+        needed = np.round(
+            np.where(np.isfinite(hours), hours, 0.0) * MICROSECONDS_PER_HOUR
+        )
+        needed = needed.astype(np.int64)
+        reachable = (weekly > 0) & np.isfinite(hours)
+
+        # Split the cumulative target into whole weeks and a remainder in
+        # (0, weekly], then find the interval the remainder ends in
+        target = elapsed + needed
+        safe_weekly = np.where(reachable, weekly, 1).astype(np.int64)
+        weeks = -(-target // safe_weekly) - 1
+        remainder = target - weeks * safe_weekly
+        end = np.searchsorted(
+            cumulative + owner * MICROSECONDS_PER_WEEK,
+            shifts + remainder,
+            side="left",
+        )
+        end = np.minimum(end, len(self.starts) - 1)
+        end_offset = (
+            self.starts[end] - shifts + remainder - (cumulative[end] - durations[end])
+        )
+
+        wall_clock = weeks * MICROSECONDS_PER_WEEK + end_offset - offsets
+        return np.where(
+            hours <= 0,
+            0.0,
+            np.where(reachable, wall_clock / MICROSECONDS_PER_HOUR, np.inf),
+        )
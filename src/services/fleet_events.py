@@ -0,0 +1,281 @@
+"""
+Fleet event service for the EV Charge Control Panel.
+Keeps a fleet's charger states current by processing only the vehicles whose state changes.
+"""
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Optional
+
+from src.domain.battery import calculate_charge_duration, project_battery_state
+from src.domain.charging import update_charger_state
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    evolve,
+)
+from src.domain.schedule import index_schedule
+
+
+@dataclass(frozen=True)
+class FleetEvent:
+    """
+    A change in one vehicle's charging.
+
+    Attributes:
+        time: When the change happened
+        vehicle_id: Vehicle that changed
+        battery_state: Its battery state at that time
+        charger_state: Its charger state from that time on
+    """
+
+    time: datetime
+    vehicle_id: str
+    battery_state: BatteryState
+    charger_state: ChargerState
+
+
+@dataclass
+class _Vehicle:
+    """
+    A vehicle followed by the event loop, as of its last transition.
+
+    Attributes:
+        battery_state: Battery state at updated_at
+        charger_state: Charger state from updated_at until the next transition
+        schedule: Charge schedule
+        car_is_plugged_in: Whether the car is plugged in
+        updated_at: Time of the last transition
+        full_at: When the battery reaches its target, if it charges until then
+        version: Number of the vehicle's queue entry that is still current
+    """
+
+    battery_state: BatteryState
+    charger_state: ChargerState
+    schedule: ChargeSchedule
+    car_is_plugged_in: bool
+    updated_at: datetime
+    full_at: Optional[datetime] = None
+    version: int = 0
+
+
+class FleetEventLoop:
+    """
+    Priority queue of each vehicle's next state transition.
+
+    A vehicle's state can only change when its schedule starts or ends, its
+    override ends or its battery reaches the target. Each vehicle has one
+    queue entry for the earliest of those, so advancing the clock costs time
+    in proportion to the transitions due, not to the size of the fleet.
+    Entries made stale by changes to a vehicle are skipped when popped.
+    """
+
+    def __init__(self, start_time: datetime):
+        self.current_time = start_time
+        self._vehicles: dict[str, _Vehicle] = {}
+        self._queue: list[tuple[datetime, int, str, int]] = []
+        # Breaks ties between entries due at the same time, oldest first
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        return len(self._vehicles)
+
+    def __contains__(self, vehicle_id: str) -> bool:
+        return vehicle_id in self._vehicles
+
+    def add_vehicle(
+        self,
+        vehicle_id: str,
+        battery_state: BatteryState,
+        charger_state: ChargerState,
+        schedule: ChargeSchedule,
+        car_is_plugged_in: bool,
+    ) -> ChargerState:
+        """
+        Follow a vehicle from the current time, replacing what was known of it.
+
+        Call again whenever the vehicle changes outside the loop, e.g. when it
+        is plugged in, an override starts or its schedule is edited.
+
+        Args:
+            vehicle_id: Vehicle to follow
+            battery_state: Its current battery state
+            charger_state: Its current charger state
+            schedule: Its charge schedule
+            car_is_plugged_in: Whether it is plugged in
+
+        Returns:
+            ChargerState: Its charger state now, by the usual charging rules
+        """
+        previous = self._vehicles.get(vehicle_id)
+        vehicle = _Vehicle(
+            battery_state=battery_state,
+            charger_state=charger_state,
+            schedule=schedule,
+            car_is_plugged_in=car_is_plugged_in,
+            updated_at=self.current_time,
+            version=previous.version + 1 if previous else 0,
+        )
+        self._vehicles[vehicle_id] = vehicle
+        self._schedule_next(vehicle_id, vehicle)
+        return vehicle.charger_state
+
+    def remove_vehicle(self, vehicle_id: str) -> None:
+        """
+        Stop following a vehicle. Its queue entry is dropped when popped.
+
+        Args:
+            vehicle_id: Vehicle to forget
+        """
+        self._vehicles.pop(vehicle_id, None)
+
+    def get_state(
+        self, vehicle_id: str, at: Optional[datetime] = None
+    ) -> tuple[BatteryState, ChargerState]:
+        """
+        Get a vehicle's state at a time no later than its next transition.
+
+        Args:
+            vehicle_id: Vehicle to look up
+            at: Time to get the state for (defaults to the current time)
+
+        Returns:
+            tuple[BatteryState, ChargerState]: Battery and charger state
+        """
+        vehicle = self._vehicles[vehicle_id]
+        at = self.current_time if at is None else at
+        return _battery_state_at(vehicle, at), vehicle.charger_state
+
+    def advance(self, now: datetime) -> list[FleetEvent]:
+        """
+        Move the clock forward, applying every transition due by then.
+
+        Args:
+            now: Current time
+
+        Returns:
+            list[FleetEvent]: Changes in charging, in time order
+        """
+        events = []
+        while self._queue and self._queue[0][0] <= now:
+            time, _, vehicle_id, version = heapq.heappop(self._queue)
+            vehicle = self._vehicles.get(vehicle_id)
+            if vehicle is None or vehicle.version != version:
+                continue
+
+            charger_state = vehicle.charger_state
+            was_full = (
+                vehicle.battery_state.current_soc >= vehicle.battery_state.target_soc
+            )
+            vehicle.battery_state = _battery_state_at(vehicle, time)
+            vehicle.updated_at = time
+            vehicle.version += 1
+            self._schedule_next(vehicle_id, vehicle)
+
+            is_full = (
+                vehicle.battery_state.current_soc >= vehicle.battery_state.target_soc
+            )
+            if vehicle.charger_state is not charger_state or is_full != was_full:
+                events.append(
+                    FleetEvent(
+                        time=time,
+                        vehicle_id=vehicle_id,
+                        battery_state=vehicle.battery_state,
+                        charger_state=vehicle.charger_state,
+                    )
+                )
+
+        self.current_time = max(self.current_time, now)
+        return events
+
+    def _schedule_next(self, vehicle_id: str, vehicle: _Vehicle) -> None:
+        """
+        Apply the charging rules from the vehicle's last transition and queue
+        its next one.
+
+        Args:
+            vehicle_id: Vehicle to update
+            vehicle: Its record, as of its last transition
+        """
+        start = vehicle.updated_at
+        charger_state = vehicle.charger_state
+
+        # Instants where the charging rules could give a different answer
+        boundaries = []
+        if vehicle.car_is_plugged_in:
+            boundary = index_schedule(vehicle.schedule).next_transition(start)
+            if boundary is not None:
+                boundaries.append(boundary)
+        if (
+            charger_state.charge_is_override
+            and charger_state.override_end_time
+            and charger_state.override_end_time > start
+        ):
+            boundaries.append(charger_state.override_end_time)
+        next_boundary = min(boundaries, default=None)
+
+        # The rules hold until the next boundary, so ask them halfway there,
+        # clear of the inclusive schedule end at the boundary itself
+        probe = start if next_boundary is None else start + (next_boundary - start) / 2
+        vehicle.charger_state = update_charger_state(
+            charger_state,
+            DemoAdminState(
+                car_is_plugged_in=vehicle.car_is_plugged_in, current_time=probe
+            ),
+            vehicle.schedule,
+        )
+
+        vehicle.full_at = None
+        battery_state = vehicle.battery_state
+        if (
+            vehicle.charger_state.car_is_charging
+            and battery_state.current_soc < battery_state.target_soc
+        ):
+            hours = calculate_charge_duration(
+                vehicle.charger_state.charge_rate_kw,
+                battery_state.current_soc,
+                battery_state.target_soc,
+            )
+            full_at = start + timedelta(hours=float(hours))
+            if full_at <= start:
+                # Closer to the target than the clock can resolve
+                vehicle.battery_state = evolve(
+                    battery_state, current_soc=battery_state.target_soc
+                )
+            else:
+                vehicle.full_at = full_at
+                boundaries.append(full_at)
+
+        next_transition = min(boundaries, default=None)
+        if next_transition is not None:
+            heapq.heappush(
+                self._queue,
+                (next_transition, next(self._sequence), vehicle_id, vehicle.version),
+            )
+
+
+def _battery_state_at(vehicle: _Vehicle, at: datetime) -> BatteryState:
+    """
+    Project a vehicle's battery from its last transition to a later time.
+
+    Args:
+        vehicle: Vehicle record
+        at: Time to project to, no later than its next transition
+
+    Returns:
+        BatteryState: Battery state at that time
+    """
+    battery_state = vehicle.battery_state
+    if vehicle.full_at is not None and at >= vehicle.full_at:
+        # Exactly at the target, whatever the rounding of the charge added
+        return evolve(battery_state, current_soc=battery_state.target_soc)
+
+    return project_battery_state(
+        battery_state,
+        vehicle.charger_state,
+        (at - vehicle.updated_at).total_seconds() / 3600,
+    )
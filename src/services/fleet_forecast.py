@@ -0,0 +1,237 @@
+"""
+Fleet forecasting service for the EV Charge Control Panel.
+Projects future charge for many vehicles at once using NumPy arrays.
+"""
+
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from src.config import FORECAST_PERIODS, PERIOD_MINUTES
+from src.domain.battery import estimate_fleet_time_to_soc, project_soc_trajectory
+from src.domain.charging import charging_masks
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    ForecastFrame,
+)
+from src.domain.schedule import FleetScheduleIndex
+
+
+@dataclass
+class FleetState:
+    """
+    Struct-of-arrays snapshot of many vehicles, one entry per vehicle.
+
+    Attributes:
+        current_soc: Current State of Charge (0.0 to 1.0)
+        target_soc: Target state of charge
+        charge_rate_kw: Charging rate in kW
+        car_is_plugged_in: Whether the car is plugged in
+        charge_is_override: Whether an override is active
+        override_end_time: When the override ends (NaT if none), datetime64[us]
+        schedules: Index of every vehicle's schedule windows
+    """
+
+    current_soc: np.ndarray
+    target_soc: np.ndarray
+    charge_rate_kw: np.ndarray
+    car_is_plugged_in: np.ndarray
+    charge_is_override: np.ndarray
+    override_end_time: np.ndarray
+    schedules: FleetScheduleIndex
+
+    def __len__(self) -> int:
+        return len(self.current_soc)
+
+    def time_to_soc(
+        self, current_time: datetime, to_soc: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Estimate when every vehicle reaches a given state of charge.
+
+        Args:
+            current_time: Current time
+            to_soc: State of charge to reach per vehicle (defaults to the targets)
+
+        Returns:
+            np.ndarray: Times as datetime64[us] (NaT where the level is never
+                reached)
+        """
+        return estimate_fleet_time_to_soc(
+            current_time,
+            self.current_soc,
+            self.target_soc,
+            self.charge_rate_kw,
+            self.car_is_plugged_in,
+            self.charge_is_override,
+            self.override_end_time,
+            self.schedules,
+            to_soc,
+        )
+
+
+@dataclass
+class FleetForecast:
+    """
+    Forecast for many vehicles over a shared time grid.
+
+    Attributes:
+        times: Start of each period, datetime64[us] of shape (T,)
+        soc: State of charge at the end of each period, shape (N, T)
+        is_charging: Whether each car charges in each period, shape (N, T)
+        is_override: Whether charging is from an override, shape (N, T)
+    """
+
+    times: np.ndarray
+    soc: np.ndarray
+    is_charging: np.ndarray
+    is_override: np.ndarray
+
+    def frame(self, index: int) -> ForecastFrame:
+        """
+        Get the forecast for one vehicle as a columnar frame (without copying).
+
+        Args:
+            index: Position of the vehicle in the fleet
+
+        Returns:
+            ForecastFrame: Forecast for that vehicle
+        """
+        return ForecastFrame(
+            times=self.times,
+            soc=self.soc[index],
+            is_charging=self.is_charging[index],
+            is_override=self.is_override[index],
+        )
+
+
+def build_fleet_state(
+    vehicles: Iterable[tuple[BatteryState, ChargerState, ChargeSchedule, bool]],
+) -> FleetState:
+    """
+    Build a fleet state from per-vehicle domain objects.
+
+    Args:
+        vehicles: Battery state, charger state, schedule and plug state per vehicle
+
+    Returns:
+        FleetState: Array snapshot of the vehicles
+    """
+    vehicles = list(vehicles)
+    batteries = [vehicle[0] for vehicle in vehicles]
+    chargers = [vehicle[1] for vehicle in vehicles]
+    schedules = [vehicle[2] for vehicle in vehicles]
+
+    return FleetState(
+        current_soc=np.array([b.current_soc for b in batteries], dtype=float),
+        target_soc=np.array([b.target_soc for b in batteries], dtype=float),
+        charge_rate_kw=np.array([c.charge_rate_kw for c in chargers], dtype=float),
+        car_is_plugged_in=np.array([vehicle[3] for vehicle in vehicles], dtype=bool),
+        charge_is_override=np.array(
+            [c.charge_is_override for c in chargers], dtype=bool
+        ),
+        override_end_time=np.array(
+            [
+                (
+                    np.datetime64(c.override_end_time, "us")
+                    if c.override_end_time
+                    else np.datetime64("NaT", "us")
+                )
+                for c in chargers
+            ],
+            dtype="datetime64[us]",
+        ),
+        schedules=FleetScheduleIndex.from_schedules(schedules),
+    )
+
+
+def forecast_fleet(
+    fleet: FleetState,
+    start_time: datetime,
+    num_periods: int = FORECAST_PERIODS,
+    period_minutes: int = PERIOD_MINUTES,
+) -> FleetForecast:
+    """
+    Project future charge for every vehicle in the fleet in one call.
+
+    Applies the same rules as update_charger_state and project_battery_state,
+    so row i matches what get_future_states would produce for vehicle i.
+
+    Args:
+        fleet: Array snapshot of the vehicles
+        start_time: Time of the first period
+        num_periods: Number of future periods to project
+        period_minutes: Length of each period in minutes
+
+    Returns:
+        FleetForecast: SoC and charging matrices of shape (N, num_periods)
+    """
+    times = np.datetime64(start_time, "us") + np.arange(num_periods) * np.timedelta64(
+        period_minutes, "m"
+    )
+
+    is_charging, is_override = charging_masks(
+        times,
+        fleet.car_is_plugged_in,
+        fleet.charge_is_override,
+        fleet.override_end_time,
+        fleet.schedules,
+    )
+
+    soc = project_soc_trajectory(
+        fleet.current_soc,
+        fleet.target_soc,
+        fleet.charge_rate_kw,
+        is_charging,
+        period_minutes / 60,
+    )
+
+    return FleetForecast(
+        times=times, soc=soc, is_charging=is_charging, is_override=is_override
+    )
+
+
+def advance_fleet_forecast(
+    forecast: FleetForecast,
+    fleet: FleetState,
+    num_periods: int,
+    period_minutes: int = PERIOD_MINUTES,
+) -> FleetForecast:
+    """
+    Shift a forecast forward in time, projecting only the newly exposed periods.
+
+    The new periods continue from the SoC at the end of the existing forecast,
+    so the result matches a full forecast from the new start time whenever
+    the fleet's SoC at that time equals the forecast's.
+
+    Args:
+        forecast: Forecast to advance
+        fleet: Array snapshot the forecast was made from
+        num_periods: Number of periods to advance by
+        period_minutes: Length of each period in minutes
+
+    Returns:
+        FleetForecast: Forecast of the same length starting num_periods later
+    """
+    tail_start = forecast.times[-1] + np.timedelta64(period_minutes, "m")
+    tail = forecast_fleet(
+        replace(fleet, current_soc=forecast.soc[:, -1]),
+        tail_start.item(),
+        num_periods,
+        period_minutes,
+    )
+
+    return FleetForecast(
+        times=np.concatenate([forecast.times[num_periods:], tail.times]),
+        soc=np.concatenate([forecast.soc[:, num_periods:], tail.soc], axis=1),
+        is_charging=np.concatenate(
+            [forecast.is_charging[:, num_periods:], tail.is_charging], axis=1
+        ),
+        is_override=np.concatenate(
+            [forecast.is_override[:, num_periods:], tail.is_override], axis=1
+        ),
+    )
@@ -0,0 +1,322 @@
+"""
+Forecast cache for the EV Charge Control Panel.
+Memoizes forecasts in a bounded LRU cache shared by every session in the process.
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, time
+from typing import Callable, Optional
+
+from src.config import FORECAST_CACHE_MAX_BYTES, FORECAST_CACHE_MAX_ENTRIES
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    ScheduleWindow,
+)
+from src.services.fleet_forecast import FleetForecast
+
+
+@dataclass(frozen=True)
+class ForecastKey:
+    """
+    Canonical snapshot of every input that affects a forecast.
+
+    Attributes:
+        current_soc: Current State of Charge (0.0 to 1.0)
+        target_soc: Target state of charge
+        charge_rate_kw: Charging rate in kW
+        charge_is_override: Whether an override is active
+        override_minutes: Duration of override in minutes
+        override_end_time: When the override ends (None if not in override)
+        schedule_start: Daily schedule start time
+        schedule_end: Daily schedule end time
+        schedule_enabled: Whether the schedule is enabled
+        schedule_windows: Weekly schedule windows (empty for the daily window)
+        car_is_plugged_in: Whether the car is plugged in
+        start_time: Time of the first period
+        num_periods: Number of periods forecast
+    """
+
+    current_soc: float
+    target_soc: float
+    charge_rate_kw: float
+    charge_is_override: bool
+    override_minutes: int
+    override_end_time: Optional[datetime]
+    schedule_start: time
+    schedule_end: time
+    schedule_enabled: bool
+    schedule_windows: tuple[ScheduleWindow, ...]
+    car_is_plugged_in: bool
+    start_time: datetime
+    num_periods: int
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Counters describing how the cache is performing.
+
+    Attributes:
+        hits: Lookups answered from the cache
+        misses: Lookups that had to compute a forecast
+        evictions: Entries dropped to stay within bounds
+        entries: Entries currently cached
+        size_bytes: Bytes currently cached
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size_bytes: int
+
+
+def make_forecast_key(
+    battery_state: BatteryState,
+    charger_state: ChargerState,
+    charge_schedule: ChargeSchedule,
+    car_is_plugged_in: bool,
+    start_time: datetime,
+    num_periods: int,
+) -> ForecastKey:
+    """
+    Build the cache key for a single-car forecast.
+
+    Args:
+        battery_state: Current battery state
+        charger_state: Current charger state
+        charge_schedule: Current charge schedule
+        car_is_plugged_in: Whether the car is plugged in
+        start_time: Time of the first period
+        num_periods: Number of periods to forecast
+
+    Returns:
+        ForecastKey: Hashable snapshot of the forecast inputs
+    """
+    return ForecastKey(
+        current_soc=float(battery_state.current_soc),
+        target_soc=float(battery_state.target_soc),
+        charge_rate_kw=float(charger_state.charge_rate_kw),
+        charge_is_override=bool(charger_state.charge_is_override),
+        override_minutes=int(charger_state.override_minutes),
+        override_end_time=charger_state.override_end_time,
+        schedule_start=charge_schedule.start_time,
+        schedule_end=charge_schedule.end_time,
+        schedule_enabled=bool(charge_schedule.is_enabled),
+        schedule_windows=charge_schedule.windows,
+        car_is_plugged_in=bool(car_is_plugged_in),
+        start_time=start_time,
+        num_periods=num_periods,
+    )
+
+
+def _clockless(key: ForecastKey) -> ForecastKey:
+    """
+    Blank out the inputs that change as the clock moves forward.
+
+    Args:
+        key: Forecast inputs
+
+    Returns:
+        ForecastKey: The key with its start time and SoC blanked
+    """
+    return replace(key, start_time=datetime.min, current_soc=0.0)
+
+
+def _read_only(forecast: FleetForecast) -> FleetForecast:
+    """
+    Wrap a forecast's arrays in read-only views, leaving the arrays themselves
+    writeable for their owner.
+
+    Args:
+        forecast: Forecast to wrap
+
+    Returns:
+        FleetForecast: Forecast sharing the same data through read-only views
+    """
+    views = {}
+    for name in ("times", "soc", "is_charging", "is_override"):
+        view = getattr(forecast, name).view()
+        view.flags.writeable = False
+        views[name] = view
+    return replace(forecast, **views)
+
+
+def _forecast_nbytes(forecast: FleetForecast) -> int:
+    """
+    Calculate the memory held by a forecast's arrays.
+
+    Args:
+        forecast: Forecast to measure
+
+    Returns:
+        int: Size in bytes
+    """
+    return (
+        forecast.times.nbytes
+        + forecast.soc.nbytes
+        + forecast.is_charging.nbytes
+        + forecast.is_override.nbytes
+    )
+
+
+class ForecastCache:
+    """
+    Thread-safe LRU cache of forecasts, bounded by entry count and bytes.
+    Cached forecasts are read-only views because every session shares them.
+
+    Cached keys are also indexed by their inputs other than the clock, so a
+    forecast can be advanced from an earlier one instead of recomputed. Every
+    cached start time is kept, not just the newest, because sessions with the
+    same inputs can run at different clocks.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = FORECAST_CACHE_MAX_ENTRIES,
+        max_bytes: int = FORECAST_CACHE_MAX_BYTES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[ForecastKey, tuple[FleetForecast, int]] = (
+            OrderedDict()
+        )
+        self._by_inputs: dict[ForecastKey, dict[ForecastKey, None]] = {}
+        self._lock = threading.Lock()
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: ForecastKey) -> Optional[FleetForecast]:
+        """
+        Look up a forecast, marking it as most recently used.
+
+        Args:
+            key: Forecast inputs
+
+        Returns:
+            Optional[FleetForecast]: Cached forecast, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def get_previous(
+        self, key: ForecastKey
+    ) -> Optional[tuple[ForecastKey, FleetForecast]]:
+        """
+        Find the newest cached forecast with the same inputs other than the
+        clock that starts before the key does.
+
+        Lookups here do not count as hits or misses, nor mark the entry used.
+
+        Args:
+            key: Forecast inputs
+
+        Returns:
+            Optional[tuple[ForecastKey, FleetForecast]]: Its key and forecast,
+                or None if there is none
+        """
+        with self._lock:
+            earlier = [
+                cached
+                for cached in self._by_inputs.get(_clockless(key), ())
+                if cached.start_time < key.start_time
+            ]
+            if not earlier:
+                return None
+            previous = max(earlier, key=lambda cached: cached.start_time)
+            return previous, self._entries[previous][0]
+
+    def put(self, key: ForecastKey, forecast: FleetForecast) -> None:
+        """
+        Store a forecast, evicting least recently used entries to stay in bounds.
+
+        The cache keeps read-only views of the forecast's arrays rather than
+        copies, so the caller's arrays stay writeable but should not be
+        modified once stored.
+
+        Args:
+            key: Forecast inputs
+            forecast: Forecast to store
+        """
+        size = _forecast_nbytes(forecast)
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        forecast = _read_only(forecast)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous[1]
+
+            self._entries[key] = (forecast, size)
+            self._size_bytes += size
+            self._by_inputs.setdefault(_clockless(key), {})[key] = None
+
+            while (
+                len(self._entries) > self.max_entries
+                or self._size_bytes > self.max_bytes
+            ):
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+                self._evictions += 1
+                clockless = _clockless(evicted_key)
+                del self._by_inputs[clockless][evicted_key]
+                if not self._by_inputs[clockless]:
+                    del self._by_inputs[clockless]
+
+    def get_or_compute(
+        self, key: ForecastKey, compute: Callable[[], FleetForecast]
+    ) -> FleetForecast:
+        """
+        Return the cached forecast for the key, computing and storing it on a miss.
+
+        Args:
+            key: Forecast inputs
+            compute: Produces the forecast when it is not cached
+
+        Returns:
+            FleetForecast: Cached or freshly computed forecast, as read-only views
+        """
+        forecast = self.get(key)
+        if forecast is None:
+            forecast = _read_only(compute())
+            self.put(key, forecast)
+        return forecast
+
+    def clear(self) -> None:
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._by_inputs.clear()
+            self._size_bytes = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """Current hit/miss counters and occupancy."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size_bytes=self._size_bytes,
+            )
+
+
+# Module-level instance shared by every session in the process
+forecast_cache = ForecastCache()
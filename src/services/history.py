@@ -0,0 +1,552 @@
+"""
+History service for the EV Charge Control Panel.
+Records battery and charger snapshots in append-only, memory-mapped columnar files.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional, Sequence
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from src.config import (
+    BATTERY_CAPACITY_KWH,
+    CHART_MAX_POINTS,
+    HISTORY_INDEX_STRIDE,
+    HISTORY_RETENTION_DAYS,
+    HISTORY_ROLLUP_MINUTES,
+)
+from src.domain.models import BatteryState, ChargerState, ForecastFrame
+from src.services.history_rollups import VehicleRollups
+
+# One fixed-width record per snapshot, little-endian so files are portable
+HISTORY_DTYPE = np.dtype(
+    [
+        ("time", "<M8[us]"),
+        ("current_soc", "<f8"),
+        ("target_soc", "<f8"),
+        ("charge_rate_kw", "<f8"),
+        ("car_is_charging", "?"),
+        ("charge_is_override", "?"),
+        ("car_is_plugged_in", "?"),
+    ]
+)
+
+SESSION_DTYPE = np.dtype(
+    [
+        ("start", "<M8[us]"),
+        ("end", "<M8[us]"),
+        ("is_override", "?"),
+        ("start_soc", "<f8"),
+        ("end_soc", "<f8"),
+        ("energy_kwh", "<f8"),
+    ]
+)
+
+HISTORY_SUFFIX = ".history"
+
+
+def snapshot_record(
+    time: datetime,
+    battery_state: BatteryState,
+    charger_state: ChargerState,
+    car_is_plugged_in: bool,
+) -> np.ndarray:
+    """
+    Build a history record from a vehicle's state.
+
+    Args:
+        time: Time of the snapshot
+        battery_state: Battery state at that time
+        charger_state: Charger state from that time on
+        car_is_plugged_in: Whether the car is plugged in
+
+    Returns:
+        np.ndarray: One record of HISTORY_DTYPE, shape (1,)
+    """
+    return np.array(
+        [
+            (
+                np.datetime64(time, "us"),
+                battery_state.current_soc,
+                battery_state.target_soc,
+                charger_state.charge_rate_kw,
+                charger_state.car_is_charging,
+                charger_state.charge_is_override,
+                car_is_plugged_in,
+            )
+        ],
+        dtype=HISTORY_DTYPE,
+    )
+
+
+def history_frame(records: np.ndarray) -> ForecastFrame:
+    """
+    View history records as a frame for plotting.
+
+    Args:
+        records: Records of HISTORY_DTYPE
+
+    Returns:
+        ForecastFrame: Time, SoC and charging state of each record
+    """
+    return ForecastFrame(
+        times=records["time"],
+        soc=records["current_soc"],
+        is_charging=records["car_is_charging"],
+        is_override=records["charge_is_override"],
+    )
+
+
+def rollup_frame(rows: np.ndarray) -> ForecastFrame:
+    """
+    View rollup rows as a frame for plotting.
+
+    Args:
+        rows: Rows of ROLLUP_DTYPE
+
+    Returns:
+        ForecastFrame: Start, mean SoC and whether there was any charging of
+            each bucket
+    """
+    return ForecastFrame(
+        times=rows["start"],
+        soc=rows["mean_soc"],
+        is_charging=(rows["scheduled_minutes"] + rows["override_minutes"]) > 0,
+        is_override=rows["override_minutes"] > 0,
+    )
+
+
+class VehicleHistory:
+    """
+    Thread-safe, append-only history of one vehicle, kept in time order.
+
+    Records are appended to a file of fixed-width records and read back
+    through a read-only memory map, so queries return views of the file
+    rather than copies. A sparse index holds the time of every stride-th
+    record, so a time is found by a binary search of the index and then of
+    one stride of records. Rollups of the records are kept up to date as
+    they are appended, and outlive the records dropped by compaction.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        index_stride: int = HISTORY_INDEX_STRIDE,
+        rollup_minutes: Sequence[int] = HISTORY_ROLLUP_MINUTES,
+    ):
+        self.path = path
+        self.index_stride = index_stride
+        self._lock = threading.Lock()
+
+        with open(path, "ab") as file:
+            # A torn final write leaves part of a record, which is dropped
+            size = file.tell()
+            file.truncate(size - size % HISTORY_DTYPE.itemsize)
+        self._file = open(path, "ab")
+        self._count = os.path.getsize(path) // HISTORY_DTYPE.itemsize
+        self._load()
+
+        self.rollups = VehicleRollups(path, rollup_minutes)
+        if self.rollups.is_complete:
+            self.rollups.resume(self._mapped[-1:])
+        else:
+            self.rollups.rebuild(self._mapped)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """Close the files. Views already returned stay readable."""
+        with self._lock:
+            self._file.close()
+            self.rollups.close()
+
+    def _load(self) -> None:
+        """Map the file's records and index them."""
+        self._mapped = self._map()
+        self._index = np.array(
+            self._mapped["time"][:: self.index_stride], dtype="datetime64[us]"
+        )
+        self._last_time = self._mapped["time"][-1] if self._count else None
+
+    def _map(self) -> np.ndarray:
+        """Map the file's records read-only."""
+        if not self._count:
+            return np.empty(0, dtype=HISTORY_DTYPE)
+        return np.memmap(self.path, dtype=HISTORY_DTYPE, mode="r", shape=(self._count,))
+
+    def records(self) -> np.ndarray:
+        """
+        Get every record, mapping the file again if it has grown.
+
+        Returns:
+            np.ndarray: Read-only view of the records, oldest first
+        """
+        with self._lock:
+            if len(self._mapped) != self._count:
+                self._mapped = self._map()
+            return self._mapped
+
+    def append(self, records: np.ndarray) -> None:
+        """
+        Append records to the history.
+
+        Args:
+            records: Records of HISTORY_DTYPE, in time order and no earlier
+                than the last record
+
+        Raises:
+            ValueError: If the records would put the history out of time order
+        """
+        records = np.asarray(records, dtype=HISTORY_DTYPE)
+        if not len(records):
+            return
+        times = records["time"]
+        if np.any(times[1:] < times[:-1]):
+            raise ValueError("History records must be in time order")
+
+        with self._lock:
+            if self._last_time is not None and times[0] < self._last_time:
+                raise ValueError("History records must not be earlier than the last")
+
+            self._file.write(records.tobytes())
+            self._file.flush()
+
+            # Index the records landing on a stride boundary
+            first = self._count
+            self._count += len(records)
+            on_stride = np.arange(
+                -first % self.index_stride, len(records), self.index_stride
+            )
+            self._index = np.concatenate([self._index, times[on_stride]])
+            self._last_time = times[-1]
+
+            self.rollups.add(records)
+
+    def compact(self, before: datetime) -> int:
+        """
+        Drop the records older than a time, keeping their rollups.
+
+        The newest record is always kept, as it holds the current state.
+        Views already returned keep the dropped records readable.
+
+        Args:
+            before: Time before which records are dropped
+
+        Returns:
+            int: Number of records dropped
+        """
+        with self._lock:
+            records = self._map()
+            dropped = min(
+                self._position(
+                    records, self._index, np.datetime64(before, "us"), "left"
+                ),
+                self._count - 1,
+            )
+            if dropped <= 0:
+                return 0
+
+            # Written aside and swapped in, so a crash leaves one whole file
+            compacted = f"{self.path}.compact"
+            records[dropped:].tofile(compacted)
+            self._file.close()
+            os.replace(compacted, self.path)
+            self._file = open(self.path, "ab")
+            self._count -= dropped
+            self._load()
+            return dropped
+
+    def _position(
+        self, records: np.ndarray, index: np.ndarray, time: np.datetime64, side: str
+    ) -> int:
+        """Find where a time falls among the records, through the sparse index."""
+        block = int(np.searchsorted(index, time, side=side))
+        low = max(block - 1, 0) * self.index_stride
+        high = min(block * self.index_stride, len(records))
+        return low + int(np.searchsorted(records["time"][low:high], time, side=side))
+
+    def range(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> np.ndarray:
+        """
+        Get the records from start (inclusive) to end (exclusive).
+
+        Args:
+            start: Earliest time (defaults to the first record)
+            end: Time to stop before (defaults to after the last record)
+
+        Returns:
+            np.ndarray: Read-only view of the records in the range
+        """
+        records = self.records()
+        low, high = self._bounds(records, start, end)
+        return records[low:high]
+
+    def _bounds(
+        self,
+        records: np.ndarray,
+        start: Optional[datetime],
+        end: Optional[datetime],
+    ) -> tuple[int, int]:
+        """Positions of the first record in a range and the one after the last."""
+        # The index may have grown since the records were mapped
+        index = self._index[: -(-len(records) // self.index_stride)]
+        low = (
+            0
+            if start is None
+            else self._position(records, index, np.datetime64(start, "us"), "left")
+        )
+        high = (
+            len(records)
+            if end is None
+            else self._position(records, index, np.datetime64(end, "us"), "left")
+        )
+        return low, max(low, high)
+
+    def sessions(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> np.ndarray:
+        """
+        Get the charging sessions recorded from start to end.
+
+        A session is a run of records charging from the same source, and lasts
+        until the next record, or the last record while it is still running.
+
+        Args:
+            start: Earliest time (defaults to the first record)
+            end: Time to stop before (defaults to after the last record)
+
+        Returns:
+            np.ndarray: Sessions of SESSION_DTYPE, oldest first
+        """
+        records = self.records()
+        low, high = self._bounds(records, start, end)
+        if low == high:
+            return np.empty(0, dtype=SESSION_DTYPE)
+
+        # The record after the range closes a session running at its end
+        window = records[low : min(high + 1, len(records))]
+        in_range = high - low
+
+        # 0 = not charging, 1 = scheduled, 2 = override
+        kind = window["car_is_charging"][:in_range] * (
+            1 + window["charge_is_override"][:in_range].astype(np.int8)
+        )
+        boundaries = np.flatnonzero(np.diff(kind)) + 1
+        starts = np.concatenate([[0], boundaries])
+        starts = starts[kind[starts] > 0]
+        ends = np.concatenate([boundaries, [in_range]])
+        ends = np.minimum(ends[kind[ends - 1] > 0], len(window) - 1)
+
+        sessions = np.empty(len(starts), dtype=SESSION_DTYPE)
+        sessions["start"] = window["time"][starts]
+        sessions["end"] = window["time"][ends]
+        sessions["is_override"] = kind[starts] == 2
+        sessions["start_soc"] = window["current_soc"][starts]
+        sessions["end_soc"] = window["current_soc"][ends]
+        sessions["energy_kwh"] = (
+            sessions["end_soc"] - sessions["start_soc"]
+        ) * BATTERY_CAPACITY_KWH
+        return sessions
+
+    def rollup(
+        self, start: datetime, end: datetime, max_points: int = CHART_MAX_POINTS
+    ) -> np.ndarray:
+        """
+        Get the summaries from start to end in the finest tier that fits.
+
+        Args:
+            start: Earliest time
+            end: Time to stop before
+            max_points: Most buckets wanted
+
+        Returns:
+            np.ndarray: Rows of ROLLUP_DTYPE, oldest first
+        """
+        start, end = np.datetime64(start, "us"), np.datetime64(end, "us")
+        with self._lock:
+            return self.rollups.choose_tier(start, end, max_points).range(start, end)
+
+    def frame(
+        self, start: datetime, end: datetime, max_points: int = CHART_MAX_POINTS
+    ) -> ForecastFrame:
+        """
+        Get the history from start to end for plotting.
+
+        The records themselves are used when they cover the range in at most
+        max_points, so long views read rollups instead of scanning records.
+
+        Args:
+            start: Earliest time
+            end: Time to stop before
+            max_points: Most points wanted
+
+        Returns:
+            ForecastFrame: Records or bucket summaries in the range
+        """
+        records = self.records()
+        low, high = self._bounds(records, start, end)
+        covered = len(records) and records["time"][0] <= np.datetime64(start, "us")
+        if covered and high - low <= max_points:
+            return history_frame(records[low:high])
+        return rollup_frame(self.rollup(start, end, max_points))
+
+
+class HistoryStore:
+    """
+    Thread-safe directory of vehicle histories, one file per vehicle.
+
+    Histories looked up by vehicle stay open for reuse. Fleet-wide queries
+    and compaction only open each vehicle for as long as they use it, since
+    every open history holds a file per rollup tier as well as its own.
+    """
+
+    def __init__(self, directory: str, index_stride: int = HISTORY_INDEX_STRIDE):
+        self.directory = directory
+        self.index_stride = index_stride
+        self._vehicles: dict[str, VehicleHistory] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def close(self) -> None:
+        """Close every vehicle's file."""
+        with self._lock:
+            for history in self._vehicles.values():
+                history.close()
+            self._vehicles.clear()
+
+    def vehicle_ids(self) -> list[str]:
+        """
+        List the vehicles with a history.
+
+        Returns:
+            list[str]: Vehicle IDs, sorted
+        """
+        return sorted(
+            unquote(name[: -len(HISTORY_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(HISTORY_SUFFIX)
+        )
+
+    def _path(self, vehicle_id: str) -> str:
+        """Get the path of a vehicle's history file."""
+        # Quoted so any ID makes a single, safe file name
+        return os.path.join(self.directory, quote(vehicle_id, safe="") + HISTORY_SUFFIX)
+
+    def vehicle(self, vehicle_id: str) -> VehicleHistory:
+        """
+        Get a vehicle's history, creating it if there is none.
+
+        Args:
+            vehicle_id: Vehicle to look up
+
+        Returns:
+            VehicleHistory: The vehicle's history
+        """
+        with self._lock:
+            history = self._vehicles.get(vehicle_id)
+            if history is None:
+                history = VehicleHistory(self._path(vehicle_id), self.index_stride)
+                self._vehicles[vehicle_id] = history
+            return history
+
+    @contextmanager
+    def _borrow(self, vehicle_id: str) -> Iterator[VehicleHistory]:
+        """
+        Use a vehicle's history, opening it only for the duration if it is not
+        already open. The store is locked meanwhile, so the vehicle cannot be
+        opened a second time while it is in use.
+
+        Args:
+            vehicle_id: Vehicle to use
+
+        Yields:
+            VehicleHistory: The vehicle's history
+        """
+        with self._lock:
+            history = self._vehicles.get(vehicle_id)
+            if history is not None:
+                yield history
+                return
+
+            history = VehicleHistory(self._path(vehicle_id), self.index_stride)
+            try:
+                yield history
+            finally:
+                history.close()
+
+    def record(
+        self,
+        vehicle_id: str,
+        time: datetime,
+        battery_state: BatteryState,
+        charger_state: ChargerState,
+        car_is_plugged_in: bool,
+    ) -> None:
+        """
+        Append a snapshot of a vehicle's state to its history.
+
+        Args:
+            vehicle_id: Vehicle to record
+            time: Time of the snapshot, no earlier than its last
+            battery_state: Battery state at that time
+            charger_state: Charger state from that time on
+            car_is_plugged_in: Whether the car is plugged in
+        """
+        self.vehicle(vehicle_id).append(
+            snapshot_record(time, battery_state, charger_state, car_is_plugged_in)
+        )
+
+    def compact(
+        self,
+        now: datetime,
+        retention: timedelta = timedelta(days=HISTORY_RETENTION_DAYS),
+    ) -> int:
+        """
+        Drop every vehicle's records older than the retention window.
+
+        Args:
+            now: Current time
+            retention: How long records are kept
+
+        Returns:
+            int: Number of records dropped
+        """
+        dropped = 0
+        for vehicle_id in self.vehicle_ids():
+            with self._borrow(vehicle_id) as history:
+                dropped += history.compact(now - retention)
+        return dropped
+
+    def sessions(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        is_override: Optional[bool] = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        Get every vehicle's charging sessions from start to end.
+
+        Args:
+            start: Earliest time (defaults to the first record)
+            end: Time to stop before (defaults to after the last record)
+            is_override: Only override (True) or scheduled (False) sessions,
+                or both (None)
+
+        Returns:
+            dict[str, np.ndarray]: Sessions of each vehicle that has any
+        """
+        found = {}
+        for vehicle_id in self.vehicle_ids():
+            with self._borrow(vehicle_id) as history:
+                sessions = history.sessions(start, end)
+            if is_override is not None:
+                sessions = sessions[sessions["is_override"] == is_override]
+            if len(sessions):
+                found[vehicle_id] = sessions
+        return found
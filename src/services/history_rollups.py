@@ -0,0 +1,320 @@
+"""
+History rollup service for the EV Charge Control Panel.
+Keeps coarser summaries of a vehicle's history up to date as records are appended.
+"""
+
+import os
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.config import BATTERY_CAPACITY_KWH, HISTORY_ROLLUP_MINUTES
+
+# One row per bucket of a tier, little-endian like the raw history
+ROLLUP_DTYPE = np.dtype(
+    [
+        ("start", "<M8[us]"),
+        ("samples", "<i8"),
+        ("min_soc", "<f8"),
+        ("max_soc", "<f8"),
+        ("mean_soc", "<f8"),
+        ("energy_kwh", "<f8"),
+        ("scheduled_minutes", "<f8"),
+        ("override_minutes", "<f8"),
+    ]
+)
+
+
+def merge_rollup_rows(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Combine two summaries of the same buckets.
+
+    Args:
+        first: Rows of ROLLUP_DTYPE
+        second: Rows of ROLLUP_DTYPE for the same buckets
+
+    Returns:
+        np.ndarray: Rows summarizing both
+    """
+    merged = first.copy()
+    merged["samples"] = first["samples"] + second["samples"]
+    merged["min_soc"] = np.fmin(first["min_soc"], second["min_soc"])
+    merged["max_soc"] = np.fmax(first["max_soc"], second["max_soc"])
+    with np.errstate(invalid="ignore"):
+        merged["mean_soc"] = (
+            np.nan_to_num(first["mean_soc"]) * first["samples"]
+            + np.nan_to_num(second["mean_soc"]) * second["samples"]
+        ) / merged["samples"]
+    for column in ("energy_kwh", "scheduled_minutes", "override_minutes"):
+        merged[column] = first[column] + second[column]
+    return merged
+
+
+def summarize_buckets(
+    bucket_width: np.timedelta64,
+    sample_times: np.ndarray,
+    sample_soc: np.ndarray,
+    interval_starts: np.ndarray,
+    interval_ends: np.ndarray,
+    interval_energy_kwh: np.ndarray,
+    interval_is_override: np.ndarray,
+) -> np.ndarray:
+    """
+    Summarize samples and charging intervals into buckets of one width.
+
+    Intervals crossing bucket boundaries are split between the buckets, with
+    energy shared in proportion to time.
+
+    Args:
+        bucket_width: Width of each bucket
+        sample_times: Time of each SoC sample, datetime64[us]
+        sample_soc: State of charge of each sample
+        interval_starts: Start of each charging interval, datetime64[us]
+        interval_ends: End of each charging interval, after its start
+        interval_energy_kwh: Energy delivered in each interval
+        interval_is_override: Whether each interval charges from an override
+
+    Returns:
+        np.ndarray: One row of ROLLUP_DTYPE per bucket touched, oldest first
+    """
+    width = bucket_width.astype("timedelta64[us]").astype(np.int64)
+    starts = interval_starts.astype(np.int64)
+    ends = interval_ends.astype(np.int64)
+
+    # Split each interval into one piece per bucket it touches
+    first_bucket = starts // width
+    num_pieces = (ends - 1) // width - first_bucket + 1
+    owner = np.repeat(np.arange(len(starts)), num_pieces)
+    piece_bucket = first_bucket[owner] + (
+        np.arange(len(owner))
+        - np.repeat(np.cumsum(num_pieces) - num_pieces, num_pieces)
+    )
+    piece_length = np.minimum(ends[owner], (piece_bucket + 1) * width) - np.maximum(
+        starts[owner], piece_bucket * width
+    )
+    piece_energy = interval_energy_kwh[owner] * piece_length / (ends - starts)[owner]
+    piece_minutes = piece_length / 60_000_000
+    piece_is_override = interval_is_override[owner]
+
+    sample_bucket = sample_times.astype(np.int64) // width
+    buckets, inverse = np.unique(
+        np.concatenate([sample_bucket, piece_bucket]), return_inverse=True
+    )
+    sample_row = inverse[: len(sample_bucket)]
+    piece_row = inverse[len(sample_bucket) :]
+    num_rows = len(buckets)
+
+    rows = np.empty(num_rows, dtype=ROLLUP_DTYPE)
+    rows["start"] = (buckets * width).astype("datetime64[us]")
+    rows["samples"] = np.bincount(sample_row, minlength=num_rows)
+    rows["min_soc"] = np.nan
+    rows["max_soc"] = np.nan
+    if len(sample_row):
+        # Samples are in time order, so each bucket's samples are contiguous
+        first = np.flatnonzero(np.diff(sample_row, prepend=-1))
+        rows["min_soc"][sample_row[first]] = np.minimum.reduceat(sample_soc, first)
+        rows["max_soc"][sample_row[first]] = np.maximum.reduceat(sample_soc, first)
+    with np.errstate(invalid="ignore"):
+        rows["mean_soc"] = (
+            np.bincount(sample_row, sample_soc, minlength=num_rows) / rows["samples"]
+        )
+    rows["energy_kwh"] = np.bincount(piece_row, piece_energy, minlength=num_rows)
+    rows["scheduled_minutes"] = np.bincount(
+        piece_row, np.where(piece_is_override, 0.0, piece_minutes), minlength=num_rows
+    )
+    rows["override_minutes"] = np.bincount(
+        piece_row, np.where(piece_is_override, piece_minutes, 0.0), minlength=num_rows
+    )
+    return rows
+
+
+class RollupTier:
+    """
+    Summaries of a history in buckets of one width, oldest first.
+
+    Only the newest bucket can still change, so the tier's file is appended
+    to and its last row rewritten in place.
+    """
+
+    def __init__(self, path: str, minutes: int):
+        self.path = path
+        self.minutes = minutes
+        self.width = np.timedelta64(minutes, "m")
+
+        self.is_new = not os.path.exists(path)
+        self._file = open(path, "w+b" if self.is_new else "r+b")
+        size = os.path.getsize(path)
+        # A torn final write leaves part of a row, which is dropped
+        self._file.truncate(size - size % ROLLUP_DTYPE.itemsize)
+        self._rows = np.fromfile(path, dtype=ROLLUP_DTYPE)
+        self._size = len(self._rows)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        self._file.close()
+
+    def clear(self) -> None:
+        """Remove every row."""
+        self._file.truncate(0)
+        self._size = 0
+
+    def rows(self) -> np.ndarray:
+        """
+        Get every row.
+
+        Returns:
+            np.ndarray: Rows of ROLLUP_DTYPE (a view, valid until the next add)
+        """
+        return self._rows[: self._size]
+
+    def range(self, start: np.datetime64, end: np.datetime64) -> np.ndarray:
+        """
+        Get a copy of the rows of buckets overlapping start to end.
+
+        Args:
+            start: Earliest time, datetime64[us]
+            end: Time to stop before, datetime64[us]
+
+        Returns:
+            np.ndarray: Rows of ROLLUP_DTYPE, oldest first
+        """
+        starts = self.rows()["start"]
+        low = np.searchsorted(starts, start - self.width, side="right")
+        high = np.searchsorted(starts, end, side="left")
+        return self.rows()[low:high].copy()
+
+    def add(self, rows: np.ndarray) -> None:
+        """
+        Add summaries of buckets no older than the newest one.
+
+        Args:
+            rows: Rows of ROLLUP_DTYPE, oldest first
+        """
+        if not len(rows):
+            return
+        rewrite_from = self._size
+        if self._size and rows["start"][0] == self._rows["start"][self._size - 1]:
+            self._rows[self._size - 1] = merge_rollup_rows(
+                self._rows[self._size - 1 : self._size], rows[:1]
+            )[0]
+            rewrite_from -= 1
+            rows = rows[1:]
+
+        if self._size + len(rows) > len(self._rows):
+            # Grow by doubling, so appends stay cheap on average
+            grown = np.empty(
+                max(2 * len(self._rows), self._size + len(rows)), dtype=ROLLUP_DTYPE
+            )
+            grown[: self._size] = self._rows[: self._size]
+            self._rows = grown
+        self._rows[self._size : self._size + len(rows)] = rows
+        self._size += len(rows)
+
+        self._file.seek(rewrite_from * ROLLUP_DTYPE.itemsize)
+        self._file.write(self._rows[rewrite_from : self._size].tobytes())
+        self._file.flush()
+
+
+class VehicleRollups:
+    """
+    Tiers of summaries of one vehicle's history, finest first.
+
+    Each record's SoC is a sample of the bucket it falls in. The time from a
+    record to the next, charging as the record says, is split between the
+    buckets it covers. The newest record's time is only counted once the
+    next one arrives.
+    """
+
+    def __init__(
+        self, base_path: str, tier_minutes: Sequence[int] = HISTORY_ROLLUP_MINUTES
+    ):
+        self.tiers = [
+            RollupTier(f"{base_path}.{minutes}m", minutes)
+            for minutes in sorted(tier_minutes)
+        ]
+        # Newest record added, whose time since is not yet counted
+        self._last: Optional[np.ndarray] = None
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether every tier was found on disk."""
+        return not any(tier.is_new for tier in self.tiers)
+
+    def close(self) -> None:
+        for tier in self.tiers:
+            tier.close()
+
+    def resume(self, last_record: np.ndarray) -> None:
+        """
+        Carry on from records already summarized.
+
+        Args:
+            last_record: Newest record summarized, shape (1,) or (0,)
+        """
+        self._last = last_record.copy() if len(last_record) else None
+
+    def rebuild(self, records: np.ndarray) -> None:
+        """
+        Summarize a whole history again from its records.
+
+        Args:
+            records: Every record of the history, oldest first
+        """
+        for tier in self.tiers:
+            tier.clear()
+        self._last = None
+        self.add(records)
+
+    def add(self, records: np.ndarray) -> None:
+        """
+        Summarize records appended to the history.
+
+        Args:
+            records: History records, oldest first and no older than the last
+        """
+        if not len(records):
+            return
+        sequence = (
+            records if self._last is None else np.concatenate([self._last, records])
+        )
+
+        # Intervals from each record to the next, while charging
+        times = sequence["time"]
+        soc = sequence["current_soc"]
+        charging = sequence["car_is_charging"][:-1] & (times[1:] > times[:-1])
+        energy_kwh = np.maximum(np.diff(soc), 0.0) * BATTERY_CAPACITY_KWH
+
+        for tier in self.tiers:
+            tier.add(
+                summarize_buckets(
+                    tier.width,
+                    records["time"],
+                    records["current_soc"],
+                    times[:-1][charging],
+                    times[1:][charging],
+                    energy_kwh[charging],
+                    sequence["charge_is_override"][:-1][charging],
+                )
+            )
+        self._last = records[-1:].copy()
+
+    def choose_tier(
+        self, start: np.datetime64, end: np.datetime64, max_points: int
+    ) -> RollupTier:
+        """
+        Pick the finest tier with at most max_points buckets from start to end.
+
+        Args:
+            start: Earliest time, datetime64[us]
+            end: Time to stop before, datetime64[us]
+            max_points: Most buckets wanted
+
+        Returns:
+            RollupTier: Finest tier that fits, or the coarsest
+        """
+        for tier in self.tiers:
+            if (end - start) / tier.width <= max_points:
+                return tier
+        return self.tiers[-1]
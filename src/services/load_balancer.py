@@ -0,0 +1,405 @@
+"""
+Load balancing service for the EV Charge Control Panel.
+Shares a site's grid connection between many chargers under circuit power caps.
+"""
+
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from src.config import FORECAST_PERIODS, LOAD_BALANCE_HORIZON_HOURS, PERIOD_MINUTES
+from src.domain.battery import calculate_charge_added, calculate_energy_to_soc
+from src.domain.charging import charging_masks
+from src.services.fleet_forecast import FleetForecast, FleetState
+
+
+@dataclass
+class SiteLayout:
+    """
+    Tree of circuits sharing a site's grid connection.
+
+    Circuit 0 is the grid connection, and every other circuit hangs off one
+    listed before it, so parents always come before their children.
+
+    Attributes:
+        cap_kw: Power limit of each circuit in kW, shape (C,)
+        parent: Parent of each circuit (-1 for the grid connection), shape (C,)
+        circuit: Circuit each charger is on, shape (N,)
+    """
+
+    cap_kw: np.ndarray
+    parent: np.ndarray
+    circuit: np.ndarray
+
+    @classmethod
+    def single_circuit(cls, cap_kw: float, num_chargers: int) -> "SiteLayout":
+        """
+        Build a site with every charger directly on the grid connection.
+
+        Args:
+            cap_kw: Power limit of the grid connection in kW
+            num_chargers: Number of chargers
+
+        Returns:
+            SiteLayout: Site with one circuit
+        """
+        return cls(
+            cap_kw=np.array([cap_kw], dtype=float),
+            parent=np.array([-1]),
+            circuit=np.zeros(num_chargers, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_circuits(
+        cls,
+        circuits: Sequence[tuple[float, Optional[int]]],
+        charger_circuits: Sequence[int],
+    ) -> "SiteLayout":
+        """
+        Build a site from its circuits.
+
+        Args:
+            circuits: Power limit and parent index of each circuit, parents
+                first, with the grid connection (parent None) first of all
+            charger_circuits: Circuit each charger is on
+
+        Returns:
+            SiteLayout: Site with the given circuits
+
+        Raises:
+            ValueError: If a circuit's parent is not listed before it
+        """
+        parent = np.array([-1 if p is None else p for _, p in circuits])
+        if (
+            parent[0] != -1
+            or np.any(parent[1:] < 0)
+            or np.any(parent[1:] >= np.arange(1, len(parent)))
+        ):
+            raise ValueError("Circuits must be listed parents first, grid first")
+
+        return cls(
+            cap_kw=np.array([cap for cap, _ in circuits], dtype=float),
+            parent=parent,
+            circuit=np.asarray(charger_circuits, dtype=np.int64),
+        )
+
+    def chargers_by_circuit(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Group the chargers by circuit.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Charger indices ordered by circuit,
+                and the offset of each circuit's first one in them, shape (C + 1,)
+        """
+        return _group_by(self.circuit, len(self.cap_kw))
+
+    def children_by_circuit(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Group the sub-circuits by the circuit they hang off.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Circuit indices ordered by parent,
+                and the offset of each circuit's first child in them, shape (C + 1,)
+        """
+        children, offsets = _group_by(self.parent[1:], len(self.cap_kw))
+        return children + 1, offsets
+
+
+def _group_by(keys: np.ndarray, num_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Group indices by key, in compressed sparse row form.
+
+    Group g holds indices[offsets[g] : offsets[g + 1]], in increasing order.
+
+    Args:
+        keys: Group of each index, from 0 to num_groups - 1
+        num_groups: Number of groups
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Indices ordered by group, and the offset
+            of each group in them, shape (num_groups + 1,)
+    """
+    indices = np.argsort(keys, kind="stable")
+    offsets = np.searchsorted(keys[indices], np.arange(num_groups + 1))
+    return indices, offsets
+
+
+def water_fill(demand: np.ndarray, weight: np.ndarray, capacity: float) -> np.ndarray:
+    """
+    Share a capacity between demands by weighted water-filling.
+
+    Every demand gets weight times a common level, capped at the demand, with
+    the level raised until the capacity is used up. Demands that are met free
+    their share for the rest, so nothing is wasted.
+
+    Args:
+        demand: Power each consumer can draw, shape (M,)
+        weight: Share of each consumer, positive wherever there is demand
+        capacity: Power to share
+
+    Returns:
+        np.ndarray: Power given to each consumer, shape (M,)
+    """
+    demand = np.maximum(demand, 0.0)
+    if demand.sum() <= capacity:
+        return demand
+
+    # Consumers are saturated in order of the level at which they are met
+    wanting = np.flatnonzero(demand > 0)
+    saturation = demand[wanting] / weight[wanting]
+    order = np.argsort(saturation)
+    levels = saturation[order]
+    demands = demand[wanting][order]
+    weights = weight[wanting][order]
+
+    # Power used at each consumer's saturation level: everyone before it is
+    # met, and everyone from it on gets weight times the level
+    met = np.concatenate([[0.0], np.cumsum(demands)[:-1]])
+    unmet_weight = np.cumsum(weights[::-1])[::-1]
+    used = met + levels * unmet_weight
+
+    # The last consumer is never met, as the demands add up to more than the
+    # capacity, but rounding can make it look so
+    first_unmet = min(np.searchsorted(used, capacity, side="right"), len(used) - 1)
+    level = (capacity - met[first_unmet]) / unmet_weight[first_unmet]
+
+    allocation = np.zeros_like(demand)
+    allocation[wanting] = np.minimum(demand[wanting], weight[wanting] * level)
+    return allocation
+
+
+def allocate_power(
+    demand_kw: np.ndarray, weight: np.ndarray, site: SiteLayout
+) -> np.ndarray:
+    """
+    Share power between chargers without exceeding any circuit's limit.
+
+    Each circuit's power is water-filled between its own chargers and its
+    sub-circuits, where a sub-circuit asks for what its chargers want up to
+    its limit and weighs as much as its chargers together.
+
+    Args:
+        demand_kw: Power each charger can draw in kW, shape (N,)
+        weight: Priority of each charger, positive wherever there is demand
+        site: Circuits the chargers are on
+
+    Returns:
+        np.ndarray: Power given to each charger in kW, shape (N,)
+    """
+    num_circuits = len(site.cap_kw)
+    demand_kw = np.maximum(demand_kw, 0.0)
+    weight = np.where(demand_kw > 0, weight, 0.0)
+
+    # What each circuit could use and how much it weighs, leaves first
+    circuit_demand = np.bincount(site.circuit, demand_kw, minlength=num_circuits)
+    circuit_weight = np.bincount(site.circuit, weight, minlength=num_circuits)
+    for child in range(num_circuits - 1, 0, -1):
+        circuit_demand[child] = min(circuit_demand[child], site.cap_kw[child])
+        circuit_demand[site.parent[child]] += circuit_demand[child]
+        circuit_weight[site.parent[child]] += circuit_weight[child]
+
+    # Share each circuit's power between its chargers and sub-circuits, root
+    # first, grouping both by circuit once rather than searching per circuit
+    charger_order, charger_offsets = site.chargers_by_circuit()
+    child_order, child_offsets = site.children_by_circuit()
+    allocation = np.zeros_like(demand_kw)
+    circuit_power = np.zeros(num_circuits)
+    circuit_power[0] = min(circuit_demand[0], site.cap_kw[0])
+    for circuit in range(num_circuits):
+        chargers = charger_order[
+            charger_offsets[circuit] : charger_offsets[circuit + 1]
+        ]
+        children = child_order[child_offsets[circuit] : child_offsets[circuit + 1]]
+        shares = water_fill(
+            np.concatenate([demand_kw[chargers], circuit_demand[children]]),
+            np.concatenate([weight[chargers], circuit_weight[children]]),
+            circuit_power[circuit],
+        )
+        allocation[chargers] = shares[: len(chargers)]
+        circuit_power[children] = shares[len(chargers) :]
+
+    return allocation
+
+
+def charging_priority(
+    fleet: FleetState,
+    current_time: datetime,
+    departure_time: Union[datetime, np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    Weigh each car by the power it needs to reach its target by departure.
+
+    The more energy a car is short of its target and the sooner it leaves,
+    the larger its share when power runs short.
+
+    Args:
+        fleet: Array snapshot of the vehicles
+        current_time: Current time
+        departure_time: When each car leaves, shared or shape (N,) (NaT or None
+            for cars without one, which are given LOAD_BALANCE_HORIZON_HOURS)
+
+    Returns:
+        np.ndarray: Average power in kW each car needs, shape (N,)
+    """
+    now = np.datetime64(current_time, "us")
+    if departure_time is None:
+        departure_time = np.datetime64("NaT", "us")
+    departure = np.broadcast_to(
+        np.asarray(departure_time, dtype="datetime64[us]"), (len(fleet),)
+    )
+
+    no_departure = np.isnat(departure)
+    hours_left = np.where(
+        no_departure,
+        LOAD_BALANCE_HORIZON_HOURS,
+        (np.where(no_departure, now, departure) - now) / np.timedelta64(1, "h"),
+    )
+    # Cars past their departure are the most urgent, not infinitely so
+    hours_left = np.maximum(hours_left, 1 / 60)
+
+    shortfall_kwh = calculate_energy_to_soc(fleet.current_soc, fleet.target_soc)
+    return shortfall_kwh / hours_left
+
+
+@dataclass
+class BalancedForecast:
+    """
+    Forecast for a fleet sharing a site's power.
+
+    Attributes:
+        forecast: SoC and charging matrices of shape (N, T)
+        power_kw: Power given to each car in each period, shape (N, T)
+    """
+
+    forecast: FleetForecast
+    power_kw: np.ndarray
+
+
+def balance_fleet(
+    fleet: FleetState,
+    site: SiteLayout,
+    current_time: datetime,
+    departure_time: Union[datetime, np.ndarray, None] = None,
+) -> np.ndarray:
+    """
+    Share the site's power between the cars charging now.
+
+    Cheap enough to rerun on every plug-in, override or schedule change.
+
+    Args:
+        fleet: Array snapshot of the vehicles
+        site: Circuits the chargers are on
+        current_time: Current time
+        departure_time: When each car leaves (see charging_priority)
+
+    Returns:
+        np.ndarray: Power given to each charger in kW, shape (N,)
+    """
+    is_charging, _ = charging_masks(
+        np.array([np.datetime64(current_time, "us")]),
+        fleet.car_is_plugged_in,
+        fleet.charge_is_override,
+        fleet.override_end_time,
+        fleet.schedules,
+    )
+    demand_kw = np.where(
+        is_charging[:, 0] & (fleet.current_soc < fleet.target_soc),
+        fleet.charge_rate_kw,
+        0.0,
+    )
+    return allocate_power(
+        demand_kw, charging_priority(fleet, current_time, departure_time), site
+    )
+
+
+def forecast_balanced_fleet(
+    fleet: FleetState,
+    site: SiteLayout,
+    start_time: datetime,
+    num_periods: int = FORECAST_PERIODS,
+    period_minutes: int = PERIOD_MINUTES,
+    departure_time: Union[datetime, np.ndarray, None] = None,
+) -> BalancedForecast:
+    """
+    Project future charge for a fleet sharing a site's power.
+
+    Power is reallocated at the start of every period, as cars reach their
+    targets, overrides expire and schedules open and close. Charging follows
+    the same rules as forecast_fleet, at the power each car is given, except
+    that cars at their target no longer count as charging. A car that will
+    reach its target within a period only asks for the power it needs, so the
+    rest of its share goes to the other chargers straight away.
+
+    Args:
+        fleet: Array snapshot of the vehicles
+        site: Circuits the chargers are on
+        start_time: Time of the first period
+        num_periods: Number of future periods to project
+        period_minutes: Length of each period in minutes
+        departure_time: When each car leaves (see charging_priority)
+
+    Returns:
+        BalancedForecast: Forecast and power of shape (N, num_periods)
+    """
+    times = np.datetime64(start_time, "us") + np.arange(num_periods) * np.timedelta64(
+        period_minutes, "m"
+    )
+    is_charging, is_override = charging_masks(
+        times,
+        fleet.car_is_plugged_in,
+        fleet.charge_is_override,
+        fleet.override_end_time,
+        fleet.schedules,
+    )
+
+    soc = np.empty((len(fleet), num_periods))
+    power_kw = np.zeros((len(fleet), num_periods))
+    period_hours = period_minutes / 60
+    current_soc = fleet.current_soc
+    for period in range(num_periods):
+        is_charging[:, period] &= current_soc < fleet.target_soc
+        needed_kw = (
+            calculate_energy_to_soc(current_soc, fleet.target_soc) / period_hours
+        )
+        demand_kw = np.where(
+            is_charging[:, period], np.minimum(fleet.charge_rate_kw, needed_kw), 0.0
+        )
+        power_kw[:, period] = allocate_power(
+            demand_kw,
+            charging_priority(
+                replace(fleet, current_soc=current_soc),
+                times[period].item(),
+                departure_time,
+            ),
+            site,
+        )
+        # Cars given all they needed land exactly on their target, whatever
+        # the rounding, so they are not asked to charge again
+        current_soc = np.where(
+            power_kw[:, period] > 0,
+            np.where(
+                power_kw[:, period] >= needed_kw,
+                fleet.target_soc,
+                np.minimum(
+                    current_soc
+                    + calculate_charge_added(power_kw[:, period], period_hours),
+                    fleet.target_soc,
+                ),
+            ),
+            current_soc,
+        )
+        soc[:, period] = current_soc
+
+    is_override &= is_charging
+
+    return BalancedForecast(
+        forecast=FleetForecast(
+            times=times,
+            soc=soc,
+            is_charging=is_charging,
+            is_override=is_override,
+        ),
+        power_kw=power_kw,
+    )
@@ -0,0 +1,212 @@
+"""
+Override expiry service for the EV Charge Control Panel.
+Fires override deadlines across a fleet from a hashed timing wheel, without polling.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from src.config import OVERRIDE_WHEEL_SLOTS, OVERRIDE_WHEEL_TICK_SECONDS
+from src.domain.charging import (
+    start_override_charge,
+    stop_override_charge,
+    update_charger_state,
+)
+from src.domain.models import ChargeSchedule, ChargerState, DemoAdminState
+
+
+class TimingWheel:
+    """
+    Thread-safe hashed timing wheel of deadlines, one per vehicle.
+
+    Deadlines are hashed into a ring of slots by the tick they fall in, so
+    registering and cancelling are O(1) and advancing the clock only visits
+    the slots of the ticks that passed. Deadlines more than one turn of the
+    wheel away stay in their slot until the turn they are due.
+    """
+
+    def __init__(
+        self,
+        start_time: datetime,
+        tick: timedelta = timedelta(seconds=OVERRIDE_WHEEL_TICK_SECONDS),
+        num_slots: int = OVERRIDE_WHEEL_SLOTS,
+    ):
+        self.start_time = start_time
+        self.tick = tick
+        self._slots: list[dict[str, datetime]] = [{} for _ in range(num_slots)]
+        self._slot_of: dict[str, int] = {}
+        # Tick whose slot is scanned first on the next advance
+        self._next_tick = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    def __contains__(self, vehicle_id: str) -> bool:
+        return vehicle_id in self._slot_of
+
+    def _tick_of(self, at: datetime) -> int:
+        return (at - self.start_time) // self.tick
+
+    def schedule(self, vehicle_id: str, deadline: datetime) -> None:
+        """
+        Register a vehicle's deadline, replacing any it already has.
+
+        Args:
+            vehicle_id: Vehicle the deadline belongs to
+            deadline: When it fires
+        """
+        with self._lock:
+            self._remove(vehicle_id)
+            # Deadlines already past fire on the next advance
+            slot = max(self._tick_of(deadline), self._next_tick) % len(self._slots)
+            self._slots[slot][vehicle_id] = deadline
+            self._slot_of[vehicle_id] = slot
+
+    def cancel(self, vehicle_id: str) -> None:
+        """
+        Remove a vehicle's deadline, if it has one.
+
+        Args:
+            vehicle_id: Vehicle whose deadline is removed
+        """
+        with self._lock:
+            self._remove(vehicle_id)
+
+    def _remove(self, vehicle_id: str) -> None:
+        slot = self._slot_of.pop(vehicle_id, None)
+        if slot is not None:
+            del self._slots[slot][vehicle_id]
+
+    def advance(self, now: datetime) -> list[tuple[str, datetime]]:
+        """
+        Move the clock forward, removing and returning the deadlines reached.
+
+        Args:
+            now: Current time
+
+        Returns:
+            list[tuple[str, datetime]]: Vehicle and deadline of each expiry,
+                earliest first
+        """
+        with self._lock:
+            now_tick = self._tick_of(now)
+            # A jump of a whole turn or more visits every slot once
+            last_tick = min(now_tick, self._next_tick + len(self._slots) - 1)
+
+            expired = []
+            for tick in range(self._next_tick, last_tick + 1):
+                slot = self._slots[tick % len(self._slots)]
+                due = [
+                    (vehicle_id, deadline)
+                    for vehicle_id, deadline in slot.items()
+                    if deadline <= now
+                ]
+                for vehicle_id, _ in due:
+                    del slot[vehicle_id]
+                    del self._slot_of[vehicle_id]
+                expired.extend(due)
+
+            # The current tick's slot may still hold deadlines later in the tick
+            self._next_tick = max(self._next_tick, now_tick)
+
+        return sorted(expired, key=lambda entry: entry[1])
+
+
+class OverrideExpiryScheduler:
+    """
+    Expires override charging across a fleet as the clock advances.
+
+    Starting or stopping an override through the scheduler registers or
+    cancels its deadline. Advancing the clock looks up only the vehicles
+    whose overrides ended and updates them with the usual charging rules.
+    """
+
+    def __init__(self, wheel: TimingWheel):
+        self.wheel = wheel
+
+    def track(self, vehicle_id: str, charger_state: ChargerState) -> None:
+        """
+        Follow a vehicle's current override, e.g. one loaded from storage.
+
+        Args:
+            vehicle_id: Vehicle to follow
+            charger_state: Its current charger state
+        """
+        if charger_state.charge_is_override and charger_state.override_end_time:
+            self.wheel.schedule(vehicle_id, charger_state.override_end_time)
+        else:
+            self.wheel.cancel(vehicle_id)
+
+    def start_override(
+        self, vehicle_id: str, charger_state: ChargerState, current_time: datetime
+    ) -> ChargerState:
+        """
+        Start an override charging session and register its deadline.
+
+        Args:
+            vehicle_id: Vehicle to charge
+            charger_state: Its current charger state
+            current_time: Current time for calculating end time
+
+        Returns:
+            ChargerState: Updated charger state with override active
+        """
+        charger_state = start_override_charge(charger_state, current_time)
+        self.track(vehicle_id, charger_state)
+        return charger_state
+
+    def stop_override(
+        self, vehicle_id: str, charger_state: ChargerState
+    ) -> ChargerState:
+        """
+        Stop an override charging session and cancel its deadline.
+
+        Args:
+            vehicle_id: Vehicle to stop
+            charger_state: Its current charger state
+
+        Returns:
+            ChargerState: Updated charger state with override stopped
+        """
+        self.wheel.cancel(vehicle_id)
+        return stop_override_charge(charger_state)
+
+    def advance(
+        self,
+        now: datetime,
+        lookup: Callable[[str], Optional[tuple[ChargerState, bool, ChargeSchedule]]],
+    ) -> dict[str, ChargerState]:
+        """
+        Expire the overrides that ended by now.
+
+        Args:
+            now: Current time
+            lookup: Gives a vehicle's charger state, plug state and schedule
+                (None if the vehicle is gone)
+
+        Returns:
+            dict[str, ChargerState]: Updated charger state of each vehicle whose
+                override expired
+        """
+        updated = {}
+        for vehicle_id, deadline in self.wheel.advance(now):
+            vehicle = lookup(vehicle_id)
+            if vehicle is None:
+                continue
+            charger_state, car_is_plugged_in, schedule = vehicle
+
+            # The override was changed without the scheduler; nothing to expire
+            if (
+                not charger_state.charge_is_override
+                or charger_state.override_end_time != deadline
+            ):
+                continue
+
+            updated[vehicle_id] = update_charger_state(
+                charger_state,
+                DemoAdminState(car_is_plugged_in=car_is_plugged_in, current_time=now),
+                schedule,
+            )
+        return updated
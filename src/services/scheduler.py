@@ -3,21 +3,51 @@ Scheduling service for the EV Charge Control Panel.
 Handles charge scheduling and future state projection.
 """
 
-from datetime import timedelta
-from typing import List, Tuple
-
+import math
+from bisect import bisect_right
+from dataclasses import replace
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
 import streamlit as st
 
-from src.config import FORECAST_PERIODS, PERIOD_MINUTES
-from src.domain.battery import project_battery_state
-from src.domain.charging import update_charger_state
+from src.config import FORECAST_PERIODS, PERIOD_MINUTES, PLAN_SLOT_MINUTES
+from src.domain.battery import calculate_charge_duration, project_battery_state
+from src.domain.charging import (
+    disable_scheduled_charge,
+    end_override,
+    schedule_transitions,
+    start_override_charge,
+    update_charger_state,
+)
 from src.domain.models import (
     BatteryState,
+    ChargeSchedule,
     ChargerState,
     CombinedState,
     DemoAdminState,
+    ForecastFrame,
+    ForecastSegment,
+    evolve,
 )
 from src.services import state_manager
+from src.services.fleet_forecast import (
+    FleetForecast,
+    FleetState,
+    advance_fleet_forecast,
+    build_fleet_state,
+    forecast_fleet,
+)
+from src.services.forecast_cache import (
+    ForecastKey,
+    forecast_cache,
+    make_forecast_key,
+)
+from src.services.state_backends import StateConflictError
+from src.services.state_manager import StateSnapshot
+from src.services.tariff_planner import ChargePlan, plan_cheapest_charging
 
 
 def get_current_states() -> Tuple[ChargerState, BatteryState]:
@@ -28,25 +58,137 @@ def get_current_states() -> Tuple[ChargerState, BatteryState]:
     Returns:
         Tuple[ChargerState, BatteryState]: Current charger and battery states
     """
-    charger_state = state_manager.get_charger_state()
-    battery_state = state_manager.get_battery_state()
-    demo_state = state_manager.get_demo_state()
-    charge_schedule = state_manager.get_charge_schedule()
 
-    # Update charger state based on current time and schedule
-    updated_charger_state = update_charger_state(
-        charger_state, demo_state, charge_schedule
+    def derive(state: StateSnapshot) -> Tuple[ChargerState, BatteryState]:
+        # Update charger state based on current time and schedule
+        updated_charger_state = update_charger_state(
+            state.charger_state, state.demo_state, state.charge_schedule
+        )
+
+        # Store the updated state if it changed, deriving it again if another
+        # writer changed its inputs in between
+        if updated_charger_state is not state.charger_state:
+            state_manager.commit(
+                {"charger_state": updated_charger_state},
+                _expected_versions(
+                    state, "charger_state", "charge_schedule", "demo_state"
+                ),
+            )
+
+        return updated_charger_state, state.battery_state
+
+    return state_manager.retry_on_conflict(derive)
+
+
+def get_forecast_key(
+    demo_state: DemoAdminState, num_periods: int = FORECAST_PERIODS
+) -> ForecastKey:
+    """
+    Get a hashable snapshot of every input the forecast depends on.
+    Two calls return equal keys exactly when the forecast would be the same.
+
+    Args:
+        demo_state: Current demo state
+        num_periods: Number of future periods to project
+
+    Returns:
+        ForecastKey: Snapshot of the forecast inputs
+    """
+    state = state_manager.snapshot()
+    return make_forecast_key(
+        state.battery_state,
+        state.charger_state,
+        state.charge_schedule,
+        demo_state.car_is_plugged_in,
+        demo_state.current_time,
+        num_periods,
+    )
+
+
+def get_forecast_frame(
+    demo_state: DemoAdminState, num_periods: int = FORECAST_PERIODS
+) -> ForecastFrame:
+    """
+    Project future states based on current settings and state, as columns.
+
+    Args:
+        demo_state: Current demo state
+        num_periods: Number of future periods to project
+
+    Returns:
+        ForecastFrame: Projected times, SoC and charging masks
+    """
+    # Get current state
+    state = state_manager.snapshot()
+    charger_state = state.charger_state
+    battery_state = state.battery_state
+    charge_schedule = state.charge_schedule
+
+    # Identical inputs give identical forecasts, whichever session asks
+    key = make_forecast_key(
+        battery_state,
+        charger_state,
+        charge_schedule,
+        demo_state.car_is_plugged_in,
+        demo_state.current_time,
+        num_periods,
     )
 
-    # Store the updated state if it changed
-    if (
-        updated_charger_state.car_is_charging != charger_state.car_is_charging
-        or updated_charger_state.charge_is_override != charger_state.charge_is_override
-        or updated_charger_state.override_end_time != charger_state.override_end_time
-    ):
-        state_manager.update_charger_state(updated_charger_state)
+    def compute_forecast() -> FleetForecast:
+        # Project this car as a fleet of one
+        fleet = build_fleet_state(
+            [
+                (
+                    battery_state,
+                    charger_state,
+                    charge_schedule,
+                    demo_state.car_is_plugged_in,
+                )
+            ]
+        )
+        return _advance_last_forecast(key, fleet) or forecast_fleet(
+            fleet, demo_state.current_time, num_periods
+        )
+
+    forecast = forecast_cache.get_or_compute(key, compute_forecast)
 
-    return updated_charger_state, battery_state
+    return forecast.frame(0)
+
+
+def get_charge_plan(
+    demo_state: DemoAdminState,
+    prices: np.ndarray,
+    departure_time: datetime,
+    slot_minutes: int = PLAN_SLOT_MINUTES,
+) -> ChargePlan:
+    """
+    Plan the cheapest charging to the target before departure.
+    The app has no price source yet, so this is for callers that bring one;
+    the page still charts the schedule forecast.
+
+    Args:
+        demo_state: Current demo state
+        prices: Price per kWh of each slot from the current time
+        departure_time: When the car leaves
+        slot_minutes: Length of each slot in minutes
+
+    Returns:
+        ChargePlan: Plan for this car, whose forecast.frame(0) can be charted
+    """
+    state = state_manager.snapshot()
+    fleet = build_fleet_state(
+        [
+            (
+                state.battery_state,
+                state.charger_state,
+                state.charge_schedule,
+                demo_state.car_is_plugged_in,
+            )
+        ]
+    )
+    return plan_cheapest_charging(
+        fleet, prices, demo_state.current_time, departure_time, slot_minutes
+    )
 
 
 def get_future_states(
@@ -54,6 +196,7 @@ def get_future_states(
 ) -> List[CombinedState]:
     """
     Project future states based on current settings and state.
+    Compatibility view of get_forecast_frame as a list of CombinedState.
 
     Args:
         demo_state: Current demo state
@@ -62,88 +205,489 @@ def get_future_states(
     Returns:
         List[CombinedState]: Projected future states
     """
-    # Get current state
-    charger_state = state_manager.get_charger_state()
-    battery_state = state_manager.get_battery_state()
-    charge_schedule = state_manager.get_charge_schedule()
+    frame = get_forecast_frame(demo_state, num_periods)
+    state = state_manager.snapshot()
+    charger_state = state.charger_state
+    battery_state = state.battery_state
 
     # Period is in minutes
     period = timedelta(minutes=PERIOD_MINUTES)
-    period_hours = PERIOD_MINUTES / 60
     current_time = demo_state.current_time
 
     # Create list to store future states
     future_states = []
 
-    # Track the current soc as we project forward
-    projected_soc = battery_state.current_soc
-
     for i in range(num_periods):
-        # Calculate the time for this period
-        future_time = current_time + i * period
+        is_override = bool(frame.is_override[i])
 
-        # Create a temporary demo state for this future time
-        future_demo_state = DemoAdminState(
-            car_is_plugged_in=demo_state.car_is_plugged_in, current_time=future_time
-        )
+        # Expired overrides are cleared, as update_charger_state does
+        override_end_time = charger_state.override_end_time
+        if charger_state.charge_is_override and not is_override:
+            override_end_time = None
 
-        # Create a temporary battery state with the projected SoC
-        future_battery_state = BatteryState(
-            current_soc=projected_soc, target_soc=battery_state.target_soc
+        future_states.append(
+            CombinedState(
+                time=current_time + i * period,
+                battery_state=BatteryState(
+                    current_soc=float(frame.soc[i]),
+                    target_soc=battery_state.target_soc,
+                ),
+                # Only a few distinct charger states occur, so they are shared
+                charger_state=evolve(
+                    charger_state,
+                    car_is_charging=bool(frame.is_charging[i]),
+                    charge_is_override=is_override,
+                    override_end_time=override_end_time,
+                ),
+            )
         )
 
-        # Update charger state for this future time
+    return future_states
+
+
+def iter_future_states(
+    demo_state: DemoAdminState,
+    num_periods: Optional[int] = None,
+    stop_when: Optional[Callable[[CombinedState], bool]] = None,
+) -> Iterator[CombinedState]:
+    """
+    Lazily project future states one period at a time.
+
+    Only one period is held in memory at a time, so consumers can stream
+    through long horizons and stop as soon as they have what they need.
+
+    Args:
+        demo_state: Current demo state
+        num_periods: Number of periods to project (None for no limit)
+        stop_when: Predicate that ends the projection after the first state
+            it returns True for
+
+    Yields:
+        CombinedState: Projected state for each period
+    """
+    snapshot = state_manager.snapshot()
+    charger_state = snapshot.charger_state
+    charge_schedule = snapshot.charge_schedule
+
+    period = timedelta(minutes=PERIOD_MINUTES)
+    period_hours = PERIOD_MINUTES / 60
+    projected_battery_state = snapshot.battery_state
+
+    periods = range(num_periods) if num_periods is not None else count()
+    for i in periods:
+        future_time = demo_state.current_time + i * period
+
         future_charger_state = update_charger_state(
-            charger_state, future_demo_state, charge_schedule
+            charger_state,
+            DemoAdminState(
+                car_is_plugged_in=demo_state.car_is_plugged_in,
+                current_time=future_time,
+            ),
+            charge_schedule,
+        )
+        projected_battery_state = project_battery_state(
+            projected_battery_state, future_charger_state, period_hours
         )
 
-        # Project battery state for this period
-        future_battery_state = project_battery_state(
-            future_battery_state, future_charger_state, period_hours
+        state = CombinedState(
+            time=future_time,
+            battery_state=projected_battery_state,
+            charger_state=future_charger_state,
         )
+        yield state
 
-        # Update projected SoC for next period
-        projected_soc = future_battery_state.current_soc
+        if stop_when is not None and stop_when(state):
+            return
 
-        # Add to future states
-        future_states.append(
-            CombinedState(
-                time=future_time,
-                battery_state=future_battery_state,
-                charger_state=future_charger_state,
+
+def target_reached(state: CombinedState) -> bool:
+    """
+    Stop predicate for iter_future_states: the battery has reached its target.
+
+    Args:
+        state: Projected state
+
+    Returns:
+        bool: True once the target is reached
+    """
+    return state.battery_state.current_soc >= state.battery_state.target_soc
+
+
+def charging_ended() -> Callable[[CombinedState], bool]:
+    """
+    Build a stop predicate for iter_future_states that fires once charging
+    has started and then stopped, e.g. at the end of the schedule window.
+
+    Returns:
+        Callable[[CombinedState], bool]: Stop predicate
+    """
+    seen_charging = False
+
+    def predicate(state: CombinedState) -> bool:
+        nonlocal seen_charging
+        if state.charger_state.car_is_charging:
+            seen_charging = True
+            return False
+        return seen_charging
+
+    return predicate
+
+
+def _advance_last_forecast(
+    key: ForecastKey, fleet: FleetState
+) -> Optional[FleetForecast]:
+    """
+    Reuse the newest earlier cached forecast when only the clock has moved
+    forward.
+
+    Only the newly exposed periods are projected. The cached forecast is
+    reusable when every other input is unchanged, the clock moved by whole
+    periods and the current SoC is the SoC it projected for now, give or
+    take rounding.
+
+    Args:
+        key: Inputs of the forecast being requested
+        fleet: Array snapshot of the car
+
+    Returns:
+        Optional[FleetForecast]: Advanced forecast, or None if a full one is needed
+    """
+    previous = forecast_cache.get_previous(key)
+    if previous is None:
+        return None
+    last_key, last_forecast = previous
+
+    period = timedelta(minutes=PERIOD_MINUTES)
+    elapsed = key.start_time - last_key.start_time
+    num_periods, remainder = divmod(elapsed, period)
+    if remainder or not 0 < num_periods < key.num_periods:
+        return None
+
+    if not math.isclose(last_forecast.soc[0, num_periods - 1], key.current_soc):
+        return None
+
+    return advance_fleet_forecast(last_forecast, fleet, num_periods)
+
+
+def project_segments(
+    battery_state: BatteryState,
+    charger_state: ChargerState,
+    charge_schedule: ChargeSchedule,
+    car_is_plugged_in: bool,
+    start_time: datetime,
+    end_time: datetime,
+) -> List[ForecastSegment]:
+    """
+    Project future states as segments between the instants where behaviour changes.
+
+    Behaviour can only change at a schedule start or end, when an override
+    expires or when the battery reaches its target, so only those instants
+    are evaluated and the SoC is integrated exactly in between. Unlike
+    get_future_states this is not limited to PERIOD_MINUTES accuracy.
+
+    Args:
+        battery_state: Current battery state
+        charger_state: Current charger state
+        charge_schedule: Current charge schedule
+        car_is_plugged_in: Whether the car is plugged in
+        start_time: Start of the projection
+        end_time: End of the projection
+
+    Returns:
+        List[ForecastSegment]: Contiguous segments covering start_time to end_time
+    """
+    breakpoints = [start_time]
+    if car_is_plugged_in:
+        breakpoints.extend(schedule_transitions(charge_schedule, start_time, end_time))
+        override_end_time = charger_state.override_end_time
+        if (
+            charger_state.charge_is_override
+            and override_end_time
+            and start_time < override_end_time < end_time
+        ):
+            breakpoints.append(override_end_time)
+    breakpoints = sorted(set(breakpoints)) + [end_time]
+
+    segments: List[ForecastSegment] = []
+    current_battery_state = battery_state
+
+    for segment_start, segment_end in zip(breakpoints, breakpoints[1:]):
+        # Behaviour is constant between breakpoints, so evaluate the rules at
+        # the midpoint to avoid the inclusive schedule end at the boundary
+        midpoint = segment_start + (segment_end - segment_start) / 2
+        segment_charger_state = update_charger_state(
+            charger_state,
+            DemoAdminState(car_is_plugged_in=car_is_plugged_in, current_time=midpoint),
+            charge_schedule,
+        )
+
+        # Split the segment where the battery reaches its target
+        if (
+            segment_charger_state.car_is_charging
+            and current_battery_state.current_soc < current_battery_state.target_soc
+        ):
+            hours_to_target = calculate_charge_duration(
+                segment_charger_state.charge_rate_kw,
+                current_battery_state.current_soc,
+                current_battery_state.target_soc,
             )
+            segment_hours = (segment_end - segment_start).total_seconds() / 3600
+            if hours_to_target < segment_hours:
+                target_time = segment_start + timedelta(hours=float(hours_to_target))
+                full_battery_state = BatteryState(
+                    current_soc=current_battery_state.target_soc,
+                    target_soc=current_battery_state.target_soc,
+                )
+                _append_segment(
+                    segments,
+                    ForecastSegment(
+                        start_time=segment_start,
+                        end_time=target_time,
+                        start_battery_state=current_battery_state,
+                        end_battery_state=full_battery_state,
+                        charger_state=segment_charger_state,
+                    ),
+                )
+                segment_start = target_time
+                current_battery_state = full_battery_state
+
+        end_battery_state = project_battery_state(
+            current_battery_state,
+            segment_charger_state,
+            (segment_end - segment_start).total_seconds() / 3600,
+        )
+        _append_segment(
+            segments,
+            ForecastSegment(
+                start_time=segment_start,
+                end_time=segment_end,
+                start_battery_state=current_battery_state,
+                end_battery_state=end_battery_state,
+                charger_state=segment_charger_state,
+            ),
         )
+        current_battery_state = end_battery_state
 
-    return future_states
+    return segments
 
 
-def start_charge() -> None:
+def _append_segment(segments: List[ForecastSegment], segment: ForecastSegment) -> None:
     """
-    Start an override charging session.
+    Append a segment, merging it into the previous one if behaviour is unchanged.
+
+    Args:
+        segments: Segments built so far
+        segment: Segment to append
     """
+    if segments:
+        previous = segments[-1]
+        previous_rising = (
+            previous.end_battery_state.current_soc
+            != previous.start_battery_state.current_soc
+        )
+        rising = (
+            segment.end_battery_state.current_soc
+            != segment.start_battery_state.current_soc
+        )
+        if (
+            previous.charger_state is segment.charger_state
+            and previous_rising == rising
+        ):
+            segments[-1] = replace(
+                previous,
+                end_time=segment.end_time,
+                end_battery_state=segment.end_battery_state,
+            )
+            return
+
+    segments.append(segment)
 
-    charger_state = state_manager.get_charger_state()
-    demo_state = state_manager.get_demo_state()
 
-    # Only start if plugged in
-    if not demo_state.car_is_plugged_in:
-        st.toast("Car is not plugged in!", icon="⚠️")
-        return
+def get_forecast_segments(
+    demo_state: DemoAdminState, horizon: Optional[timedelta] = None
+) -> List[ForecastSegment]:
+    """
+    Project future states as event-driven segments based on current settings.
 
-    # Set override charging
-    charger_state.car_is_charging = True
-    charger_state.charge_is_override = True
+    Args:
+        demo_state: Current demo state
+        horizon: How far ahead to project (defaults to the periodic forecast length)
 
-    # Set override end time
-    override_minutes = charger_state.override_minutes
-    charger_state.override_end_time = demo_state.current_time + timedelta(
-        minutes=override_minutes
+    Returns:
+        List[ForecastSegment]: Projected segments
+    """
+    if horizon is None:
+        horizon = timedelta(minutes=PERIOD_MINUTES * FORECAST_PERIODS)
+
+    state = state_manager.snapshot()
+    return project_segments(
+        state.battery_state,
+        state.charger_state,
+        state.charge_schedule,
+        demo_state.car_is_plugged_in,
+        demo_state.current_time,
+        demo_state.current_time + horizon,
     )
 
-    # Update state
-    state_manager.update_charger_state(charger_state)
 
-    st.toast(f"Starting charge for {override_minutes} minutes!", icon="🚀")
+def get_soc_at(segments: List[ForecastSegment], at_time: datetime) -> float:
+    """
+    Get the projected state of charge at any instant covered by the segments.
+
+    Args:
+        segments: Projected segments
+        at_time: Instant to look up
+
+    Returns:
+        float: Projected state of charge
+    """
+    index = max(bisect_right([s.start_time for s in segments], at_time) - 1, 0)
+    return _segment_soc_at(segments[index], at_time)
+
+
+def _segment_soc_at(segment: ForecastSegment, at_time: datetime) -> float:
+    """
+    Get the state of charge at an instant from the segment covering it.
+
+    Args:
+        segment: Projected segment starting no later than the instant
+        at_time: Instant to look up
+
+    Returns:
+        float: Projected state of charge
+    """
+    start_soc = segment.start_battery_state.current_soc
+    end_soc = segment.end_battery_state.current_soc
+    if at_time >= segment.end_time:
+        return end_soc
+
+    fraction = (at_time - segment.start_time) / (segment.end_time - segment.start_time)
+    return start_soc + (end_soc - start_soc) * fraction
+
+
+def get_charge_complete_time(segments: List[ForecastSegment]) -> Optional[datetime]:
+    """
+    Get the exact time the battery reaches its target, if it does.
+
+    Args:
+        segments: Projected segments
+
+    Returns:
+        Optional[datetime]: When charging completes, or None if not in the projection
+    """
+    for segment in segments:
+        end_battery_state = segment.end_battery_state
+        if (
+            segment.charger_state.car_is_charging
+            and end_battery_state.current_soc >= end_battery_state.target_soc
+            and segment.start_battery_state.current_soc < end_battery_state.target_soc
+        ):
+            return segment.end_time
+    return None
+
+
+def segments_to_states(
+    segments: List[ForecastSegment],
+    num_periods: int = FORECAST_PERIODS,
+    period_minutes: int = PERIOD_MINUTES,
+) -> List[CombinedState]:
+    """
+    Produce the periodic view of an event-driven projection.
+
+    Each state holds the charger state at the start of its period and the
+    SoC at the end of it, matching the layout of get_future_states.
+
+    Args:
+        segments: Projected segments
+        num_periods: Number of periods to produce
+        period_minutes: Length of each period in minutes
+
+    Returns:
+        List[CombinedState]: Periodic states
+    """
+    period = timedelta(minutes=period_minutes)
+    start_time = segments[0].start_time
+
+    def covering(index: int, at_time: datetime) -> int:
+        # Index of the last segment starting no later than the time
+        while index + 1 < len(segments) and segments[index + 1].start_time <= at_time:
+            index += 1
+        return index
+
+    # Period times only move forward, so segments and periods are walked
+    # together in one pass; each period ends in the segment the next starts in
+    states = []
+    start_index = 0
+    for i in range(num_periods):
+        period_time = start_time + i * period
+        start_index = covering(start_index, period_time)
+        end_index = covering(start_index, period_time + period)
+        segment = segments[start_index]
+        states.append(
+            CombinedState(
+                time=period_time,
+                battery_state=BatteryState(
+                    current_soc=_segment_soc_at(
+                        segments[end_index], period_time + period
+                    ),
+                    target_soc=segment.start_battery_state.target_soc,
+                ),
+                charger_state=segment.charger_state,
+            )
+        )
+
+    return states
+
+
+def _expected_versions(state: StateSnapshot, *keys: str) -> dict[str, int]:
+    """
+    Get the versions a command's commit expects, for the state it depends on.
+
+    Args:
+        state: Snapshot the command read
+        keys: Keys of the state the command's decision depends on
+
+    Returns:
+        dict[str, int]: Version by key, as read
+    """
+    return {key: state.versions[key] for key in keys}
+
+
+def _run_command(command: Callable[[StateSnapshot], Tuple[str, str]]) -> None:
+    """
+    Run a charge command, retrying it if the state changed while it ran.
+
+    Args:
+        command: Function taking a snapshot, committing its changes with
+            compare-and-swap and returning the toast message and icon
+    """
+    try:
+        message, icon = state_manager.retry_on_conflict(command)
+    except StateConflictError:
+        message, icon = "Charger was changed elsewhere, please try again", "⚠️"
+    st.toast(message, icon=icon)
+
+
+def start_charge() -> None:
+    """
+    Start an override charging session.
+    """
+
+    def command(state: StateSnapshot) -> Tuple[str, str]:
+        # Only start if plugged in
+        if not state.demo_state.car_is_plugged_in:
+            return "Car is not plugged in!", "⚠️"
+
+        charger_state = start_override_charge(
+            state.charger_state, state.demo_state.current_time
+        )
+        state_manager.commit(
+            {"charger_state": charger_state},
+            _expected_versions(state, "charger_state", "demo_state"),
+        )
+        return f"Starting charge for {charger_state.override_minutes} minutes!", "🚀"
+
+    _run_command(command)
 
 
 def stop_charge() -> None:
@@ -151,23 +695,28 @@ def stop_charge() -> None:
     Stop the current charging session based on type.
     """
 
-    charger_state = state_manager.get_charger_state()
-    charge_schedule = state_manager.get_charge_schedule()
+    def command(state: StateSnapshot) -> Tuple[str, str]:
+        charger_state = state.charger_state
+
+        if not charger_state.car_is_charging:
+            return "Car is not currently charging", "ℹ️"
 
-    if not charger_state.car_is_charging:
-        st.toast("Car is not currently charging", icon="ℹ️")
-        return
+        if charger_state.charge_is_override:
+            # If charging from override, revert to schedule
+            state_manager.commit(
+                {"charger_state": end_override(charger_state)},
+                _expected_versions(state, "charger_state"),
+            )
+            return "Stopped override charging, reverting to schedule", "🔄"
 
-    if charger_state.charge_is_override:
-        # If charging from override, revert to schedule
-        charger_state.charge_is_override = False
-        charger_state.override_end_time = None
-        state_manager.update_charger_state(charger_state)
-        st.toast("Stopped override charging, reverting to schedule", icon="🔄")
-    else:
         # If charging from schedule, disable schedule until next morning
-        charge_schedule.is_enabled = False
-        charger_state.car_is_charging = False
-        state_manager.update_charge_schedule(charge_schedule)
-        state_manager.update_charger_state(charger_state)
-        st.toast("Disabled scheduled charging until tomorrow", icon="⏰")
+        state_manager.commit(
+            {
+                "charge_schedule": replace(state.charge_schedule, is_enabled=False),
+                "charger_state": disable_scheduled_charge(charger_state),
+            },
+            _expected_versions(state, "charger_state", "charge_schedule"),
+        )
+        return "Disabled scheduled charging until tomorrow", "⏰"
+
+    _run_command(command)
@@ -0,0 +1,395 @@
+"""
+State storage backends for the EV Charge Control Panel.
+Provides the stores that services.state_manager reads and writes through.
+"""
+
+import json
+import sqlite3
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, time
+from typing import Any, Iterable, Optional, get_args, get_origin, get_type_hints
+
+import streamlit as st
+
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    intern_state,
+)
+
+# State types that can be stored, by name
+STATE_TYPES = {
+    cls.__name__: cls
+    for cls in (BatteryState, ChargeSchedule, ChargerState, DemoAdminState)
+}
+
+
+def serialize_state(state: Any) -> str:
+    """
+    Serialize a state object to JSON.
+
+    Args:
+        state: State dataclass to serialize
+
+    Returns:
+        str: JSON representation
+    """
+
+    def encode(value: Any) -> str:
+        if isinstance(value, (datetime, time)):
+            return value.isoformat()
+        raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+    return json.dumps(asdict(state), default=encode)
+
+
+def deserialize_state(type_name: str, data: str) -> Any:
+    """
+    Deserialize a state object from JSON.
+
+    Args:
+        type_name: Name of the state type
+        data: JSON representation
+
+    Returns:
+        State dataclass (interned)
+    """
+    cls = STATE_TYPES[type_name]
+    return intern_state(_decode(cls, json.loads(data)))
+
+
+def _decode(cls: type, values: dict) -> Any:
+    """
+    Build a state dataclass from decoded JSON values.
+
+    Args:
+        cls: State dataclass to build
+        values: Field values as decoded from JSON
+
+    Returns:
+        State dataclass
+    """
+    for name, hint in get_type_hints(cls).items():
+        value = values.get(name)
+        if value is None:
+            continue
+        if hint is time:
+            values[name] = time.fromisoformat(value)
+        elif hint in (datetime, Optional[datetime]):
+            values[name] = datetime.fromisoformat(value)
+        elif get_origin(hint) is tuple:
+            item = get_args(hint)[0]
+            values[name] = tuple(
+                _decode(item, element) if is_dataclass(item) else element
+                for element in value
+            )
+
+    return cls(**values)
+
+
+class StateConflictError(Exception):
+    """Raised when a compare-and-swap save finds state changed since it was read."""
+
+    def __init__(self, keys: Iterable[str]):
+        self.keys = sorted(keys)
+        super().__init__(f"State changed since it was read: {self.keys}")
+
+
+class StateBackend(ABC):
+    """
+    Store for the state objects of one vehicle, addressed by key.
+
+    Every stored state carries a version number, which starts at 0 when
+    nothing is stored and goes up by one on each save. Saves can give the
+    versions they expect to replace, making them compare-and-swap.
+    """
+
+    # Set by the state manager once default state has been created
+    initialized: bool = False
+
+    @abstractmethod
+    def load_many(self, keys: Iterable[str]) -> dict[str, Optional[Any]]:
+        """
+        Load several state objects in one step.
+
+        Args:
+            keys: State keys
+
+        Returns:
+            dict[str, Optional[Any]]: Stored state (or None) by key
+        """
+
+    @abstractmethod
+    def load_versions(self, keys: Iterable[str]) -> dict[str, int]:
+        """
+        Get the versions of the state objects as last loaded.
+
+        Args:
+            keys: State keys
+
+        Returns:
+            dict[str, int]: Version by key, matching what load_many returns
+        """
+
+    @abstractmethod
+    def current_versions(self, keys: Iterable[str]) -> dict[str, int]:
+        """
+        Get the latest versions in the store, without loading any state.
+
+        Args:
+            keys: State keys
+
+        Returns:
+            dict[str, int]: Version by key, including writes made elsewhere
+        """
+
+    @abstractmethod
+    def save_many(
+        self,
+        states: dict[str, Any],
+        expected_versions: Optional[dict[str, int]] = None,
+    ) -> None:
+        """
+        Save several state objects in one step.
+
+        Args:
+            states: State to store by key
+            expected_versions: Versions the stored state must still have,
+                by key. When given the save is written straight away, and
+                only if every version matches.
+
+        Raises:
+            StateConflictError: If a stored version differs from the expected one
+        """
+
+    def load(self, key: str) -> Optional[Any]:
+        """
+        Load a state object.
+
+        Args:
+            key: State key, e.g. "battery_state"
+
+        Returns:
+            Optional[Any]: Stored state, or None if nothing is stored
+        """
+        return self.load_many([key])[key]
+
+    def save(self, key: str, state: Any) -> None:
+        """
+        Save a state object.
+
+        Args:
+            key: State key, e.g. "battery_state"
+            state: State to store
+        """
+        self.save_many({key: state})
+
+    def flush(self) -> None:
+        """Write any buffered changes to the underlying store."""
+
+    def refresh(self) -> None:
+        """Flush buffered changes and drop cached reads so others' writes are seen."""
+        self.flush()
+
+
+class SessionStateBackend(StateBackend):
+    """Default backend, keeping state in Streamlit's session state."""
+
+    @staticmethod
+    def _versions() -> dict[str, int]:
+        if "state_versions" not in st.session_state:
+            st.session_state.state_versions = {}
+        return st.session_state.state_versions
+
+    def load_many(self, keys: Iterable[str]) -> dict[str, Optional[Any]]:
+        return {key: st.session_state.get(key) for key in keys}
+
+    def load_versions(self, keys: Iterable[str]) -> dict[str, int]:
+        versions = self._versions()
+        return {key: versions.get(key, 0) for key in keys}
+
+    def current_versions(self, keys: Iterable[str]) -> dict[str, int]:
+        return self.load_versions(keys)
+
+    def save_many(
+        self,
+        states: dict[str, Any],
+        expected_versions: Optional[dict[str, int]] = None,
+    ) -> None:
+        versions = self._versions()
+        if expected_versions:
+            conflicts = [
+                key
+                for key, version in expected_versions.items()
+                if versions.get(key, 0) != version
+            ]
+            if conflicts:
+                raise StateConflictError(conflicts)
+
+        for key, state in states.items():
+            st.session_state[key] = state
+            versions[key] = versions.get(key, 0) + 1
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    Backend persisting state to SQLite in WAL mode, keyed by vehicle.
+
+    Reads go through an in-memory cache that is filled with all of the
+    vehicle's state in one query, and dropped on refresh once another writer
+    has bumped a stored version. Plain writes are buffered and written in a
+    single transaction on flush, so several app processes can share one
+    database file. Compare-and-swap writes check and bump the stored
+    versions inside one immediate transaction. The connection is closed when
+    the backend is, or once it is garbage collected with its session.
+    """
+
+    _CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS vehicle_state (
+            vehicle_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            type TEXT NOT NULL,
+            value TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (vehicle_id, key)
+        )
+    """
+    _SELECT = "SELECT key, type, value, version FROM vehicle_state WHERE vehicle_id = ?"
+    _SELECT_VERSIONS = "SELECT key, version FROM vehicle_state WHERE vehicle_id = ?"
+    _UPSERT = """
+        INSERT INTO vehicle_state (vehicle_id, key, type, value, version)
+        VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT (vehicle_id, key)
+        DO UPDATE SET
+            type = excluded.type,
+            value = excluded.value,
+            version = vehicle_state.version + 1
+    """
+
+    def __init__(self, path: str, vehicle_id: str):
+        self.path = path
+        self.vehicle_id = vehicle_id
+        self._lock = threading.Lock()
+        self._cache: Optional[dict[str, Any]] = None
+        self._versions: dict[str, int] = {}
+        self._pending: dict[str, Any] = {}
+
+        # Sessions may run on different threads, so access is serialized
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=5.0
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(self._CREATE_TABLE)
+
+        # Databases written before versioning lack the column
+        columns = {
+            row[1]
+            for row in self._connection.execute("PRAGMA table_info(vehicle_state)")
+        }
+        if "version" not in columns:
+            self._connection.execute(
+                "ALTER TABLE vehicle_state ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            )
+
+        # Streamlit has no hook for a session ending, but its state is dropped
+        self._finalizer = weakref.finalize(self, self._connection.close)
+
+    def _load_all(self) -> dict[str, Any]:
+        """Fill the read cache with all of this vehicle's state."""
+        if self._cache is None:
+            rows = self._connection.execute(self._SELECT, (self.vehicle_id,)).fetchall()
+            self._cache = {
+                key: deserialize_state(type_name, value)
+                for key, type_name, value, _ in rows
+            }
+            self._versions = {key: version for key, _, _, version in rows}
+        return self._cache
+
+    def _stored_versions(self) -> dict[str, int]:
+        """Read the stored versions of all of this vehicle's state."""
+        return dict(self._connection.execute(self._SELECT_VERSIONS, (self.vehicle_id,)))
+
+    def _write(self, states: dict[str, Any]) -> None:
+        """Upsert states inside the current transaction and record new versions."""
+        rows = [
+            (self.vehicle_id, key, type(state).__name__, serialize_state(state))
+            for key, state in states.items()
+        ]
+        self._connection.executemany(self._UPSERT, rows)
+        stored = self._stored_versions()
+        self._versions.update({key: stored[key] for key in states})
+
+    def load_many(self, keys: Iterable[str]) -> dict[str, Optional[Any]]:
+        with self._lock:
+            cache = self._load_all()
+            return {key: cache.get(key) for key in keys}
+
+    def load_versions(self, keys: Iterable[str]) -> dict[str, int]:
+        with self._lock:
+            self._load_all()
+            return {key: self._versions.get(key, 0) for key in keys}
+
+    def current_versions(self, keys: Iterable[str]) -> dict[str, int]:
+        with self._lock:
+            stored = self._stored_versions()
+            return {key: stored.get(key, 0) for key in keys}
+
+    def save_many(
+        self,
+        states: dict[str, Any],
+        expected_versions: Optional[dict[str, int]] = None,
+    ) -> None:
+        if not expected_versions:
+            with self._lock:
+                self._load_all().update(states)
+                # Flushing bumps each stored version once, so a snapshot taken
+                # now can compare-and-swap against the flushed versions
+                for key in states.keys() - self._pending.keys():
+                    self._versions[key] = self._versions.get(key, 0) + 1
+                self._pending.update(states)
+            return
+
+        self.flush()
+        with self._lock:
+            with self._connection:
+                # Take the write lock up front, so the check and write are atomic
+                self._connection.execute("BEGIN IMMEDIATE")
+                stored = self._stored_versions()
+                conflicts = [
+                    key
+                    for key, version in expected_versions.items()
+                    if stored.get(key, 0) != version
+                ]
+                if conflicts:
+                    # Leaving the block rolls the transaction back
+                    raise StateConflictError(conflicts)
+                self._write(states)
+            self._load_all().update(states)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._write(self._pending)
+            self._pending.clear()
+
+    def refresh(self) -> None:
+        self.flush()
+        with self._lock:
+            # Checking the versions is one small query, so this is cheap enough
+            # to run on every rerun; the state is only re-read if it changed
+            if self._cache is not None and self._stored_versions() != self._versions:
+                self._cache = None
+
+    def close(self) -> None:
+        """Flush buffered changes and close the database connection."""
+        self.flush()
+        self._finalizer()
@@ -1,14 +1,22 @@
 """
 State management service for the EV Charge Control Panel.
-Centralizes access to Streamlit session state.
+Centralizes access to state, stored through a pluggable backend
+(Streamlit session state by default).
 """
 
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, TypeVar
+
 import streamlit as st
 
 from src.config import (
     DEFAULT_SCHEDULE_ENABLED,
     DEFAULT_SCHEDULE_END,
     DEFAULT_SCHEDULE_START,
+    DEFAULT_VEHICLE_ID,
+    STATE_BACKEND,
+    STATE_COMMIT_ATTEMPTS,
+    STATE_DB_PATH,
 )
 from src.domain.battery import initialize_battery_state
 from src.domain.charging import initialize_charger_state
@@ -18,118 +26,291 @@ from src.domain.models import (
     ChargerState,
     DemoAdminState,
 )
+from src.services.state_backends import (
+    SessionStateBackend,
+    SQLiteStateBackend,
+    StateBackend,
+    StateConflictError,
+)
 from src.utils import get_current_time_to_nearest_30_minutes
 
+# Keys of the state objects held for each session
+STATE_KEYS = ("battery_state", "charger_state", "charge_schedule", "demo_state")
+
+T = TypeVar("T")
+
+
+@dataclass
+class StateSnapshot:
+    """
+    All of a session's state, read in one step.
+
+    Attributes:
+        battery_state: Current battery state
+        charger_state: Current charger state
+        charge_schedule: Current charge schedule
+        demo_state: Current demo state
+        versions: Version of each state as read, for compare-and-swap commits
+    """
+
+    battery_state: BatteryState
+    charger_state: ChargerState
+    charge_schedule: ChargeSchedule
+    demo_state: DemoAdminState
+    versions: dict[str, int] = field(default_factory=dict)
+
+
+def get_state_backend() -> StateBackend:
+    """
+    Get the state backend for this session, creating it on first use.
+
+    The backend is chosen by STATE_BACKEND. The SQLite backend stores the
+    vehicle named by the "vehicle" URL query parameter.
+
+    Returns:
+        StateBackend: Backend for this session
+    """
+    if "state_backend" not in st.session_state:
+        if STATE_BACKEND == "sqlite":
+            vehicle_id = st.query_params.get("vehicle", DEFAULT_VEHICLE_ID)
+            backend = SQLiteStateBackend(STATE_DB_PATH, vehicle_id)
+        else:
+            backend = SessionStateBackend()
+        st.session_state.state_backend = backend
+    return st.session_state.state_backend
+
+
+def set_state_backend(backend: StateBackend) -> None:
+    """
+    Use a specific state backend for this session.
+
+    Args:
+        backend: Backend to use
+    """
+    st.session_state.state_backend = backend
+
+
+def refresh_state() -> None:
+    """Flush pending writes and re-read state, picking up changes made elsewhere."""
+    get_state_backend().refresh()
+
+
+def flush_state() -> None:
+    """Write any pending state changes to the backend's store."""
+    get_state_backend().flush()
+
 
 def init_session_state() -> None:
     """Initialize all required session state variables."""
-    if "battery_state" not in st.session_state:
-        st.session_state.battery_state = initialize_battery_state()
+    backend = get_state_backend()
+    if backend.initialized:
+        return
+
+    states = backend.load_many(STATE_KEYS)
+    defaults = {}
 
-    if "charger_state" not in st.session_state:
-        st.session_state.charger_state = initialize_charger_state()
+    if states["battery_state"] is None:
+        defaults["battery_state"] = initialize_battery_state()
 
-    if "charge_schedule" not in st.session_state:
-        st.session_state.charge_schedule = ChargeSchedule(
+    if states["charger_state"] is None:
+        defaults["charger_state"] = initialize_charger_state()
+
+    if states["charge_schedule"] is None:
+        defaults["charge_schedule"] = ChargeSchedule(
             start_time=DEFAULT_SCHEDULE_START,
             end_time=DEFAULT_SCHEDULE_END,
             is_enabled=DEFAULT_SCHEDULE_ENABLED,
         )
 
-    if "demo_state" not in st.session_state:
+    if states["demo_state"] is None:
         rounded_time = get_current_time_to_nearest_30_minutes()
-        st.session_state.demo_state = DemoAdminState(
+        defaults["demo_state"] = DemoAdminState(
             car_is_plugged_in=True,
             current_time=rounded_time,
         )
 
+    if defaults:
+        backend.save_many(defaults)
+    backend.initialized = True
+
+
+def _initialized_backend() -> StateBackend:
+    """
+    Get the session's state backend, initializing state on first use.
+
+    Returns:
+        StateBackend: Backend for this session
+    """
+    backend = get_state_backend()
+    if not backend.initialized:
+        init_session_state()
+    return backend
+
+
+def snapshot() -> StateSnapshot:
+    """
+    Read all of the session's state in one step.
+
+    Returns:
+        StateSnapshot: Current battery, charger, schedule and demo states
+    """
+    backend = _initialized_backend()
+    return StateSnapshot(
+        **backend.load_many(STATE_KEYS), versions=backend.load_versions(STATE_KEYS)
+    )
+
+
+def commit(
+    changes: dict[str, Any], expected_versions: Optional[dict[str, int]] = None
+) -> None:
+    """
+    Write changed state in one step and persist it.
+
+    Args:
+        changes: New state by key, for the keys that changed only
+        expected_versions: Versions the state must still have for the write
+            to go ahead, by key (usually taken from a snapshot)
+
+    Raises:
+        ValueError: If a key is not a known state key
+        StateConflictError: If state changed since the expected versions
+    """
+    unknown = (set(changes) | set(expected_versions or ())) - set(STATE_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown state keys: {sorted(unknown)}")
+
+    backend = _initialized_backend()
+    backend.save_many(changes, expected_versions)
+    backend.flush()
+
+
+def get_versions() -> dict[str, int]:
+    """
+    Get the latest version of each state, without loading the state itself.
+
+    Returns:
+        dict[str, int]: Version by state key
+    """
+    return _initialized_backend().current_versions(STATE_KEYS)
+
+
+def has_changed_since(versions: Optional[dict[str, int]]) -> bool:
+    """
+    Check whether any state has changed since the given versions were seen.
+
+    Args:
+        versions: Versions last seen, e.g. from get_versions (None if never seen)
+
+    Returns:
+        bool: True if any state was written since
+    """
+    return versions != get_versions()
+
+
+def retry_on_conflict(
+    command: Callable[[StateSnapshot], T], attempts: int = STATE_COMMIT_ATTEMPTS
+) -> T:
+    """
+    Run a read-modify-commit command, retrying it on a fresh snapshot if
+    another writer changed the state in between.
+
+    Args:
+        command: Function taking a snapshot and committing with its versions
+        attempts: Maximum number of times to run the command
+
+    Returns:
+        Whatever the command returns
+
+    Raises:
+        StateConflictError: If every attempt conflicted
+    """
+    for attempt in range(attempts):
+        try:
+            return command(snapshot())
+        except StateConflictError:
+            if attempt == attempts - 1:
+                raise
+            refresh_state()
+
 
 def get_battery_state() -> BatteryState:
     """
-    Get the current battery state from session state.
+    Get the current battery state from the state backend.
 
     Returns:
         BatteryState: Current battery state
     """
-    init_session_state()
-    return st.session_state.battery_state
+    return _initialized_backend().load("battery_state")
 
 
 def get_charger_state() -> ChargerState:
     """
-    Get the current charger state from session state.
+    Get the current charger state from the state backend.
 
     Returns:
         ChargerState: Current charger state
     """
-    init_session_state()
-    return st.session_state.charger_state
+    return _initialized_backend().load("charger_state")
 
 
 def get_charge_schedule() -> ChargeSchedule:
     """
-    Get the current charge schedule from session state.
+    Get the current charge schedule from the state backend.
 
     Returns:
         ChargeSchedule: Current charge schedule
     """
-    init_session_state()
-    return st.session_state.charge_schedule
+    return _initialized_backend().load("charge_schedule")
 
 
 def get_demo_state() -> DemoAdminState:
     """
-    Get the current demo state from session state.
+    Get the current demo state from the state backend.
 
     Returns:
         DemoAdminState: Current demo state
     """
-    init_session_state()
-    return st.session_state.demo_state
+    return _initialized_backend().load("demo_state")
 
 
 def update_battery_state(battery_state: BatteryState) -> None:
     """
-    Update the battery state in session state.
+    Update the battery state in the state backend.
 
     Args:
         battery_state: New battery state
     """
-    init_session_state()
-    st.session_state.battery_state = battery_state
+    _initialized_backend().save("battery_state", battery_state)
 
 
 def update_charger_state(charger_state: ChargerState) -> None:
     """
-    Update the charger state in session state.
+    Update the charger state in the state backend.
 
     Args:
         charger_state: New charger state
     """
-    init_session_state()
-    st.session_state.charger_state = charger_state
+    _initialized_backend().save("charger_state", charger_state)
 
 
 def update_charge_schedule(charge_schedule: ChargeSchedule) -> None:
     """
-    Update the charge schedule in session state.
+    Update the charge schedule in the state backend.
 
     Args:
         charge_schedule: New charge schedule
     """
-    init_session_state()
-    st.session_state.charge_schedule = charge_schedule
+    _initialized_backend().save("charge_schedule", charge_schedule)
 
 
 def update_demo_state(demo_state: DemoAdminState) -> None:
     """
-    Update the demo state in session state.
+    Update the demo state in the state backend.
 
     Args:
         demo_state: New demo state
     """
-    init_session_state()
-    st.session_state.demo_state = demo_state
+    _initialized_backend().save("demo_state", demo_state)
 
 
 def get_current_states() -> tuple[ChargerState, BatteryState]:
@@ -142,23 +323,23 @@ def get_current_states() -> tuple[ChargerState, BatteryState]:
     """
     from src.domain.charging import update_charger_state
 
-    charger_state = get_charger_state()
-    battery_state = get_battery_state()
-    demo_state = get_demo_state()
-    charge_schedule = get_charge_schedule()
+    def derive(state: StateSnapshot) -> tuple[ChargerState, BatteryState]:
+        # Update charger state based on current time and schedule
+        updated_charger_state = update_charger_state(
+            state.charger_state, state.demo_state, state.charge_schedule
+        )
 
-    # Update charger state based on current time and schedule
-    updated_charger_state = update_charger_state(
-        charger_state, demo_state, charge_schedule
-    )
+        # Store the updated state if it changed, unless another writer got there
+        # first; the retry then derives it again from their state
+        if updated_charger_state is not state.charger_state:
+            commit(
+                {"charger_state": updated_charger_state},
+                {
+                    key: state.versions[key]
+                    for key in ("charger_state", "charge_schedule", "demo_state")
+                },
+            )
 
-    # Store the updated state if it changed
-    if (
-        updated_charger_state.car_is_charging != charger_state.car_is_charging
-        or updated_charger_state.charge_is_override != charger_state.charge_is_override
-        or updated_charger_state.override_end_time != charger_state.override_end_time
-    ):
-        # Use our own function to update the state in session_state
-        st.session_state.charger_state = updated_charger_state
+        return updated_charger_state, state.battery_state
 
-    return updated_charger_state, battery_state
+    return retry_on_conflict(derive)
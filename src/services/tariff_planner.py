@@ -0,0 +1,181 @@
+"""
+Tariff planning service for the EV Charge Control Panel.
+Chooses the cheapest slots to charge in before departure, for many vehicles at once.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Union
+
+import numpy as np
+
+from src.config import BATTERY_CAPACITY_KWH, PLAN_SLOT_MINUTES
+from src.domain.battery import calculate_charge_duration, project_soc_trajectory
+from src.services.fleet_forecast import FleetForecast, FleetState
+
+
+@dataclass
+class ChargePlan:
+    """
+    Cheapest charging plan for many vehicles over a shared time grid.
+
+    Attributes:
+        forecast: Forecast of charging to the plan, shape (N, T)
+        cost: Cost of the energy each vehicle is planned to draw, shape (N,)
+        reaches_target: Whether each vehicle reaches its target by departure
+    """
+
+    forecast: FleetForecast
+    cost: np.ndarray
+    reaches_target: np.ndarray
+
+
+def select_cheapest_slots(
+    prices: np.ndarray,
+    first_slot: np.ndarray,
+    end_slot: np.ndarray,
+    num_slots: np.ndarray,
+) -> np.ndarray:
+    """
+    Select each vehicle's cheapest slots within a range of slots.
+
+    Slots are ranked by price with one stable sort, so equally priced slots
+    are taken earliest first, and a tariff shared by the fleet is sorted
+    only once. The range is checked in price order, so only the selection
+    is moved back into time order.
+
+    Args:
+        prices: Price of each slot (NaN where charging is not allowed), shape
+            (T,) or (N, T)
+        first_slot: First slot each vehicle may charge in, shape (N,)
+        end_slot: Slot before which each vehicle must stop charging, shape (N,)
+        num_slots: Number of slots to select per vehicle, shape (N,)
+
+    Returns:
+        np.ndarray: Boolean mask of the selected slots, shape (N, T)
+    """
+    num_periods = prices.shape[-1]
+    order = np.argsort(prices, axis=-1, kind="stable")
+    # NaN sorts last, so the allowed slots are a prefix of the order
+    num_allowed = np.sum(~np.isnan(prices), axis=-1, keepdims=True)
+
+    available = (
+        (order >= first_slot[:, np.newaxis])
+        & (order < end_slot[:, np.newaxis])
+        & (np.arange(num_periods) < num_allowed)
+    )
+
+    # Keep the first num_slots available slots in price order
+    rank_dtype = np.int16 if num_periods < np.iinfo(np.int16).max else np.int64
+    chosen = available & (
+        np.cumsum(available, axis=1, dtype=rank_dtype) <= num_slots[:, np.newaxis]
+    )
+
+    if order.ndim == 1:
+        # Gathering through the inverse order is much faster than scattering
+        return np.take(chosen, np.argsort(order), axis=1)
+
+    selected = np.zeros_like(chosen)
+    np.put_along_axis(selected, order, chosen, axis=1)
+    return selected
+
+
+def plan_cheapest_charging(
+    fleet: FleetState,
+    prices: np.ndarray,
+    start_time: datetime,
+    departure_time: Union[datetime, np.ndarray],
+    slot_minutes: int = PLAN_SLOT_MINUTES,
+) -> ChargePlan:
+    """
+    Plan the cheapest charging that reaches each vehicle's target by departure.
+
+    An active override charges regardless of price, and the rest of the
+    energy is bought in the cheapest whole slots that end before departure.
+    The plan replaces the charge schedule.
+
+    Args:
+        fleet: Array snapshot of the vehicles
+        prices: Price per kWh of each slot from start_time, shape (T,) shared by
+            the fleet or (N, T) per vehicle (NaN where charging is not allowed)
+        start_time: Start of the first slot
+        departure_time: When each vehicle leaves, shared or shape (N,)
+        slot_minutes: Length of each slot in minutes
+
+    Returns:
+        ChargePlan: Planned charging, its forecast and its cost
+    """
+    prices = np.asarray(prices, dtype=float)
+    num_periods = prices.shape[-1]
+    slot = np.timedelta64(slot_minutes, "m")
+    slot_hours = slot_minutes / 60
+    start = np.datetime64(start_time, "us")
+    times = start + np.arange(num_periods) * slot
+
+    # Slots that end by departure
+    departure = np.broadcast_to(
+        np.asarray(departure_time, dtype="datetime64[us]"), (len(fleet),)
+    )
+    end_slot = np.clip((departure - start) // slot, 0, num_periods)
+
+    # Slots starting before the override ends; one without an end never expires
+    endless = np.isnat(fleet.override_end_time)
+    until_end = np.where(endless, start, fleet.override_end_time) - start
+    override_slots = np.where(
+        endless, num_periods, np.clip(-(-until_end // slot), 0, num_periods)
+    )
+    override_slots = np.where(fleet.charge_is_override, override_slots, 0)
+    is_override = np.arange(num_periods) < override_slots[:, np.newaxis]
+
+    plugged_in = fleet.car_is_plugged_in
+    forced_slots = np.where(plugged_in, override_slots, 0)
+    end_slot = np.where(plugged_in, end_slot, 0)
+
+    # Whole slots still needed once the override's charging is counted
+    needed_hours = calculate_charge_duration(
+        fleet.charge_rate_kw, fleet.current_soc, fleet.target_soc
+    )
+    with np.errstate(invalid="ignore"):
+        needed_slots = np.ceil(np.round(needed_hours / slot_hours, 9))
+    needed_slots = np.where(np.isfinite(needed_slots), needed_slots, 0.0) - np.minimum(
+        forced_slots, end_slot
+    )
+
+    is_charging = (plugged_in[:, np.newaxis] & is_override) | select_cheapest_slots(
+        prices, forced_slots, end_slot, needed_slots
+    )
+
+    soc = project_soc_trajectory(
+        fleet.current_soc,
+        fleet.target_soc,
+        fleet.charge_rate_kw,
+        is_charging,
+        slot_hours,
+    )
+
+    # Price the energy actually drawn, as the last slot may be part used
+    energy = np.diff(soc, axis=1, prepend=fleet.current_soc[:, np.newaxis])
+    charged_prices = np.where(np.isnan(prices), 0.0, prices)
+    if charged_prices.ndim == 1:
+        cost = energy @ charged_prices * BATTERY_CAPACITY_KWH
+    else:
+        cost = np.einsum("nt,nt->n", energy, charged_prices) * BATTERY_CAPACITY_KWH
+
+    # SoC never falls, so the SoC at departure is the one after the last slot
+    soc_at_departure = np.where(
+        end_slot > 0,
+        soc[np.arange(len(fleet)), np.maximum(end_slot - 1, 0)],
+        fleet.current_soc,
+    )
+    # Summing whole slots can fall short of the target by rounding alone
+    reaches_target = (soc_at_departure >= fleet.target_soc) | np.isclose(
+        soc_at_departure, fleet.target_soc
+    )
+
+    return ChargePlan(
+        forecast=FleetForecast(
+            times=times, soc=soc, is_charging=is_charging, is_override=is_override
+        ),
+        cost=cost,
+        reaches_target=reaches_target,
+    )
@@ -0,0 +1,366 @@
+"""
+Headless fleet simulation for the EV Charge Control Panel.
+Simulates many vehicles' charging sessions in parallel and writes them as columnar files.
+
+Usage:
+    python -m src.simulate --vehicles 10000 --days 365 --output simulation
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.config import (
+    BATTERY_CAPACITY_KWH,
+    DEFAULT_CHARGE_RATE_KW,
+    DEFAULT_SCHEDULE_END,
+    DEFAULT_SCHEDULE_START,
+    DEFAULT_TARGET_SOC,
+    SIMULATION_SHARD_SIZE,
+)
+from src.domain.battery import calculate_charge_added, calculate_charge_duration
+from src.domain.models import ChargeSchedule
+from src.domain.schedule import MICROSECONDS_PER_HOUR, ScheduleIndex, index_schedule
+
+MAX_SIMULATION_DAYS = 366
+OUTPUT_FORMATS = ("csv", "parquet")
+
+
+@dataclass(frozen=True)
+class ArrivalProfile:
+    """
+    When vehicles plug in and for how long, once a day.
+
+    Attributes:
+        arrival_hour: Mean time of arrival in hours since midnight
+        arrival_spread_hours: Standard deviation of the arrival time
+        dwell_hours: Mean time plugged in
+        dwell_spread_hours: Standard deviation of the time plugged in
+        arrival_soc_range: Lowest and highest state of charge on arrival
+    """
+
+    arrival_hour: float
+    arrival_spread_hours: float
+    dwell_hours: float
+    dwell_spread_hours: float
+    arrival_soc_range: tuple[float, float]
+
+
+PROFILES = {
+    "home": ArrivalProfile(18.0, 1.5, 13.0, 2.0, (0.2, 0.6)),
+    "depot": ArrivalProfile(19.0, 1.0, 10.0, 1.0, (0.1, 0.4)),
+    "workplace": ArrivalProfile(8.5, 1.0, 8.5, 1.0, (0.4, 0.7)),
+}
+
+
+@dataclass(frozen=True)
+class SimulationConfig:
+    """
+    Everything a simulation shard needs, so it can be sent to a worker process.
+
+    Attributes:
+        num_vehicles: Number of vehicles in the whole simulation
+        start_date: First day simulated
+        num_days: Number of days simulated
+        profile: Arrival and departure profile
+        schedule: Charge schedule, or None to charge as soon as plugged in
+        charge_rate_kw: Charging rate of every charger in kW
+        target_soc: Target state of charge of every vehicle
+        seed: Seed for the random arrivals
+        shard_size: Number of vehicles per shard
+        output_dir: Directory the files are written to
+        output_format: "csv" or "parquet"
+    """
+
+    num_vehicles: int
+    start_date: date
+    num_days: int
+    profile: ArrivalProfile
+    schedule: Optional[ChargeSchedule]
+    charge_rate_kw: float
+    target_soc: float
+    seed: int
+    shard_size: int
+    output_dir: str
+    output_format: str
+
+    @property
+    def num_shards(self) -> int:
+        return -(-self.num_vehicles // self.shard_size)
+
+
+def generate_sessions(
+    config: SimulationConfig, first_vehicle: int, num_vehicles: int
+) -> dict[str, np.ndarray]:
+    """
+    Draw each vehicle's daily plug-in sessions from the arrival profile.
+
+    Args:
+        config: Simulation settings
+        first_vehicle: Number of the shard's first vehicle
+        num_vehicles: Number of vehicles in the shard
+
+    Returns:
+        dict[str, np.ndarray]: Vehicle, arrival, departure and arrival SoC
+            of each session, flattened vehicle by vehicle
+    """
+    # Seeded by shard, so results do not depend on the number of workers
+    rng = np.random.default_rng([config.seed, first_vehicle])
+    profile = config.profile
+    shape = (num_vehicles, config.num_days)
+
+    days = np.datetime64(config.start_date, "us") + np.arange(
+        config.num_days
+    ) * np.timedelta64(1, "D")
+    arrival_hours = np.clip(
+        rng.normal(profile.arrival_hour, profile.arrival_spread_hours, shape), 0, 24
+    )
+    dwell_hours = np.clip(
+        rng.normal(profile.dwell_hours, profile.dwell_spread_hours, shape), 0.25, 24
+    )
+    arrivals = days + (arrival_hours * MICROSECONDS_PER_HOUR).astype("timedelta64[us]")
+    departures = arrivals + (dwell_hours * MICROSECONDS_PER_HOUR).astype(
+        "timedelta64[us]"
+    )
+    # A car leaves before it arrives again
+    departures[:, :-1] = np.minimum(departures[:, :-1], arrivals[:, 1:])
+
+    return {
+        "vehicle": np.repeat(
+            np.arange(first_vehicle, first_vehicle + num_vehicles), config.num_days
+        ),
+        "arrival": arrivals.ravel(),
+        "departure": departures.ravel(),
+        "arrival_soc": rng.uniform(*profile.arrival_soc_range, shape).ravel(),
+    }
+
+
+def charge_sessions(
+    sessions: dict[str, np.ndarray],
+    schedule_index: Optional[ScheduleIndex],
+    charge_rate_kw: float,
+    target_soc: float,
+) -> dict[str, np.ndarray]:
+    """
+    Charge every session as the charging rules would, in closed form.
+
+    A plugged-in car charges whenever it is inside its schedule (or all the
+    time without one) until it reaches its target.
+
+    Args:
+        sessions: Sessions from generate_sessions
+        schedule_index: Index of the charge schedule, or None
+        charge_rate_kw: Charging rate in kW
+        target_soc: Target state of charge
+
+    Returns:
+        dict[str, np.ndarray]: The sessions with departure SoC, charging hours
+            and energy added
+    """
+    arrival, departure = sessions["arrival"], sessions["departure"]
+    if schedule_index is None:
+        available_hours = (departure - arrival) / np.timedelta64(1, "h")
+    else:
+        available_hours = schedule_index.scheduled_hours_between(arrival, departure)
+
+    needed_hours = calculate_charge_duration(
+        charge_rate_kw, sessions["arrival_soc"], target_soc
+    )
+    charging_hours = np.minimum(needed_hours, available_hours)
+    soc_added = calculate_charge_added(charge_rate_kw, charging_hours)
+
+    return {
+        **sessions,
+        "departure_soc": np.minimum(sessions["arrival_soc"] + soc_added, target_soc),
+        "charging_hours": charging_hours,
+        "energy_kwh": soc_added * BATTERY_CAPACITY_KWH,
+    }
+
+
+def write_table(columns: dict[str, np.ndarray], path: str, output_format: str) -> None:
+    """
+    Write columns to a CSV or Parquet file.
+
+    Args:
+        columns: Column name to values
+        path: File to write, without extension
+        output_format: "csv" or "parquet" (needs pyarrow)
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(columns)
+    if output_format == "parquet":
+        frame.to_parquet(f"{path}.parquet", index=False)
+    else:
+        frame.to_csv(f"{path}.csv", index=False)
+
+
+def simulate_shard(config: SimulationConfig, shard: int) -> dict[str, float]:
+    """
+    Simulate one shard of vehicles and write its sessions and vehicle totals.
+
+    Args:
+        config: Simulation settings
+        shard: Number of the shard
+
+    Returns:
+        dict[str, float]: Vehicles, sessions and energy simulated in the shard
+    """
+    first_vehicle = shard * config.shard_size
+    num_vehicles = min(config.shard_size, config.num_vehicles - first_vehicle)
+    schedule_index = (
+        index_schedule(config.schedule) if config.schedule is not None else None
+    )
+
+    sessions = charge_sessions(
+        generate_sessions(config, first_vehicle, num_vehicles),
+        schedule_index,
+        config.charge_rate_kw,
+        config.target_soc,
+    )
+
+    # Sessions are grouped by vehicle, so totals are a reshape away
+    per_vehicle = (num_vehicles, config.num_days)
+    totals = {
+        "vehicle": np.arange(first_vehicle, first_vehicle + num_vehicles),
+        "sessions": np.full(num_vehicles, config.num_days),
+        "charging_hours": sessions["charging_hours"].reshape(per_vehicle).sum(axis=1),
+        "energy_kwh": sessions["energy_kwh"].reshape(per_vehicle).sum(axis=1),
+    }
+
+    name = f"part-{shard:05d}"
+    write_table(
+        sessions,
+        os.path.join(config.output_dir, "sessions", name),
+        config.output_format,
+    )
+    write_table(
+        totals,
+        os.path.join(config.output_dir, "vehicles", name),
+        config.output_format,
+    )
+
+    return {
+        "vehicles": num_vehicles,
+        "sessions": len(sessions["arrival"]),
+        "energy_kwh": float(totals["energy_kwh"].sum()),
+    }
+
+
+def run_simulation(
+    config: SimulationConfig, workers: Optional[int] = None
+) -> dict[str, float]:
+    """
+    Simulate every shard across a pool of processes.
+
+    Args:
+        config: Simulation settings
+        workers: Number of worker processes (defaults to one per core)
+
+    Returns:
+        dict[str, float]: Vehicles, sessions and energy simulated in total
+    """
+    for table in ("sessions", "vehicles"):
+        os.makedirs(os.path.join(config.output_dir, table), exist_ok=True)
+
+    summary = {"vehicles": 0, "sessions": 0, "energy_kwh": 0.0}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        shards = range(config.num_shards)
+        # Shards are written by the workers, so only small summaries come back
+        for result in pool.map(simulate_shard, [config] * len(shards), shards):
+            for key, value in result.items():
+                summary[key] += value
+    return summary
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+
+    Args:
+        argv: Arguments (defaults to sys.argv)
+
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.simulate",
+        description="Simulate charging for a fleet of vehicles.",
+    )
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument(
+        "--start-date", type=date.fromisoformat, default=date(2025, 1, 1)
+    )
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="home")
+    parser.add_argument(
+        "--schedule-start", type=time.fromisoformat, default=DEFAULT_SCHEDULE_START
+    )
+    parser.add_argument(
+        "--schedule-end", type=time.fromisoformat, default=DEFAULT_SCHEDULE_END
+    )
+    parser.add_argument(
+        "--immediate",
+        action="store_true",
+        help="charge as soon as plugged in instead of on the schedule",
+    )
+    parser.add_argument("--charge-rate", type=float, default=DEFAULT_CHARGE_RATE_KW)
+    parser.add_argument("--target-soc", type=float, default=DEFAULT_TARGET_SOC)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shard-size", type=int, default=SIMULATION_SHARD_SIZE)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="defaults to one per core"
+    )
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="csv")
+    parser.add_argument("--output", default="simulation")
+
+    args = parser.parse_args(argv)
+    if not 1 <= args.days <= MAX_SIMULATION_DAYS:
+        parser.error(f"--days must be between 1 and {MAX_SIMULATION_DAYS}")
+    if args.vehicles < 1 or args.shard_size < 1:
+        parser.error("--vehicles and --shard-size must be positive")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the fleet simulation from the command line."""
+    args = parse_args(argv)
+    config = SimulationConfig(
+        num_vehicles=args.vehicles,
+        start_date=args.start_date,
+        num_days=args.days,
+        profile=PROFILES[args.profile],
+        schedule=(
+            None
+            if args.immediate
+            else ChargeSchedule(
+                start_time=args.schedule_start, end_time=args.schedule_end
+            )
+        ),
+        charge_rate_kw=args.charge_rate,
+        target_soc=args.target_soc,
+        seed=args.seed,
+        shard_size=args.shard_size,
+        output_dir=args.output,
+        output_format=args.format,
+    )
+
+    started = datetime.now()
+    summary = run_simulation(config, args.workers)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    print(
+        f"Simulated {summary['vehicles']} vehicles, {summary['sessions']} sessions, "
+        f"{summary['energy_kwh']:.0f} kWh in {elapsed:.1f}s -> {args.output}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
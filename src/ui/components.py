@@ -4,9 +4,18 @@ UI components for the EV Charge Control Panel.
 
 import streamlit as st
 
-from src.domain.models import BatteryState, ChargeSchedule, ChargerState, DemoAdminState
+from src.domain.models import (
+    EVERY_DAY,
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    ScheduleWindow,
+)
 from src.services import scheduler
 
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
 
 def status_panel(
     battery_state: BatteryState, charger_state: ChargerState, demo_state: DemoAdminState
@@ -50,6 +59,26 @@ def status_panel(
         st.write("💤 Charging: Inactive")
 
 
+def format_schedule_window(window: ScheduleWindow) -> str:
+    """
+    Describe a schedule window, e.g. "Mon, Tue: 2:00 AM - 5:00 AM".
+
+    Args:
+        window: Schedule window
+
+    Returns:
+        str: Description of the window
+    """
+    times = (
+        f"{window.start_time.strftime('%-I:%M %p')} - "
+        f"{window.end_time.strftime('%-I:%M %p')}"
+    )
+    if set(window.weekdays) == set(EVERY_DAY):
+        return f"Daily: {times}"
+    days = ", ".join(WEEKDAY_NAMES[day] for day in sorted(set(window.weekdays)))
+    return f"{days}: {times}"
+
+
 def charging_info(charger_state: ChargerState, charge_schedule: ChargeSchedule) -> None:
     """
     Display charging schedule and rate information.
@@ -61,11 +90,15 @@ def charging_info(charger_state: ChargerState, charge_schedule: ChargeSchedule)
     st.subheader("Charging Info")
 
     # Format schedule times
-    start_time_str = charge_schedule.start_time.strftime("%-I:%M %p")
-    end_time_str = charge_schedule.end_time.strftime("%-I:%M %p")
-
     schedule_status = "Enabled" if charge_schedule.is_enabled else "Disabled"
-    st.write(f"⏰ Schedule: {start_time_str} - {end_time_str} ({schedule_status})")
+    if charge_schedule.windows:
+        st.write(f"⏰ Schedule ({schedule_status}):")
+        for window in charge_schedule.windows:
+            st.write(f"- {format_schedule_window(window)}")
+    else:
+        start_time_str = charge_schedule.start_time.strftime("%-I:%M %p")
+        end_time_str = charge_schedule.end_time.strftime("%-I:%M %p")
+        st.write(f"⏰ Schedule: {start_time_str} - {end_time_str} ({schedule_status})")
 
     # Show override end time if applicable
     if charger_state.charge_is_override and charger_state.override_end_time:
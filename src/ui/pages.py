@@ -4,10 +4,9 @@ Page layouts for the EV Charge Control Panel.
 
 import streamlit as st
 
-from src.domain.models import DemoAdminState
+from src.domain.models import DemoAdminState, evolve
 from src.services import state_manager
 from src.ui.components import status_panel, charging_info, control_buttons
-from src.ui.visualization import plot_charge_forecast
 from src.utils import get_current_time_to_nearest_30_minutes
 
 
@@ -19,9 +18,10 @@ def admin_panel() -> DemoAdminState:
         DemoAdminState: Updated demo state
     """
     # Start with current values from session state
-    current_demo_state = state_manager.get_demo_state()
-    current_battery_state = state_manager.get_battery_state()
-    current_charge_schedule = state_manager.get_charge_schedule()
+    state = state_manager.snapshot()
+    current_demo_state = state.demo_state
+    current_battery_state = state.battery_state
+    current_charge_schedule = state.charge_schedule
 
     rounded_time = (
         current_demo_state.current_time
@@ -50,8 +50,7 @@ def admin_panel() -> DemoAdminState:
             value=int(current_battery_state.current_soc * 100),
             step=5,
         )
-        current_battery_state.current_soc = current_soc / 100
-        state_manager.update_battery_state(current_battery_state)
+        battery_state = evolve(current_battery_state, current_soc=current_soc / 100)
 
         # Allow adjusting charge schedule
         st.subheader("Charge Schedule")
@@ -63,53 +62,113 @@ def admin_panel() -> DemoAdminState:
         )
 
         # Update the schedule
-        current_charge_schedule.start_time = schedule_start
-        current_charge_schedule.end_time = schedule_end
-        state_manager.update_charge_schedule(current_charge_schedule)
+        charge_schedule = evolve(
+            current_charge_schedule, start_time=schedule_start, end_time=schedule_end
+        )
 
     # Update the demo state
-    demo_state = DemoAdminState(
-        car_is_plugged_in=car_is_plugged_in, current_time=current_time
+    demo_state = evolve(
+        current_demo_state,
+        car_is_plugged_in=car_is_plugged_in,
+        current_time=current_time,
     )
-    state_manager.update_demo_state(demo_state)
+
+    # Only write what changed, so readers can tell nothing did from the versions
+    updates = {
+        "battery_state": (battery_state, current_battery_state),
+        "charge_schedule": (charge_schedule, current_charge_schedule),
+        "demo_state": (demo_state, current_demo_state),
+    }
+    changes = {key: new for key, (new, old) in updates.items() if new is not old}
+    if changes:
+        state_manager.commit(changes)
 
     return demo_state
 
 
-def main_panel():
-    """Display the main control panel for the EV charger."""
-    st.title("EV Charge Control Panel")
+@st.fragment
+def charging_panel() -> None:
+    """
+    Display the status, charging info, controls and forecast chart.
+    Runs as a fragment, so using the controls only reruns this panel. The
+    status and the chart are fragments nested inside it, so either can also
+    rerun on its own.
+    """
+    # Fragment reruns skip the app's refresh, so pick up others' changes here
+    state_manager.refresh_state()
 
-    # Get current states
-    demo_state = admin_panel()
-    charger_state, battery_state = state_manager.get_current_states()
-    charge_schedule = state_manager.get_charge_schedule()
+    charger_state, _ = state_manager.get_current_states()
+    demo_state = state_manager.get_demo_state()
 
     # Display status panels
-    status, info = st.columns([1, 1])
-
-    with status:
-        status_panel(battery_state, charger_state, demo_state)
-
-    with info:
-        charging_info(charger_state, charge_schedule)
+    charging_status()
 
-    # Display charging schedule chart
+    # Reserve the chart's place on the page, but paint the controls first
     st.subheader("Charging Schedule")
-    from src.services.scheduler import get_future_states
-
-    future_states = get_future_states(demo_state)
-    st.plotly_chart(
-        plot_charge_forecast(
-            future_states,
-            current_time=demo_state.current_time,
-        ),
-        use_container_width=True,
-    )
+    chart = st.container()
 
-    # Display controls
+    # Display controls. Their commands run as callbacks before this panel
+    # reruns, so both nested fragments already see the new state
     start_charging, stop_charging = control_buttons(
         demo_state.car_is_plugged_in,
         charger_state.car_is_charging,
         charger_state.charge_is_override,
     )
+
+    # Display charging schedule chart
+    with chart:
+        forecast_chart()
+
+    # Persist changes made by the controls when only this fragment reruns
+    state_manager.flush_state()
+
+
+@st.fragment
+def charging_status() -> None:
+    """Display the current status and charging info side by side."""
+    charger_state, battery_state = state_manager.get_current_states()
+    state = state_manager.snapshot()
+
+    status, info = st.columns([1, 1])
+
+    with status:
+        status_panel(battery_state, charger_state, state.demo_state)
+
+    with info:
+        charging_info(charger_state, state.charge_schedule)
+
+
+@st.fragment
+def forecast_chart() -> None:
+    """
+    Display the charging forecast chart.
+    Nothing is recomputed while the state versions are unchanged, and the
+    figure is only rebuilt when the forecast inputs have changed.
+    """
+    # Deferred so pandas and plotly are only loaded once the chart is drawn
+    from src.services.scheduler import get_forecast_frame, get_forecast_key
+    from src.ui.visualization import plot_charge_forecast
+
+    versions = state_manager.get_versions()
+    if versions != st.session_state.get("chart_versions"):
+        demo_state = state_manager.get_demo_state()
+        forecast_key = get_forecast_key(demo_state)
+
+        if st.session_state.get("chart_key") != forecast_key:
+            st.session_state.chart_figure = plot_charge_forecast(
+                get_forecast_frame(demo_state),
+                current_time=demo_state.current_time,
+            )
+            st.session_state.chart_key = forecast_key
+        st.session_state.chart_versions = versions
+
+    st.plotly_chart(st.session_state.chart_figure, use_container_width=True)
+
+
+def main_panel():
+    """Display the main control panel for the EV charger."""
+    st.title("EV Charge Control Panel")
+
+    # Changes in the admin panel rerun the whole page
+    admin_panel()
+    charging_panel()
@@ -3,18 +3,40 @@ Visualization components for the EV Charge Control Panel.
 """
 
 from datetime import datetime, timedelta
+from typing import Optional, Union
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 from plotly.graph_objs import Figure
 
-from src.config import PERIOD_MINUTES
-from src.domain.models import CombinedState
+from src.config import CHART_MAX_POINTS, PERIOD_MINUTES
+from src.domain.models import CombinedState, ForecastFrame
 
 # These set the resampling period for graphing
 PERIOD = timedelta(minutes=PERIOD_MINUTES)
 
 
+def _convert_frame_to_dataframe(frame: ForecastFrame) -> pd.DataFrame:
+    """
+    Convert a ForecastFrame to a pandas DataFrame for plotting.
+
+    Args:
+        frame: Columnar forecast
+
+    Returns:
+        pd.DataFrame: DataFrame with time, SoC, and charging status
+    """
+    return pd.DataFrame(
+        {
+            "Time": frame.times,
+            "State of Charge": frame.soc,
+            "Car is Charging": frame.is_charging,
+            "Charge is Override": frame.is_override,
+        }
+    )
+
+
 def _convert_states_to_dataframe(states: list[CombinedState]) -> pd.DataFrame:
     """
     Convert a list of CombinedState objects to a pandas DataFrame for plotting.
@@ -25,47 +47,119 @@ def _convert_states_to_dataframe(states: list[CombinedState]) -> pd.DataFrame:
     Returns:
         pd.DataFrame: DataFrame with time, SoC, and charging status
     """
-    if not states:
-        # Return empty dataframe with expected columns if no states
-        return pd.DataFrame(
-            columns=["Time", "State of Charge", "Car is Charging", "Charge is Override"]
-        )
+    return _convert_frame_to_dataframe(ForecastFrame.from_states(states))
 
-    # Extract data from CombinedState objects
-    times = [state.time for state in states]
-    socs = [state.battery_state.current_soc for state in states]
-    car_is_charging = [state.charger_state.car_is_charging for state in states]
-    charge_is_override = [state.charger_state.charge_is_override for state in states]
 
-    df = pd.DataFrame(
-        {
-            "Time": times,
-            "State of Charge": socs,
-            "Car is Charging": car_is_charging,
-            "Charge is Override": charge_is_override,
-        }
+def _charging_bands(frame: ForecastFrame) -> list[tuple[int, int, bool]]:
+    """
+    Run-length encode the charging masks into contiguous charging sessions.
+
+    Args:
+        frame: Columnar forecast
+
+    Returns:
+        list[tuple[int, int, bool]]: Start index, end index (exclusive) and
+            whether charging is from an override, for each session
+    """
+    if not len(frame):
+        return []
+
+    # 0 = not charging, 1 = scheduled, 2 = override
+    kind = frame.is_charging * (1 + frame.is_override.astype(np.int8))
+    boundaries = np.flatnonzero(np.diff(kind)) + 1
+    starts = np.concatenate([[0], boundaries])
+    ends = np.concatenate([boundaries, [len(kind)]])
+
+    return [
+        (int(start), int(end), bool(kind[start] == 2))
+        for start, end in zip(starts, ends)
+        if kind[start]
+    ]
+
+
+def _downsample_indices(frame: ForecastFrame, max_points: int) -> np.ndarray:
+    """
+    Pick at most max_points periods that preserve the shape of the SoC line.
+
+    Points where the SoC slope or the charging state changes (charge start,
+    stop and target reached) are always kept first, then the remaining
+    budget is filled with the min and max of equal-sized buckets.
+
+    Args:
+        frame: Columnar forecast
+        max_points: Maximum number of periods to keep
+
+    Returns:
+        np.ndarray: Sorted indices of the periods to keep
+    """
+    num_points = len(frame)
+    if num_points <= max_points:
+        return np.arange(num_points)
+
+    # The SoC is piecewise linear, so its corners carry the whole shape
+    slope = np.diff(frame.soc)
+    corners = np.flatnonzero(~np.isclose(np.diff(slope), 0.0, atol=1e-12)) + 1
+    kind = frame.is_charging * (1 + frame.is_override.astype(np.int8))
+    changes = np.flatnonzero(np.diff(kind)) + 1
+    important = np.unique(
+        np.concatenate([[0, num_points - 1], corners, changes - 1, changes])
     )
 
-    # Only reset index if one exists, otherwise just return the dataframe
-    if df.index.name is not None or not df.index.equals(
-        pd.RangeIndex(start=0, stop=len(df))
-    ):
-        return df.reset_index()
-    return df
+    if len(important) >= max_points:
+        # Too many features to keep them all, so spread the budget over them
+        keep = np.linspace(0, len(important) - 1, max_points).round().astype(int)
+        return np.unique(important[keep])
+
+    # Min/max of each bucket keeps peaks and troughs between the features
+    num_buckets = (max_points - len(important)) // 2
+    if num_buckets == 0:
+        return important
+    bucket_size = -(-num_points // num_buckets)
+    padded = np.pad(frame.soc, (0, num_buckets * bucket_size - num_points), "edge")
+    buckets = padded.reshape(num_buckets, bucket_size)
+    offsets = np.arange(num_buckets) * bucket_size
+    extremes = np.concatenate(
+        [offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)]
+    )
 
+    return np.unique(np.concatenate([important, np.minimum(extremes, num_points - 1)]))
 
-def plot_charge_forecast(states: list[CombinedState], current_time: datetime) -> Figure:
+
+def plot_charge_forecast(
+    forecast: Union[ForecastFrame, list[CombinedState]],
+    current_time: datetime,
+    max_points: int = CHART_MAX_POINTS,
+    history: Optional[ForecastFrame] = None,
+) -> Figure:
     """
     Plot a forecast of battery charge and charging periods.
 
+    Forecasts longer than max_points are downsampled and drawn with WebGL,
+    so the figure stays small however long the forecast is.
+
     Args:
-        states: List of future combined states
+        forecast: Future forecast, or a list of future combined states
         current_time: Current time for reference line
+        max_points: Maximum number of points to draw on the line
+        history: Recorded past states to draw next to the forecast
 
     Returns:
         Figure: Plotly figure showing charge trajectory
     """
-    df = _convert_states_to_dataframe(states)
+    if not isinstance(forecast, ForecastFrame):
+        forecast = ForecastFrame.from_states(forecast)
+
+    downsample = len(forecast) > max_points
+    line = forecast
+    if downsample:
+        indices = _downsample_indices(forecast, max_points)
+        line = ForecastFrame(
+            times=forecast.times[indices],
+            soc=forecast.soc[indices],
+            is_charging=forecast.is_charging[indices],
+            is_override=forecast.is_override[indices],
+        )
+    df = _convert_frame_to_dataframe(line)
 
     # Format SoC as percentage for display
     df["SoC %"] = df["State of Charge"] * 100
@@ -77,6 +171,7 @@ def plot_charge_forecast(states: list[CombinedState], current_time: datetime) ->
         y="SoC %",
         title="Battery Charge Forecast",
         labels={"SoC %": "State of Charge (%)"},
+        render_mode="webgl" if downsample else "auto",
     )
 
     # Customize layout
@@ -105,21 +200,19 @@ def plot_charge_forecast(states: list[CombinedState], current_time: datetime) ->
     # Add "Now" annotation
     fig.add_annotation(x=current_time, y=100, text="Now", showarrow=False, yshift=10)
 
-    # Add vertical rectangles for charging periods
-    last_label_type = None
-    for i, row in df.iterrows():
-        if not row["Car is Charging"]:
-            continue
-
-        # Only add label if this is a different type than the last one
-        label_type = "Override" if row["Charge is Override"] else "Scheduled"
-        show_label = label_type != last_label_type
-        last_label_type = label_type
+    # Bands last as long as the forecast's periods, e.g. a tariff plan's slots
+    period = (
+        pd.Timedelta(forecast.times[1] - forecast.times[0])
+        if len(forecast) > 1
+        else PERIOD
+    )
 
-        # Add rectangle shape for charging period
-        rect_color = "red" if row["Charge is Override"] else "green"
-        time_start = row["Time"]
-        time_end = time_start + PERIOD
+    # Add one vertical band per contiguous charging session
+    for start, end, is_override in _charging_bands(forecast):
+        label_type = "Override" if is_override else "Scheduled"
+        rect_color = "red" if is_override else "green"
+        time_start = pd.Timestamp(forecast.times[start])
+        time_end = pd.Timestamp(forecast.times[end - 1]) + period
 
         fig.add_shape(
             type="rect",
@@ -133,24 +226,29 @@ def plot_charge_forecast(states: list[CombinedState], current_time: datetime) ->
             line_width=0,
         )
 
-        # Add label annotation if needed
-        if show_label:
-            # Calculate middle point for annotation
-            if isinstance(time_start, pd.Timestamp):
-                # For pandas Timestamp objects
-                time_mid = time_start + pd.Timedelta(PERIOD / 2)
-            else:
-                # For datetime objects
-                time_mid = time_start + (time_end - time_start) / 2
-
-            fig.add_annotation(
-                x=time_mid,
-                y=100,
-                text=label_type,
-                showarrow=False,
-                font=dict(color=rect_color),
-                yshift=10,
-            )
-
-    fig.update_traces(mode="markers+lines", line=dict(width=3))
+        # Label the band once, in its middle
+        fig.add_annotation(
+            x=time_start + (time_end - time_start) / 2,
+            y=100,
+            text=label_type,
+            showarrow=False,
+            font=dict(color=rect_color),
+            yshift=10,
+        )
+
+    # Markers only help when every period is drawn
+    fig.update_traces(
+        mode="lines" if downsample else "markers+lines", line=dict(width=3)
+    )
+
+    if history is not None and len(history):
+        # History is drawn as recorded, thinned the same way as the forecast
+        indices = _downsample_indices(history, max_points)
+        fig.add_scatter(
+            x=pd.DatetimeIndex(history.times[indices]),
+            y=np.asarray(history.soc[indices]) * 100,
+            mode="lines",
+            name="History",
+            line=dict(width=2, dash="dot"),
+        )
     return fig
@@ -1,12 +1,20 @@
+from dataclasses import replace
+from datetime import datetime, time, timedelta
+
+import numpy as np
 import pytest
 
 from src.config import BATTERY_CAPACITY_KWH
 from src.domain.battery import (
     calculate_charge_added,
+    calculate_charge_duration,
+    calculate_energy_to_soc,
+    estimate_time_to_soc,
     initialize_battery_state,
     project_battery_state,
+    project_soc_trajectory,
 )
-from src.domain.models import BatteryState, ChargerState
+from src.domain.models import BatteryState, ChargeSchedule, ChargerState
 
 
 def test_initialize_battery_state():
@@ -78,3 +86,114 @@ def test_project_battery_state_reach_target():
     # Even with a full hour of charging, we should cap at the target
     assert projected.current_soc == pytest.approx(0.8)
     assert projected.current_soc <= initial_state.target_soc
+
+
+def test_project_battery_state_at_target_is_unchanged():
+    """Test that a full battery keeps its instance while charging."""
+    full_state = BatteryState(current_soc=0.8, target_soc=0.8)
+    charger_state = ChargerState(
+        car_is_charging=True, charge_is_override=True, charge_rate_kw=7.0
+    )
+
+    assert project_battery_state(full_state, charger_state, 1.0) is full_state
+
+
+def test_project_soc_trajectory_clamps_at_target():
+    """Test that the vectorized trajectory stops at the target SoC."""
+    soc = project_soc_trajectory(
+        np.array([0.7, 0.9]),
+        np.array([0.8, 0.8]),
+        np.array([7.5, 7.5]),
+        np.array([[True, True, False], [False, True, True]]),
+        1.0,
+    )
+
+    assert soc[0].tolist() == pytest.approx([0.8, 0.8, 0.8])
+    # Above target stays put until the car actually charges
+    assert soc[1].tolist() == pytest.approx([0.9, 0.8, 0.8])
+
+
+def test_calculate_energy_and_duration_to_soc():
+    """Test the energy and charging time needed to reach a level."""
+    assert calculate_energy_to_soc(0.6, 0.8) == pytest.approx(
+        0.2 * BATTERY_CAPACITY_KWH
+    )
+    assert calculate_energy_to_soc(0.9, 0.8) == 0.0
+
+    hours = calculate_charge_duration(7.0, 0.6, 0.8)
+    assert calculate_charge_added(7.0, hours) == pytest.approx(0.2)
+    assert calculate_charge_duration(0.0, 0.6, 0.8) == np.inf
+
+    # Vectorized over several vehicles
+    durations = calculate_charge_duration(
+        np.array([7.0, 3.5]), np.array([0.6, 0.6]), 0.8
+    )
+    assert durations.tolist() == pytest.approx([hours, 2 * hours])
+
+
+def test_estimate_time_to_soc_override_then_schedule():
+    """Test an ETA that needs the override and then the overnight schedule."""
+    current_time = datetime(2025, 1, 1, 12, 0)
+    battery_state = BatteryState(current_soc=0.2, target_soc=0.8)
+    charger_state = ChargerState(
+        car_is_charging=True,
+        charge_is_override=True,
+        charge_rate_kw=7.5,
+        override_end_time=datetime(2025, 1, 1, 13, 0),
+    )
+    schedule = ChargeSchedule(start_time=time(22, 0), end_time=time(2, 0))
+
+    # 0.6 of 75 kWh at 7.5 kW is 6 hours: 1 from the override, 4 on the
+    # first night and 1 on the second
+    eta = estimate_time_to_soc(battery_state, charger_state, schedule, current_time)
+
+    assert abs(eta - datetime(2025, 1, 2, 23, 0)) < timedelta(seconds=1)
+
+
+def test_estimate_time_to_soc_in_window():
+    """Test an ETA that starts part way through the schedule window."""
+    eta = estimate_time_to_soc(
+        BatteryState(current_soc=0.6, target_soc=0.8),
+        ChargerState(car_is_charging=True, charge_is_override=False),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        datetime(2025, 1, 1, 4, 0),
+        to_soc=0.7,
+    )
+
+    # 1 hour tonight and the rest from 2am tomorrow
+    hours = calculate_charge_duration(7.0, 0.6, 0.7)
+    expected = datetime(2025, 1, 2, 2, 0) + timedelta(hours=hours - 1)
+    assert abs(eta - expected) < timedelta(seconds=1)
+
+
+def test_estimate_time_to_soc_unreachable():
+    """Test that unreachable levels have no ETA."""
+    battery_state = BatteryState(current_soc=0.6, target_soc=0.8)
+    charger_state = ChargerState(car_is_charging=False, charge_is_override=False)
+    schedule = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+    current_time = datetime(2025, 1, 1, 12, 0)
+
+    assert (
+        estimate_time_to_soc(
+            battery_state, charger_state, schedule, current_time, False
+        )
+        is None
+    )
+    assert (
+        estimate_time_to_soc(
+            battery_state, charger_state, schedule, current_time, to_soc=0.9
+        )
+        is None
+    )
+    schedule = replace(schedule, is_enabled=False)
+    assert (
+        estimate_time_to_soc(battery_state, charger_state, schedule, current_time)
+        is None
+    )
+    # Already reached
+    assert (
+        estimate_time_to_soc(
+            battery_state, charger_state, schedule, current_time, to_soc=0.5
+        )
+        == current_time
+    )
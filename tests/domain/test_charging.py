@@ -1,7 +1,19 @@
-from datetime import time
+from dataclasses import replace
+from datetime import datetime, time
 
-from src.domain.charging import is_in_scheduled_window
-from src.domain.models import ChargeSchedule
+import pytest
+
+from src.domain.charging import (
+    is_in_scheduled_window,
+    schedule_transitions,
+    update_charger_state,
+)
+from src.domain.models import (
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    ScheduleWindow,
+)
 
 
 def test_is_in_scheduled_window_normal_schedule():
@@ -54,3 +66,54 @@ def test_is_in_scheduled_window_disabled_schedule():
     assert not is_in_scheduled_window(time(2, 0), schedule)
     assert not is_in_scheduled_window(time(3, 30), schedule)
     assert not is_in_scheduled_window(time(5, 0), schedule)
+
+
+def test_schedule_transitions_overnight():
+    """Test listing schedule boundaries across midnight."""
+    schedule = ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0))
+
+    transitions = schedule_transitions(
+        schedule, datetime(2025, 1, 1, 12, 0), datetime(2025, 1, 2, 22, 0)
+    )
+
+    assert transitions == [
+        datetime(2025, 1, 1, 22, 0),
+        datetime(2025, 1, 2, 5, 0),
+    ]
+    schedule = replace(schedule, is_enabled=False)
+    assert (
+        schedule_transitions(
+            schedule, datetime(2025, 1, 1, 12, 0), datetime(2025, 1, 2, 22, 0)
+        )
+        == []
+    )
+
+
+def test_update_charger_state_returns_same_instance_when_unchanged():
+    """Test that an unchanged charger state is returned as is, not copied."""
+    schedule = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+    charger_state = ChargerState(car_is_charging=False, charge_is_override=False)
+    noon = DemoAdminState(car_is_plugged_in=True, current_time=datetime(2025, 1, 1, 12))
+    three_am = DemoAdminState(
+        car_is_plugged_in=True, current_time=datetime(2025, 1, 1, 3)
+    )
+
+    assert update_charger_state(charger_state, noon, schedule) is charger_state
+
+    # Equal results of a transition are shared
+    charging = update_charger_state(charger_state, three_am, schedule)
+    assert charging.car_is_charging
+    assert update_charger_state(charger_state, three_am, schedule) is charging
+
+
+def test_is_in_scheduled_window_by_weekday():
+    """Test that weekday windows need a date and only apply on their days."""
+    schedule = ChargeSchedule.from_windows(
+        [ScheduleWindow(start_time=time(9, 0), end_time=time(17, 0), weekdays=(5, 6))]
+    )
+
+    # 2025-01-04 is a Saturday, 2025-01-06 a Monday
+    assert is_in_scheduled_window(datetime(2025, 1, 4, 12, 0), schedule)
+    assert not is_in_scheduled_window(datetime(2025, 1, 6, 12, 0), schedule)
+    with pytest.raises(ValueError):
+        is_in_scheduled_window(time(12, 0), schedule)
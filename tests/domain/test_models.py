@@ -1,11 +1,19 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError, replace
 from datetime import datetime, time
 
+import pytest
+
 from src.domain.models import (
     BatteryState,
     ChargeSchedule,
     ChargerState,
     CombinedState,
     DemoAdminState,
+    ForecastFrame,
+    evolve,
+    intern_state,
 )
 
 
@@ -63,3 +71,82 @@ def test_demo_admin_state():
 
     assert demo.car_is_plugged_in is True
     assert demo.current_time == current_time
+
+
+def test_forecast_frame_from_states():
+    """Test building a columnar frame from combined states."""
+    current_time = datetime(2025, 1, 1, 12, 0)
+    states = [
+        CombinedState(
+            time=current_time,
+            battery_state=BatteryState(current_soc=0.6),
+            charger_state=ChargerState(car_is_charging=True, charge_is_override=True),
+        ),
+        CombinedState(
+            time=datetime(2025, 1, 1, 12, 30),
+            battery_state=BatteryState(current_soc=0.65),
+            charger_state=ChargerState(car_is_charging=False, charge_is_override=False),
+        ),
+    ]
+
+    frame = ForecastFrame.from_states(states)
+
+    assert len(frame) == 2
+    assert frame.times.dtype == "datetime64[us]"
+    assert frame.times.tolist() == [state.time for state in states]
+    assert frame.soc.tolist() == [0.6, 0.65]
+    assert frame.is_charging.tolist() == [True, False]
+    assert frame.is_override.tolist() == [True, False]
+    assert len(ForecastFrame.from_states([])) == 0
+
+
+def test_states_are_frozen_slotted_and_hashable():
+    """Test that states can't be changed, carry no __dict__ and hash by value."""
+    charger = ChargerState(car_is_charging=False, charge_is_override=False)
+
+    with pytest.raises(FrozenInstanceError):
+        charger.car_is_charging = True
+    assert not hasattr(charger, "__dict__")
+    assert hash(charger) == hash(
+        ChargerState(car_is_charging=False, charge_is_override=False)
+    )
+    assert len({charger, replace(charger), replace(charger, charge_rate_kw=11)}) == 2
+
+
+def test_states_copy_and_pickle():
+    """Test that frozen, slotted states survive copying and pickling."""
+    state = CombinedState(
+        time=datetime(2025, 1, 1, 12, 0),
+        battery_state=BatteryState(current_soc=0.5),
+        charger_state=ChargerState(car_is_charging=True, charge_is_override=False),
+    )
+
+    assert copy.deepcopy(state) == state
+    assert pickle.loads(pickle.dumps(state)) == state
+
+
+def test_intern_state():
+    """Test that equal states intern to one instance."""
+    first = intern_state(BatteryState(current_soc=0.5))
+
+    assert intern_state(BatteryState(current_soc=0.5)) is first
+    assert intern_state(BatteryState(current_soc=0.6)) is not first
+
+
+def test_evolve():
+    """Test that evolve reuses the state when nothing changes, and interns otherwise."""
+    battery = BatteryState(current_soc=0.5)
+
+    assert evolve(battery, current_soc=0.5) is battery
+    charged = evolve(battery, current_soc=0.7)
+    assert charged == BatteryState(current_soc=0.7)
+    assert evolve(battery, current_soc=0.7) is charged
+
+    # A live interned state is found from the new field values
+    charging = intern_state(
+        ChargerState(car_is_charging=True, charge_is_override=False)
+    )
+    idle = ChargerState(car_is_charging=False, charge_is_override=False)
+    assert evolve(idle, car_is_charging=True) is charging
+    with pytest.raises(AttributeError):
+        evolve(idle, is_charging=True)
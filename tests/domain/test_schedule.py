@@ -0,0 +1,288 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from src.domain.charging import is_in_scheduled_window
+from src.domain.models import ChargeSchedule, ScheduleWindow
+from src.domain.schedule import (
+    MICROSECONDS_PER_DAY,
+    MICROSECONDS_PER_WEEK,
+    FleetScheduleIndex,
+    ScheduleIndex,
+    index_schedule,
+    merge_intervals,
+    minute_slot,
+    minute_slots,
+    schedule_bitmap,
+    week_offset,
+    week_offsets,
+)
+
+HOUR = MICROSECONDS_PER_DAY // 24
+
+
+def test_week_offset():
+    """Test offsets are counted from Monday midnight, scalar and vectorized."""
+    times = [datetime(2025, 1, 6), datetime(2025, 1, 5, 23, 30), datetime(1969, 12, 31)]
+
+    assert [week_offset(t) for t in times] == [
+        0,
+        MICROSECONDS_PER_WEEK - HOUR // 2,
+        2 * MICROSECONDS_PER_DAY,
+    ]
+    assert week_offsets(np.array(times, dtype="datetime64[us]")).tolist() == [
+        week_offset(t) for t in times
+    ]
+
+
+def test_merge_intervals():
+    """Test that overlapping and adjoining intervals are merged and sorted."""
+    assert merge_intervals([(5, 8), (0, 2), (1, 3), (4, 4), (10, 12)]) == [
+        (0, 8),
+        (10, 12),
+    ]
+    assert merge_intervals([]) == []
+
+
+def test_index_schedule_merges_windows():
+    """Test that overlapping windows on several days become one sorted set."""
+    schedule = ChargeSchedule.from_windows(
+        [
+            ScheduleWindow(start_time=time(1, 0), end_time=time(3, 0), weekdays=(0,)),
+            ScheduleWindow(start_time=time(2, 0), end_time=time(4, 0), weekdays=(0,)),
+            ScheduleWindow(start_time=time(23, 0), end_time=time(1, 0), weekdays=(6,)),
+        ]
+    )
+    index = index_schedule(schedule)
+
+    # Sunday night wraps into Monday morning and joins Monday's windows
+    week = MICROSECONDS_PER_WEEK
+    assert index.starts == (0, 6 * MICROSECONDS_PER_DAY + 23 * HOUR)
+    assert index.ends == (4 * HOUR, week)
+    assert index.transitions == (4 * HOUR, 6 * MICROSECONDS_PER_DAY + 23 * HOUR)
+    assert index_schedule(schedule) is index
+
+
+def test_schedule_index_contains_matches_daily_rules():
+    """Test the index against the daily rules, including the inclusive end."""
+    schedules = [
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0)),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0), is_enabled=False),
+    ]
+    times = [
+        datetime(2025, 1, day, hour, minute)
+        for day in range(1, 9)
+        for hour in range(24)
+        for minute in (0, 1, 59)
+    ]
+
+    for schedule in schedules:
+        index = index_schedule(schedule)
+        assert [index.contains(t) for t in times] == [
+            is_in_scheduled_window(t.time(), schedule) for t in times
+        ]
+
+
+def test_fleet_schedule_index_contains_matches_scalar():
+    """Test the vectorized lookup against the scalar one for several schedules."""
+    schedules = [
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0)),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0), is_enabled=False),
+        ChargeSchedule.from_windows(
+            [
+                ScheduleWindow(time(0, 0), time(6, 0), weekdays=(0, 1, 2, 3, 4)),
+                ScheduleWindow(time(12, 0), time(14, 0), weekdays=(5, 6)),
+                ScheduleWindow(time(23, 0), time(1, 0), weekdays=(6,)),
+            ]
+        ),
+    ]
+    times = [
+        datetime(2025, 1, 1) + timedelta(minutes=20 * i) for i in range(3 * 7 * 24)
+    ]
+
+    mask = FleetScheduleIndex.from_schedules(schedules).contains(
+        np.array(times, dtype="datetime64[us]")
+    )
+
+    for i, schedule in enumerate(schedules):
+        index = index_schedule(schedule)
+        assert mask[i].tolist() == [index.contains(t) for t in times]
+
+
+def test_next_transition():
+    """Test jumping to the next window boundary, across the end of the week."""
+    schedule = ChargeSchedule.from_windows(
+        [ScheduleWindow(start_time=time(9, 0), end_time=time(17, 0), weekdays=(4,))]
+    )
+    index = index_schedule(schedule)
+
+    # 2025-01-03 is a Friday
+    assert index.next_transition(datetime(2025, 1, 3, 8, 0)) == datetime(
+        2025, 1, 3, 9, 0
+    )
+    assert index.next_transition(datetime(2025, 1, 3, 9, 0)) == datetime(
+        2025, 1, 3, 17, 0
+    )
+    assert index.next_transition(datetime(2025, 1, 3, 17, 0)) == datetime(
+        2025, 1, 10, 9, 0
+    )
+    assert index.transitions_between(datetime(2025, 1, 1), datetime(2025, 1, 15)) == [
+        datetime(2025, 1, 3, 9, 0),
+        datetime(2025, 1, 3, 17, 0),
+        datetime(2025, 1, 10, 9, 0),
+        datetime(2025, 1, 10, 17, 0),
+    ]
+
+    # Empty and always-on schedules never change
+    assert (
+        ScheduleIndex.from_intervals([]).next_transition(datetime(2025, 1, 1)) is None
+    )
+    always = ScheduleIndex.from_intervals([(0, MICROSECONDS_PER_WEEK)])
+    assert always.next_transition(datetime(2025, 1, 1)) is None
+
+
+def test_transitions_of_windows_ending_at_midnight():
+    """Test charging that stops at Monday midnight still ends there."""
+    daily = index_schedule(ChargeSchedule(start_time=time(22, 0), end_time=time(0, 0)))
+    sunday_only = index_schedule(
+        ChargeSchedule.from_windows(
+            [ScheduleWindow(start_time=time(22, 0), end_time=time(0, 0), weekdays=(6,))]
+        )
+    )
+
+    # 2025-02-16 is a Sunday
+    for index in (daily, sunday_only):
+        assert index.next_transition(datetime(2025, 2, 16, 21, 0)) == datetime(
+            2025, 2, 16, 22, 0
+        )
+        assert index.next_transition(datetime(2025, 2, 16, 22, 0)) == datetime(
+            2025, 2, 17, 0, 0
+        )
+    assert daily.transitions_between(
+        datetime(2025, 2, 16, 21, 0), datetime(2025, 2, 17, 23, 0)
+    ) == [
+        datetime(2025, 2, 16, 22, 0),
+        datetime(2025, 2, 17, 0, 0),
+        datetime(2025, 2, 17, 22, 0),
+    ]
+    assert sunday_only.transitions_between(
+        datetime(2025, 2, 16, 21, 0), datetime(2025, 2, 24, 1, 0)
+    ) == [
+        datetime(2025, 2, 16, 22, 0),
+        datetime(2025, 2, 17, 0, 0),
+        datetime(2025, 2, 23, 22, 0),
+        datetime(2025, 2, 24, 0, 0),
+    ]
+
+    # Charging right across midnight into Monday is still one stretch
+    overnight = index_schedule(
+        ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0))
+    )
+    assert overnight.next_transition(datetime(2025, 2, 16, 22, 0)) == datetime(
+        2025, 2, 17, 5, 0
+    )
+
+
+def test_hours_to_charge():
+    """Test finding how long it takes to accumulate scheduled time."""
+    # Weekends only, 9 AM to 5 PM
+    schedule = ChargeSchedule.from_windows(
+        [ScheduleWindow(start_time=time(9, 0), end_time=time(17, 0), weekdays=(5, 6))]
+    )
+    index = index_schedule(schedule)
+    monday = datetime(2025, 1, 6)
+
+    # 8 hours on Saturday, then 2 more on Sunday
+    assert index.hours_to_charge(monday, 10.0) == 6 * 24 + 11
+    # Starting mid-window counts only the rest of it
+    assert index.hours_to_charge(monday + timedelta(days=5, hours=13), 4.0) == 4.0
+    # A whole weekend's worth ends exactly at the end of the last window
+    assert index.hours_to_charge(monday, 16.0) == 6 * 24 + 17
+    assert index.hours_to_charge(monday, 32.0) == 13 * 24 + 17
+    assert index.hours_to_charge(monday, 0.0) == 0.0
+
+    empty = ScheduleIndex.from_intervals([])
+    assert empty.hours_to_charge(monday, 1.0) == np.inf
+
+
+def test_scheduled_hours_between():
+    """Test measuring scheduled time across windows, weeks and the epoch."""
+    # Overnight, 10 PM to 6 AM
+    index = index_schedule(ChargeSchedule(start_time=time(22, 0), end_time=time(6, 0)))
+    evening = datetime(2025, 1, 6, 20)
+    starts = np.array(
+        [evening, evening, evening, datetime(1969, 12, 31, 23)], dtype="datetime64[us]"
+    )
+    ends = np.array(
+        [
+            evening + timedelta(hours=12),
+            evening + timedelta(hours=4),
+            evening + timedelta(days=21),
+            datetime(1970, 1, 1, 1),
+        ],
+        dtype="datetime64[us]",
+    )
+
+    assert index.scheduled_hours_between(starts, ends).tolist() == [
+        8.0,
+        2.0,
+        21 * 8.0,
+        2.0,
+    ]
+
+    empty = ScheduleIndex.from_intervals([])
+    assert empty.scheduled_hours_between(starts, ends).tolist() == [0.0] * 4
+
+
+def test_schedule_bitmap_matches_index():
+    """Test the bitmap against the index at and between whole minutes."""
+    schedules = [
+        ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0)),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0), is_enabled=False),
+        ChargeSchedule.from_windows(
+            [
+                ScheduleWindow(time(1, 0), time(1, 1), weekdays=(2,)),
+                ScheduleWindow(time(1, 2), time(3, 0), weekdays=(2,)),
+                ScheduleWindow(time(23, 0), time(0, 0), weekdays=(6,)),
+            ]
+        ),
+    ]
+    times = [
+        datetime(2025, 1, 1) + timedelta(seconds=30 * i) for i in range(2 * 60 * 24 * 8)
+    ]
+    slots = minute_slots(np.array(times, dtype="datetime64[us]"))
+
+    assert slots.tolist() == [minute_slot(t) for t in times]
+    for schedule in schedules:
+        bitmap = schedule_bitmap(schedule)
+        index = index_schedule(schedule)
+        assert bitmap[slots].tolist() == [index.contains(t) for t in times]
+        assert schedule_bitmap(schedule) is bitmap
+
+
+def test_schedule_bitmap_needs_whole_minutes():
+    """Test that schedules off whole minutes fall back to the index."""
+    aligned = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+    unaligned = ChargeSchedule(start_time=time(2, 0, 30), end_time=time(5, 0))
+    times = np.array(
+        [datetime(2025, 1, 1, 2, 0, 15), datetime(2025, 1, 1, 2, 0, 45)],
+        dtype="datetime64[us]",
+    )
+
+    assert schedule_bitmap(unaligned) is None
+    assert not is_in_scheduled_window(time(2, 0, 15), unaligned)
+
+    fleet = FleetScheduleIndex.from_schedules([aligned, unaligned, aligned])
+    assert fleet.bitmaps is None
+    assert fleet.contains(times).tolist() == [
+        [True, True],
+        [False, True],
+        [True, True],
+    ]
+
+    # Each distinct schedule's bitmap is stored once
+    fleet = FleetScheduleIndex.from_schedules([aligned, aligned, aligned])
+    assert fleet.bitmaps.shape[0] == 1
+    assert fleet.bitmap_rows.tolist() == [0, 0, 0]
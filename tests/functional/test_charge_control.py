@@ -1,4 +1,5 @@
 import pytest
+from dataclasses import replace
 from datetime import datetime, timedelta
 
 import streamlit as st
@@ -132,7 +133,9 @@ def test_unplugged_car_flow(setup_session_state):
     st.session_state.demo_state = plugged_demo_state
 
     # Get the charge schedule and manually set it to be in a charging window
-    st.session_state.charge_schedule.is_enabled = True
+    st.session_state.charge_schedule = replace(
+        st.session_state.charge_schedule, is_enabled=True
+    )
 
     # Force init the charge state based on time and schedule
     charger_state, battery_state = get_current_states()
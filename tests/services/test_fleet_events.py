@@ -0,0 +1,154 @@
+import pytest
+from datetime import datetime, time, timedelta
+
+from src.domain import charging
+from src.domain.battery import project_battery_state
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    evolve,
+)
+from src.services import fleet_events
+from src.services.fleet_events import FleetEventLoop
+
+START = datetime(2025, 1, 1, 12, 0)
+SCHEDULE = ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0))
+IDLE = ChargerState(car_is_charging=False, charge_is_override=False)
+
+
+@pytest.mark.parametrize(
+    "schedule",
+    [SCHEDULE, ChargeSchedule(start_time=time(22, 0), end_time=time(0, 0))],
+)
+def test_event_loop_matches_charging_rules(schedule):
+    """Test the loop's state against the charging rules at many times."""
+    # Sunday evening, so the loop crosses the end of the week
+    start = datetime(2025, 2, 16, 21, 0)
+    vehicles = {
+        "overnight": (BatteryState(current_soc=0.2, target_soc=0.9), IDLE, True),
+        "full_early": (BatteryState(current_soc=0.7, target_soc=0.8), IDLE, True),
+        "override": (
+            BatteryState(current_soc=0.3, target_soc=0.8),
+            ChargerState(
+                car_is_charging=True,
+                charge_is_override=True,
+                override_end_time=start + timedelta(hours=1, minutes=10),
+            ),
+            True,
+        ),
+        "unplugged": (BatteryState(current_soc=0.3, target_soc=0.8), IDLE, False),
+    }
+
+    loop = FleetEventLoop(start)
+    for vehicle_id, (battery, charger, plugged) in vehicles.items():
+        loop.add_vehicle(vehicle_id, battery, charger, schedule, plugged)
+
+    # Every boundary is on a whole minute, so stepping half a minute at a
+    # time and asking the rules mid-step integrates the SoC exactly
+    step = timedelta(seconds=30)
+    expected_soc = {
+        vehicle_id: battery.current_soc
+        for vehicle_id, (battery, _, _) in vehicles.items()
+    }
+    at = start
+    for i in range(3 * 24 * 120):
+        if i % 14 == 1:
+            loop.advance(at)
+            for vehicle_id, (battery, charger, plugged) in vehicles.items():
+                battery_state, charger_state = loop.get_state(vehicle_id, at)
+                expected = charging.update_charger_state(
+                    charger,
+                    DemoAdminState(car_is_plugged_in=plugged, current_time=at),
+                    schedule,
+                )
+                assert charger_state == expected, (vehicle_id, at)
+                assert battery_state.current_soc == pytest.approx(
+                    expected_soc[vehicle_id]
+                ), (vehicle_id, at)
+
+        for vehicle_id, (battery, charger, plugged) in vehicles.items():
+            rules = charging.update_charger_state(
+                charger,
+                DemoAdminState(car_is_plugged_in=plugged, current_time=at + step / 2),
+                schedule,
+            )
+            expected_soc[vehicle_id] = project_battery_state(
+                evolve(battery, current_soc=expected_soc[vehicle_id]),
+                rules,
+                step.total_seconds() / 3600,
+            ).current_soc
+        at += step
+
+
+def test_event_loop_reports_transitions():
+    """Test that each change in charging is reported once, in time order."""
+    loop = FleetEventLoop(START)
+    loop.add_vehicle(
+        "car", BatteryState(current_soc=0.7, target_soc=0.8), IDLE, SCHEDULE, True
+    )
+
+    events = loop.advance(START + timedelta(days=1))
+
+    # Schedule starts, the battery fills, then the schedule ends
+    assert [event.time for event in events] == [
+        datetime(2025, 1, 1, 22, 0),
+        datetime(2025, 1, 1, 22, 0) + timedelta(hours=7.5 / 7),
+        datetime(2025, 1, 2, 5, 0),
+    ]
+    assert [event.charger_state.car_is_charging for event in events] == [
+        True,
+        True,
+        False,
+    ]
+    assert events[1].battery_state.current_soc == 0.8
+    assert events[2].battery_state.current_soc == 0.8
+
+
+def test_event_loop_only_touches_due_vehicles(monkeypatch):
+    """Test that advancing costs nothing for vehicles without a transition due."""
+    calls = []
+
+    def counting_update(*args):
+        calls.append(args)
+        return charging.update_charger_state(*args)
+
+    monkeypatch.setattr(fleet_events, "update_charger_state", counting_update)
+
+    loop = FleetEventLoop(START)
+    for i in range(1000):
+        loop.add_vehicle(
+            f"car-{i}",
+            BatteryState(current_soc=0.5, target_soc=0.8),
+            IDLE,
+            SCHEDULE,
+            i < 10,
+        )
+    calls.clear()
+
+    # Nothing happens before the schedule starts at 10 PM
+    for hour in range(1, 10):
+        assert loop.advance(START + timedelta(hours=hour)) == []
+    assert calls == []
+
+    # Only the plugged-in cars start charging
+    events = loop.advance(datetime(2025, 1, 1, 22, 0))
+    assert sorted(event.vehicle_id for event in events) == [
+        f"car-{i}" for i in range(10)
+    ]
+    assert len(calls) == 10
+
+
+def test_event_loop_add_vehicle_replaces_state():
+    """Test that re-adding a vehicle after a plug-in drops its old transition."""
+    loop = FleetEventLoop(START)
+    battery_state = BatteryState(current_soc=0.5, target_soc=0.8)
+    loop.add_vehicle("car", battery_state, IDLE, SCHEDULE, True)
+
+    loop.advance(START + timedelta(hours=1))
+    loop.add_vehicle("car", battery_state, IDLE, SCHEDULE, False)
+    assert loop.advance(START + timedelta(days=1)) == []
+
+    loop.remove_vehicle("car")
+    assert "car" not in loop and len(loop) == 0
@@ -0,0 +1,166 @@
+import pytest
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from src.domain.battery import estimate_time_to_soc, project_battery_state
+from src.domain.charging import update_charger_state
+from src.domain.models import BatteryState, ChargeSchedule, ChargerState, DemoAdminState
+from src.services.fleet_forecast import (
+    advance_fleet_forecast,
+    build_fleet_state,
+    forecast_fleet,
+)
+from src.services.scheduler import get_charge_complete_time, project_segments
+
+
+@pytest.fixture
+def vehicles():
+    """Create a mix of vehicles covering schedule, override and plug states."""
+    base_time = datetime(2025, 1, 1, 0, 0)
+    return [
+        # Normal schedule, plugged in
+        (
+            BatteryState(current_soc=0.6, target_soc=0.8),
+            ChargerState(car_is_charging=False, charge_is_override=False),
+            ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+            True,
+        ),
+        # Overnight schedule with an override that expires
+        (
+            BatteryState(current_soc=0.2, target_soc=0.9),
+            ChargerState(
+                car_is_charging=True,
+                charge_is_override=True,
+                charge_rate_kw=11.0,
+                override_end_time=base_time + timedelta(hours=1),
+            ),
+            ChargeSchedule(start_time=time(22, 0), end_time=time(3, 0)),
+            True,
+        ),
+        # Unplugged with an override
+        (
+            BatteryState(current_soc=0.5, target_soc=0.8),
+            ChargerState(car_is_charging=True, charge_is_override=True),
+            ChargeSchedule(start_time=time(0, 0), end_time=time(6, 0)),
+            False,
+        ),
+        # Disabled schedule, already above target
+        (
+            BatteryState(current_soc=0.95, target_soc=0.8),
+            ChargerState(car_is_charging=False, charge_is_override=False),
+            ChargeSchedule(
+                start_time=time(1, 0), end_time=time(4, 0), is_enabled=False
+            ),
+            True,
+        ),
+        # Above target with an override that never expires
+        (
+            BatteryState(current_soc=0.95, target_soc=0.8),
+            ChargerState(car_is_charging=True, charge_is_override=True),
+            ChargeSchedule(start_time=time(1, 0), end_time=time(4, 0)),
+            True,
+        ),
+    ]
+
+
+def _loop_forecast(vehicle, start_time, num_periods, period_minutes=30):
+    """Project one vehicle using the scalar domain rules."""
+    battery_state, charger_state, schedule, plugged_in = vehicle
+    socs, charging, override = [], [], []
+    soc = battery_state.current_soc
+    for i in range(num_periods):
+        demo_state = DemoAdminState(
+            car_is_plugged_in=plugged_in,
+            current_time=start_time + i * timedelta(minutes=period_minutes),
+        )
+        charger = update_charger_state(charger_state, demo_state, schedule)
+        soc = project_battery_state(
+            BatteryState(current_soc=soc, target_soc=battery_state.target_soc),
+            charger,
+            period_minutes / 60,
+        ).current_soc
+        socs.append(soc)
+        charging.append(charger.car_is_charging)
+        override.append(charger.charge_is_override)
+    return socs, charging, override
+
+
+def test_forecast_fleet_matches_scalar_rules(vehicles):
+    """Test that every row matches the period-by-period domain rules."""
+    start_time = datetime(2025, 1, 1, 0, 0)
+    forecast = forecast_fleet(build_fleet_state(vehicles), start_time, 48)
+
+    assert forecast.soc.shape == (len(vehicles), 48)
+    for i, vehicle in enumerate(vehicles):
+        socs, charging, override = _loop_forecast(vehicle, start_time, 48)
+        assert forecast.soc[i].tolist() == socs
+        assert forecast.is_charging[i].tolist() == charging
+        assert forecast.is_override[i].tolist() == override
+
+
+def test_forecast_fleet_times(vehicles):
+    """Test that the time grid starts at the start time and steps by period."""
+    start_time = datetime(2025, 1, 1, 12, 0)
+    forecast = forecast_fleet(
+        build_fleet_state(vehicles), start_time, 3, period_minutes=15
+    )
+
+    assert forecast.times.tolist() == [
+        start_time,
+        start_time + timedelta(minutes=15),
+        start_time + timedelta(minutes=30),
+    ]
+
+
+def test_forecast_fleet_empty():
+    """Test that an empty fleet produces empty matrices."""
+    forecast = forecast_fleet(build_fleet_state([]), datetime(2025, 1, 1), 4)
+
+    assert forecast.soc.shape == (0, 4)
+    assert forecast.is_charging.dtype == np.bool_
+
+
+def test_estimate_fleet_time_to_soc_matches_segments(vehicles):
+    """Test that fleet ETAs match each car estimated alone and its segments."""
+    current_time = datetime(2025, 1, 1, 0, 30)
+    etas = build_fleet_state(vehicles).time_to_soc(current_time)
+
+    for eta, vehicle in zip(etas, vehicles):
+        battery_state, charger_state, schedule, plugged_in = vehicle
+        expected = estimate_time_to_soc(
+            battery_state, charger_state, schedule, current_time, plugged_in
+        )
+        segments = project_segments(
+            battery_state,
+            charger_state,
+            schedule,
+            plugged_in,
+            current_time,
+            current_time + timedelta(days=7),
+        )
+        complete_time = get_charge_complete_time(segments)
+
+        if expected is None:
+            assert np.isnat(eta)
+            continue
+        assert abs(eta.item() - expected) <= timedelta(microseconds=1)
+        if complete_time is not None:
+            assert abs(complete_time - expected) < timedelta(seconds=1)
+
+
+def test_advance_fleet_forecast_matches_full_forecast(vehicles):
+    """Test that advancing matches a full forecast when no car has charged."""
+    fleet = build_fleet_state(vehicles)
+    # From 6am to 9:30pm no schedule is active for these vehicles and the
+    # overrides have expired, so the start SoC is still current
+    fleet.charge_is_override[:] = False
+    start_time = datetime(2025, 1, 1, 6, 0)
+
+    advanced = advance_fleet_forecast(forecast_fleet(fleet, start_time, 20), fleet, 3)
+    expected = forecast_fleet(fleet, start_time + timedelta(minutes=90), 20)
+
+    assert advanced.times.tolist() == expected.times.tolist()
+    assert advanced.soc.tolist() == expected.soc.tolist()
+    assert advanced.is_charging.tolist() == expected.is_charging.tolist()
+    assert advanced.is_override.tolist() == expected.is_override.tolist()
@@ -0,0 +1,174 @@
+import pytest
+from datetime import datetime, time, timedelta
+
+from src.domain.models import BatteryState, ChargeSchedule, ChargerState
+from src.services.fleet_forecast import build_fleet_state, forecast_fleet
+from src.services.forecast_cache import (
+    ForecastCache,
+    forecast_cache,
+    make_forecast_key,
+)
+from src.services.scheduler import get_future_states
+
+
+def _key_and_forecast(
+    current_soc, num_periods=9, start_time=datetime(2025, 1, 1, 12, 0)
+):
+    """Build a cache key and matching forecast for a single car."""
+    battery_state = BatteryState(current_soc=current_soc, target_soc=0.8)
+    charger_state = ChargerState(car_is_charging=False, charge_is_override=False)
+    schedule = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+
+    key = make_forecast_key(
+        battery_state, charger_state, schedule, True, start_time, num_periods
+    )
+    forecast = forecast_fleet(
+        build_fleet_state([(battery_state, charger_state, schedule, True)]),
+        start_time,
+        num_periods,
+    )
+    return key, forecast
+
+
+def test_forecast_cache_hits_and_misses():
+    """Test that counters track lookups and that keys compare by value."""
+    cache = ForecastCache()
+    key, forecast = _key_and_forecast(0.6)
+
+    assert cache.get(key) is None
+    cache.put(key, forecast)
+    assert cache.get(_key_and_forecast(0.6)[0]).soc.base is forecast.soc
+
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.entries == 1
+    assert stats.size_bytes > 0
+
+
+def test_forecast_cache_evicts_least_recently_used():
+    """Test that the entry bound evicts the least recently used forecast."""
+    cache = ForecastCache(max_entries=2)
+    first, second, third = (_key_and_forecast(soc) for soc in (0.1, 0.2, 0.3))
+
+    cache.put(*first)
+    cache.put(*second)
+    cache.get(first[0])  # First is now most recently used
+    cache.put(*third)
+
+    assert cache.get(second[0]) is None
+    assert cache.get(first[0]) is not None
+    assert cache.get(third[0]) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_forecast_cache_get_previous_ignores_clock():
+    """Test the newest earlier forecast of the same inputs is found at any SoC."""
+    cache = ForecastCache(max_entries=2)
+    now = datetime(2025, 1, 1, 12, 0)
+    first = _key_and_forecast(0.1, start_time=now)
+    second = _key_and_forecast(0.2, start_time=now + timedelta(hours=1))
+    later = _key_and_forecast(0.3, start_time=now + timedelta(hours=2))
+    other_length = _key_and_forecast(0.2, num_periods=10, start_time=now)
+
+    assert cache.get_previous(later[0]) is None
+    cache.put(*first)
+    cache.put(*second)
+    assert cache.get_previous(later[0])[0] == second[0]
+    assert cache.get_previous(second[0])[0] == first[0]
+    assert cache.get_previous(first[0]) is None
+    assert cache.get_previous(other_length[0]) is None
+
+    # Lookups are not counted, and an evicted forecast is forgotten
+    assert cache.stats.hits == cache.stats.misses == 0
+    cache.put(*other_length)
+    cache.put(*_key_and_forecast(0.3, num_periods=10))
+    assert cache.get_previous(later[0]) is None
+
+
+def test_forecast_cache_get_previous_interleaved_sessions():
+    """Test that sessions at different clocks do not take each other's base."""
+    cache = ForecastCache(max_entries=3)
+    now = datetime(2025, 1, 1, 12, 0)
+    session_a = _key_and_forecast(0.5, start_time=now)
+    session_b = _key_and_forecast(0.5, start_time=now + timedelta(hours=6))
+    cache.put(*session_a)
+    cache.put(*session_b)
+
+    # Session A moves on after B stored its later forecast
+    session_a_later = _key_and_forecast(0.5, start_time=now + timedelta(minutes=30))
+    assert cache.get_previous(session_a_later[0])[0] == session_a[0]
+    cache.put(*session_a_later)
+
+    # Evicting the oldest forecasts, B's among them, leaves A's newest base
+    cache.put(*_key_and_forecast(0.5, num_periods=10))
+    cache.put(*_key_and_forecast(0.5, num_periods=11))
+    assert cache.get(session_b[0]) is None
+    session_a_next = _key_and_forecast(0.5, start_time=now + timedelta(hours=1))
+    assert cache.get_previous(session_a_next[0])[0] == session_a_later[0]
+
+
+def test_forecast_cache_byte_bound():
+    """Test that the byte bound limits how much is cached."""
+    key, forecast = _key_and_forecast(0.6, num_periods=100)
+    size = (
+        forecast.times.nbytes
+        + forecast.soc.nbytes
+        + forecast.is_charging.nbytes
+        + forecast.is_override.nbytes
+    )
+    cache = ForecastCache(max_bytes=size + size // 2)
+
+    cache.put(key, forecast)
+    cache.put(*_key_and_forecast(0.5, num_periods=100))
+
+    assert cache.stats.entries == 1
+    assert cache.stats.size_bytes <= cache.max_bytes
+
+    # Forecasts larger than the whole cache are never stored
+    cache.put(*_key_and_forecast(0.4, num_periods=1000))
+    assert cache.get(_key_and_forecast(0.4, num_periods=1000)[0]) is None
+
+
+def test_forecast_cache_entries_are_read_only():
+    """Test that shared forecasts cannot be modified by one session."""
+    cache = ForecastCache()
+    key, forecast = _key_and_forecast(0.6)
+    cache.put(key, forecast)
+
+    with pytest.raises(ValueError):
+        cache.get(key).soc[0, 0] = 1.0
+
+    # The caller's own arrays are left writeable
+    assert all(
+        array.flags.writeable
+        for array in (
+            forecast.times,
+            forecast.soc,
+            forecast.is_charging,
+            forecast.is_override,
+        )
+    )
+
+    # Freshly computed forecasts are returned read-only too
+    other_key, other_forecast = _key_and_forecast(0.5)
+    computed = cache.get_or_compute(other_key, lambda: other_forecast)
+    assert other_forecast.soc.flags.writeable
+    assert not computed.soc.flags.writeable
+    assert computed.soc.base is other_forecast.soc
+
+
+def test_get_future_states_uses_shared_cache(setup_session_state):
+    """Test that repeated forecasts are computed once."""
+    forecast_cache.clear()
+    demo_state = setup_session_state
+
+    first = get_future_states(demo_state)
+    second = get_future_states(demo_state)
+
+    assert forecast_cache.stats.misses == 1
+    assert forecast_cache.stats.hits == 1
+    assert [s.battery_state.current_soc for s in first] == [
+        s.battery_state.current_soc for s in second
+    ]
+    assert [s.time for s in first] == [s.time for s in second]
@@ -0,0 +1,174 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.domain.models import BatteryState, ChargerState
+from src.services.history import (
+    HISTORY_DTYPE,
+    HistoryStore,
+    VehicleHistory,
+    history_frame,
+)
+
+START = datetime(2025, 1, 1)
+
+
+def _records(minutes, soc=0.5, is_charging=False, is_override=False) -> np.ndarray:
+    """Build one record per minute offset from START."""
+    minutes = np.asarray(minutes)
+    records = np.zeros(len(minutes), dtype=HISTORY_DTYPE)
+    records["time"] = np.datetime64(START, "us") + minutes.astype("timedelta64[m]")
+    records["current_soc"] = soc
+    records["target_soc"] = 0.8
+    records["charge_rate_kw"] = 7.5
+    records["car_is_charging"] = is_charging
+    records["charge_is_override"] = is_override
+    records["car_is_plugged_in"] = True
+    return records
+
+
+def test_range_matches_linear_scan(tmp_path):
+    """Test range queries through the sparse index against a plain mask."""
+    history = VehicleHistory(str(tmp_path / "car.history"), index_stride=8)
+    # Repeated times straddle stride boundaries
+    minutes = np.repeat(np.arange(0, 200, 2), 3)
+    for chunk in np.array_split(minutes, 7):
+        history.append(_records(chunk))
+
+    times = history.records()["time"]
+    for start, end in [(0, 400), (5, 6), (6, 7), (31, 97), (-10, 3), (398, 500)]:
+        start_time = START + timedelta(minutes=start)
+        end_time = START + timedelta(minutes=end)
+        expected = (times >= np.datetime64(start_time)) & (
+            times < np.datetime64(end_time)
+        )
+        assert np.array_equal(
+            history.range(start_time, end_time)["time"], times[expected]
+        )
+
+    assert len(history.range()) == len(minutes)
+
+
+def test_range_is_a_read_only_view_of_the_file(tmp_path):
+    """Test queries share the mapped file rather than copying it."""
+    history = VehicleHistory(str(tmp_path / "car.history"))
+    history.append(_records(np.arange(100)))
+
+    window = history.range(START + timedelta(minutes=10), START + timedelta(minutes=20))
+    assert np.shares_memory(window, history.records())
+    assert not window.flags.writeable
+
+
+def test_history_survives_reopening(tmp_path):
+    """Test records are read back from disk, dropping a torn final write."""
+    path = str(tmp_path / "car.history")
+    history = VehicleHistory(path, index_stride=4)
+    history.append(_records(np.arange(10)))
+    history.close()
+    with open(path, "ab") as file:
+        file.write(b"\x00" * 5)
+
+    reopened = VehicleHistory(path, index_stride=4)
+    assert len(reopened) == 10
+    assert np.array_equal(reopened.records(), _records(np.arange(10)))
+
+    reopened.append(_records([12]))
+    assert len(reopened.range(START + timedelta(minutes=9))) == 2
+
+
+def test_append_keeps_time_order(tmp_path):
+    """Test records earlier than the history are refused."""
+    history = VehicleHistory(str(tmp_path / "car.history"))
+    history.append(_records([5, 6]))
+
+    with pytest.raises(ValueError):
+        history.append(_records([4]))
+    with pytest.raises(ValueError):
+        history.append(_records([8, 7]))
+    assert len(history) == 2
+
+
+def test_sessions(tmp_path):
+    """Test charging runs are split by source and closed by the next record."""
+    history = VehicleHistory(str(tmp_path / "car.history"))
+    history.append(
+        np.concatenate(
+            [
+                _records([0], soc=0.2),
+                _records([10, 20], soc=[0.2, 0.3], is_charging=True),
+                _records([30], soc=0.4, is_charging=True, is_override=True),
+                _records([40], soc=0.5),
+                _records([50], soc=0.5, is_charging=True),
+                _records([60], soc=0.6, is_charging=True),
+            ]
+        )
+    )
+
+    sessions = history.sessions()
+    assert sessions["is_override"].tolist() == [False, True, False]
+    assert sessions["start"].tolist() == [
+        START + timedelta(minutes=m) for m in (10, 30, 50)
+    ]
+    assert sessions["end"].tolist() == [
+        START + timedelta(minutes=m) for m in (30, 40, 60)
+    ]
+    assert sessions["energy_kwh"].tolist() == pytest.approx([15.0, 7.5, 7.5])
+
+    # A session running at the end of the range is closed by the next record
+    cut = history.sessions(end=START + timedelta(minutes=15))
+    assert cut["end"].tolist() == [START + timedelta(minutes=20)]
+
+    assert len(history.sessions(START + timedelta(hours=2))) == 0
+
+
+def test_history_store(tmp_path):
+    """Test recording states per vehicle and querying sessions fleet-wide."""
+    store = HistoryStore(str(tmp_path))
+    battery = BatteryState(current_soc=0.4)
+    charging = ChargerState(car_is_charging=True, charge_is_override=True)
+    idle = ChargerState(car_is_charging=False, charge_is_override=False)
+
+    store.record("car/1", START, battery, charging, True)
+    store.record("car/1", START + timedelta(hours=1), battery, idle, True)
+    store.record("car 2", START, battery, idle, False)
+
+    assert store.vehicle_ids() == ["car 2", "car/1"]
+    assert list(store.sessions(is_override=True)) == ["car/1"]
+    assert store.sessions(is_override=False) == {}
+
+    frame = history_frame(store.vehicle("car/1").range())
+    assert frame.soc.tolist() == [0.4, 0.4]
+    assert frame.is_override.tolist() == [True, False]
+
+    store.close()
+    assert len(HistoryStore(str(tmp_path)).vehicle("car/1")) == 2
+
+
+def test_history_store_walks_more_vehicles_than_open_files(tmp_path):
+    """Test fleet-wide queries and compaction under a low open file limit."""
+    resource = pytest.importorskip("resource")
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("needs /proc to count open files")
+
+    num_vehicles = 64
+    for n in range(num_vehicles):
+        history = VehicleHistory(str(tmp_path / f"car-{n}.history"))
+        history.append(_records([0, 10, 20], is_charging=True))
+        history.close()
+
+    # Room for a few vehicles' files at once, far fewer than the fleet's
+    store = HistoryStore(str(tmp_path))
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(
+        resource.RLIMIT_NOFILE, (len(os.listdir("/proc/self/fd")) + 32, hard)
+    )
+    try:
+        sessions = store.sessions()
+        dropped = store.compact(START + timedelta(days=31), timedelta(days=30))
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert len(sessions) == num_vehicles
+    assert dropped == 2 * num_vehicles
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from src.services.history import HISTORY_DTYPE, HistoryStore, VehicleHistory
+from src.services.history_rollups import summarize_buckets
+
+START = datetime(2025, 1, 1)
+
+
+def _records(minutes, soc, is_charging, is_override=False) -> np.ndarray:
+    """Build one record per minute offset from START."""
+    minutes = np.asarray(minutes)
+    records = np.zeros(len(minutes), dtype=HISTORY_DTYPE)
+    records["time"] = np.datetime64(START, "us") + minutes.astype("timedelta64[m]")
+    records["current_soc"] = soc
+    records["target_soc"] = 0.8
+    records["car_is_charging"] = is_charging
+    records["charge_is_override"] = is_override
+    records["car_is_plugged_in"] = True
+    return records
+
+
+def _day_of_charging(days: int, step_minutes: int = 10) -> np.ndarray:
+    """Charge from 2 AM to 5 AM every night, override on even days."""
+    minutes = np.arange(0, days * 24 * 60, step_minutes)
+    minute_of_day = minutes % (24 * 60)
+    is_charging = (minute_of_day >= 120) & (minute_of_day < 300)
+    soc = 0.2 + 0.1 * np.sin(minutes / 500.0) ** 2
+    is_override = is_charging & ((minutes // (24 * 60)) % 2 == 0)
+    return _records(minutes, soc, is_charging, is_override)
+
+
+def test_summarize_buckets_splits_intervals():
+    """Test charging intervals are shared between the buckets they cross."""
+    base = np.datetime64("2025-01-01T10:00", "us")
+    minute = np.timedelta64(1, "m")
+
+    rows = summarize_buckets(
+        np.timedelta64(5, "m"),
+        np.array([base + 2 * minute, base + 4 * minute]),
+        np.array([0.2, 0.4]),
+        np.array([base + 2 * minute]),
+        np.array([base + 13 * minute]),
+        np.array([11.0]),
+        np.array([True]),
+    )
+
+    assert rows["start"].tolist() == [
+        datetime(2025, 1, 1, 10, minute) for minute in (0, 5, 10)
+    ]
+    assert rows["samples"].tolist() == [2, 0, 0]
+    assert rows["mean_soc"][0] == pytest.approx(0.3)
+    assert rows["min_soc"][0] == 0.2 and rows["max_soc"][0] == 0.4
+    assert np.isnan(rows["mean_soc"][1])
+    assert rows["energy_kwh"].tolist() == pytest.approx([3.0, 5.0, 3.0])
+    assert rows["override_minutes"].tolist() == pytest.approx([3.0, 5.0, 3.0])
+    assert rows["scheduled_minutes"].tolist() == [0.0, 0.0, 0.0]
+
+
+def test_incremental_rollups_match_rebuild(tmp_path):
+    """Test rollups kept up to date chunk by chunk match a rollup of everything."""
+    records = _day_of_charging(days=4, step_minutes=5)
+    incremental = VehicleHistory(str(tmp_path / "a.history"))
+    for chunk in np.array_split(records, 37):
+        incremental.append(chunk)
+    rebuilt = VehicleHistory(str(tmp_path / "b.history"))
+    rebuilt.append(records)
+
+    for ours, theirs in zip(incremental.rollups.tiers, rebuilt.rollups.tiers):
+        for column in ours.rows().dtype.names:
+            assert np.allclose(
+                ours.rows()[column].astype(float),
+                theirs.rows()[column].astype(float),
+                equal_nan=True,
+            ), column
+
+    # Three hours a night, half of them from overrides
+    daily = incremental.rollups.tiers[-1].rows()
+    assert (daily["scheduled_minutes"] + daily["override_minutes"]).tolist() == [
+        180.0
+    ] * 4
+    assert daily["override_minutes"].tolist() == [180.0, 0.0, 180.0, 0.0]
+
+
+def test_rollups_survive_reopening(tmp_path):
+    """Test rollups are read back and carried on, or rebuilt when missing."""
+    path = str(tmp_path / "car.history")
+    records = _day_of_charging(days=2)
+    history = VehicleHistory(path)
+    history.append(records[:100])
+    history.close()
+
+    reopened = VehicleHistory(path)
+    reopened.append(records[100:])
+    expected = reopened.rollups.tiers[0].rows().copy()
+    reopened.close()
+
+    (tmp_path / "car.history.60m").unlink()
+    rebuilt = VehicleHistory(path)
+    assert np.allclose(
+        rebuilt.rollups.tiers[0].rows()["energy_kwh"], expected["energy_kwh"]
+    )
+    assert len(rebuilt.rollups.tiers[1]) == 48
+
+
+def test_compaction_keeps_rollups(tmp_path):
+    """Test compaction drops old records but not their summaries."""
+    store = HistoryStore(str(tmp_path))
+    history = store.vehicle("car")
+    history.append(_day_of_charging(days=40))
+    daily = history.rollups.tiers[-1].rows().copy()
+    now = START + timedelta(days=40)
+
+    dropped = store.compact(now, retention=timedelta(days=30))
+
+    assert dropped == 10 * 24 * 6
+    assert history.range()["time"][0] == np.datetime64(START + timedelta(days=10))
+    assert np.array_equal(history.rollups.tiers[-1].rows(), daily)
+    assert store.compact(now, retention=timedelta(days=30)) == 0
+
+    # The newest record is always kept
+    remaining = len(history)
+    assert store.compact(now + timedelta(days=365)) == remaining - 1
+    assert len(history) == 1
+
+
+def test_frame_reads_rollups_for_long_views(tmp_path):
+    """Test short views plot records and long ones plot the coarsest tier needed."""
+    history = VehicleHistory(str(tmp_path / "car.history"))
+    history.append(_day_of_charging(days=40))
+    end = START + timedelta(days=40)
+
+    # The last day is 144 records
+    day = history.frame(end - timedelta(days=1), end, max_points=1000)
+    assert len(day) == 144
+
+    # A month is 720 hourly buckets
+    month = history.frame(end - timedelta(days=30), end, max_points=1000)
+    assert len(month) == 720
+    assert np.all(np.diff(month.times) == np.timedelta64(1, "h"))
+
+    # A year is daily, with buckets only where there is history
+    year = history.frame(end - timedelta(days=365), end, max_points=1000)
+    assert len(year) == 40
+    assert year.is_override.tolist() == [True, False] * 20
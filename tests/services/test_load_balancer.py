@@ -0,0 +1,205 @@
+import pytest
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from src.config import BATTERY_CAPACITY_KWH
+from src.domain.models import BatteryState, ChargeSchedule, ChargerState
+from src.services.fleet_forecast import build_fleet_state, forecast_fleet
+from src.services.load_balancer import (
+    SiteLayout,
+    allocate_power,
+    balance_fleet,
+    charging_priority,
+    forecast_balanced_fleet,
+    water_fill,
+)
+
+NOW = datetime(2025, 1, 1, 2, 0)
+SCHEDULE = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+
+
+def _fleet(socs, plugged_in=None):
+    """Build a fleet of 7 kW cars charging on the same schedule."""
+    if plugged_in is None:
+        plugged_in = [True] * len(socs)
+    return build_fleet_state(
+        (
+            BatteryState(current_soc=soc, target_soc=0.8),
+            ChargerState(car_is_charging=False, charge_is_override=False),
+            SCHEDULE,
+            plugged,
+        )
+        for soc, plugged in zip(socs, plugged_in)
+    )
+
+
+def _circuit_loads(allocation, site):
+    """Add up the power drawn through each circuit."""
+    loads = np.bincount(site.circuit, allocation, minlength=len(site.cap_kw))
+    for child in range(len(loads) - 1, 0, -1):
+        loads[site.parent[child]] += loads[child]
+    return loads
+
+
+def test_water_fill():
+    """Test that met demands free their share for the rest."""
+    ones = np.ones(3)
+
+    assert water_fill(np.array([1.0, 2.0]), np.ones(2), 5.0).tolist() == [1.0, 2.0]
+    assert water_fill(np.array([1.0, 5.0, 5.0]), ones, 7.0) == pytest.approx(
+        [1.0, 3.0, 3.0]
+    )
+    assert water_fill(
+        np.array([10.0, 10.0, 0.0]), np.array([1.0, 3.0, 0.0]), 8.0
+    ) == pytest.approx([2.0, 6.0, 0.0])
+    assert water_fill(np.array([1.0, 5.0, 5.0]), ones, 0.0).tolist() == [0, 0, 0]
+
+
+def test_allocate_power_respects_circuit_caps():
+    """Test sharing a site between two sub-panels."""
+    # Grid 20 kW, panel 1 limited to 8 kW, panel 2 to 20 kW
+    site = SiteLayout.from_circuits([(20.0, None), (8.0, 0), (20.0, 0)], [1, 1, 2, 2])
+
+    allocation = allocate_power(np.full(4, 7.0), np.ones(4), site)
+
+    # Panel 1 is met at its limit, and panel 2 gets the rest of the grid
+    assert allocation == pytest.approx([4.0, 4.0, 6.0, 6.0])
+
+
+def test_allocate_power_large_site():
+    """Test a thousand chargers on a random tree of circuits."""
+    rng = np.random.default_rng(0)
+    parents = [None] + [int(rng.integers(0, i)) for i in range(1, 30)]
+    caps = [500.0] + rng.uniform(20, 200, 29).tolist()
+    site = SiteLayout.from_circuits(list(zip(caps, parents)), rng.integers(0, 30, 1000))
+    demand = rng.choice([0.0, 7.0, 11.0, 22.0], 1000)
+
+    allocation = allocate_power(demand, rng.uniform(0.1, 5.0, 1000), site)
+
+    assert (allocation >= 0).all() and (allocation <= demand + 1e-9).all()
+    assert (_circuit_loads(allocation, site) <= site.cap_kw + 1e-6).all()
+    # The grid connection is the binding limit, and none of it is wasted
+    assert allocation.sum() == pytest.approx(500.0)
+
+
+def test_site_layout_groups_by_circuit():
+    """Test that the grouped chargers and sub-circuits match a search per circuit."""
+    rng = np.random.default_rng(1)
+    parents = [None] + [int(rng.integers(0, i)) for i in range(1, 30)]
+    site = SiteLayout.from_circuits(
+        [(100.0, parent) for parent in parents], rng.integers(0, 30, 500)
+    )
+
+    charger_order, charger_offsets = site.chargers_by_circuit()
+    child_order, child_offsets = site.children_by_circuit()
+    for circuit in range(30):
+        assert (
+            charger_order[
+                charger_offsets[circuit] : charger_offsets[circuit + 1]
+            ].tolist()
+            == np.flatnonzero(site.circuit == circuit).tolist()
+        )
+        assert (
+            child_order[child_offsets[circuit] : child_offsets[circuit + 1]].tolist()
+            == np.flatnonzero(site.parent == circuit).tolist()
+        )
+
+
+def test_site_layout_needs_parents_first():
+    """Test that circuits must be listed parents first."""
+    with pytest.raises(ValueError):
+        SiteLayout.from_circuits([(20.0, None), (8.0, 2), (8.0, 0)], [0])
+    with pytest.raises(ValueError):
+        SiteLayout.from_circuits([(20.0, 0)], [0])
+
+
+def test_charging_priority():
+    """Test that emptier cars and earlier departures weigh more."""
+    fleet = _fleet([0.2, 0.5, 0.5, 0.8])
+    departure = np.array(
+        [NOW + timedelta(hours=8)] * 2
+        + [NOW + timedelta(hours=2), NOW + timedelta(hours=1)],
+        dtype="datetime64[us]",
+    )
+
+    priority = charging_priority(fleet, NOW, departure)
+
+    assert priority[0] > priority[1]
+    assert priority[2] == pytest.approx(4 * priority[1])
+    assert priority[3] == pytest.approx(0.0)
+
+
+def test_balance_fleet():
+    """Test that only cars charging now share the site's power."""
+    fleet = _fleet([0.2, 0.5, 0.5, 0.8], plugged_in=[True, True, False, True])
+
+    allocation = balance_fleet(fleet, SiteLayout.single_circuit(10.0, 4), NOW)
+
+    assert allocation.sum() == pytest.approx(10.0)
+    assert allocation[0] > allocation[1] > 0
+    assert allocation[2:].tolist() == [0.0, 0.0]
+
+    # Outside the schedule window nobody charges
+    later = NOW + timedelta(hours=6)
+    assert not balance_fleet(fleet, SiteLayout.single_circuit(10.0, 4), later).any()
+
+
+def test_forecast_balanced_fleet_matches_unlimited_forecast():
+    """Test that a site with power to spare changes nothing."""
+    fleet = _fleet([0.2, 0.5, 0.75])
+    start = NOW - timedelta(hours=1)
+
+    balanced = forecast_balanced_fleet(
+        fleet, SiteLayout.single_circuit(100.0, 3), start, num_periods=12
+    )
+    unlimited = forecast_fleet(fleet, start, num_periods=12)
+
+    assert balanced.forecast.soc == pytest.approx(unlimited.soc)
+    assert balanced.power_kw.max() == 7.0
+
+    # Cars only count as charging until they reach their target
+    start_soc = np.concatenate([fleet.current_soc[:, None], unlimited.soc[:, :-1]], 1)
+    below_target = start_soc < fleet.target_soc[:, None]
+    assert (
+        balanced.forecast.is_charging == (unlimited.is_charging & below_target)
+    ).all()
+    assert not (balanced.forecast.is_override & ~balanced.forecast.is_charging).any()
+
+
+def test_forecast_balanced_fleet_under_cap():
+    """Test that a tight site charges slower but never exceeds its limit."""
+    fleet = _fleet([0.2, 0.5, 0.75])
+
+    balanced = forecast_balanced_fleet(
+        fleet, SiteLayout.single_circuit(10.0, 3), NOW, num_periods=6
+    )
+    unlimited = forecast_fleet(fleet, NOW, num_periods=6)
+
+    assert (balanced.power_kw.sum(axis=0) <= 10.0 + 1e-9).all()
+    assert (balanced.forecast.soc <= unlimited.soc + 1e-12).all()
+    assert balanced.forecast.soc[0, -1] < unlimited.soc[0, -1]
+
+
+def test_forecast_balanced_fleet_frees_the_share_of_full_cars():
+    """Test that a car reaching its target hands its power to the others."""
+    # The first car needs 1.5 kWh, and leaves so soon it comes first
+    fleet = _fleet([0.78, 0.2])
+    departure = np.array(
+        [NOW + timedelta(minutes=1), np.datetime64("NaT")], dtype="datetime64[us]"
+    )
+
+    balanced = forecast_balanced_fleet(
+        fleet,
+        SiteLayout.single_circuit(8.0, 2),
+        NOW,
+        num_periods=4,
+        departure_time=departure,
+    )
+
+    # It only takes what it needs, instead of its full 7 kW
+    needed_kw = 0.02 * BATTERY_CAPACITY_KWH / 0.5
+    assert balanced.power_kw[:, 0] == pytest.approx([needed_kw, 8.0 - needed_kw])
+    assert balanced.forecast.soc[0].tolist() == [0.8] * 4
+    assert balanced.forecast.is_charging[0].tolist() == [True, False, False, False]
+    assert balanced.power_kw[:, 1:] == pytest.approx(np.array([[0.0] * 3, [7.0] * 3]))
@@ -0,0 +1,109 @@
+from datetime import datetime, time, timedelta
+
+from src.domain.charging import update_charger_state
+from src.domain.models import ChargeSchedule, ChargerState, DemoAdminState
+from src.services.override_expiry import OverrideExpiryScheduler, TimingWheel
+
+START = datetime(2025, 1, 1, 12, 0)
+SCHEDULE = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+
+
+def test_timing_wheel_fires_in_order():
+    """Test that deadlines fire once, earliest first, as the clock advances."""
+    wheel = TimingWheel(START, tick=timedelta(minutes=1), num_slots=8)
+    wheel.schedule("a", START + timedelta(minutes=3, seconds=30))
+    wheel.schedule("b", START + timedelta(minutes=2))
+    wheel.schedule("c", START + timedelta(minutes=30))
+
+    assert wheel.advance(START + timedelta(minutes=1)) == []
+    assert wheel.advance(START + timedelta(minutes=3)) == [
+        ("b", START + timedelta(minutes=2))
+    ]
+    # Later in the same tick than the clock, so not yet
+    assert wheel.advance(START + timedelta(minutes=3, seconds=10)) == []
+    assert wheel.advance(START + timedelta(minutes=3, seconds=30)) == [
+        ("a", START + timedelta(minutes=3, seconds=30))
+    ]
+
+    # More than a turn of the wheel away, in a slot already passed twice
+    assert "c" in wheel
+    assert wheel.advance(START + timedelta(minutes=20)) == []
+    assert wheel.advance(START + timedelta(minutes=31)) == [
+        ("c", START + timedelta(minutes=30))
+    ]
+    assert len(wheel) == 0
+
+
+def test_timing_wheel_reschedule_and_cancel():
+    """Test that a vehicle has at most one deadline and can drop it."""
+    wheel = TimingWheel(START, tick=timedelta(minutes=1), num_slots=8)
+    wheel.schedule("a", START + timedelta(minutes=5))
+    wheel.schedule("a", START + timedelta(minutes=10))
+    wheel.schedule("b", START + timedelta(minutes=5))
+    wheel.cancel("b")
+    wheel.cancel("missing")
+
+    assert len(wheel) == 1
+    assert wheel.advance(START + timedelta(hours=1)) == [
+        ("a", START + timedelta(minutes=10))
+    ]
+
+
+def test_timing_wheel_past_deadline_fires_next():
+    """Test that a deadline already past fires on the next advance."""
+    wheel = TimingWheel(START, tick=timedelta(minutes=1), num_slots=8)
+    wheel.advance(START + timedelta(minutes=20))
+    wheel.schedule("a", START)
+
+    assert wheel.advance(START + timedelta(minutes=20)) == [("a", START)]
+
+
+def test_override_expiry_scheduler():
+    """Test that expiries update only the expired vehicles, by the usual rules."""
+    scheduler = OverrideExpiryScheduler(TimingWheel(START))
+    idle = ChargerState(car_is_charging=False, charge_is_override=False)
+    chargers = {
+        vehicle_id: scheduler.start_override(vehicle_id, idle, START)
+        for vehicle_id in ("a", "b", "c")
+    }
+    chargers["b"] = scheduler.stop_override("b", chargers["b"])
+    lookups = []
+
+    def lookup(vehicle_id):
+        lookups.append(vehicle_id)
+        return chargers[vehicle_id], True, SCHEDULE
+
+    assert scheduler.advance(START + timedelta(minutes=30), lookup) == {}
+
+    end = START + timedelta(minutes=60)
+    updated = scheduler.advance(end, lookup)
+
+    assert lookups == ["a", "c"]
+    expected = update_charger_state(
+        chargers["a"],
+        DemoAdminState(car_is_plugged_in=True, current_time=end),
+        SCHEDULE,
+    )
+    assert updated == {"a": expected, "c": expected}
+    assert not expected.charge_is_override and not expected.car_is_charging
+
+
+def test_override_expiry_scheduler_skips_changed_overrides():
+    """Test that overrides changed behind the scheduler's back are left alone."""
+    scheduler = OverrideExpiryScheduler(TimingWheel(START))
+    charger = scheduler.start_override(
+        "a", ChargerState(car_is_charging=False, charge_is_override=False), START
+    )
+    restarted = ChargerState(
+        car_is_charging=True,
+        charge_is_override=True,
+        override_end_time=START + timedelta(hours=2),
+    )
+
+    assert charger.override_end_time == START + timedelta(hours=1)
+    assert (
+        scheduler.advance(
+            START + timedelta(hours=1), lambda _: (restarted, True, SCHEDULE)
+        )
+        == {}
+    )
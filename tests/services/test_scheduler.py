@@ -1,22 +1,45 @@
 import pytest
-from datetime import datetime
+from bisect import bisect_right
+from dataclasses import replace
+from datetime import datetime, time, timedelta
 from unittest.mock import patch
 
 import streamlit as st
 
+from src.config import BATTERY_CAPACITY_KWH
+from src.domain.battery import estimate_time_to_soc
+from src.domain.charging import update_charger_state
+from src.services import state_manager
+from src.services.fleet_forecast import forecast_fleet
+from src.services.forecast_cache import forecast_cache
 from src.services.scheduler import (
+    get_charge_complete_time,
+    get_forecast_frame,
+    get_forecast_segments,
     get_future_states,
+    charging_ended,
+    get_soc_at,
+    iter_future_states,
+    project_segments,
+    segments_to_states,
+    target_reached,
     start_charge as handle_start_charge,
     stop_charge as handle_stop_charge,
 )
-from src.domain.models import DemoAdminState
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+)
 
 
 def test_get_future_states_no_charging(setup_session_state):
     """Test getting future states when no charging is active."""
     # Set up a state where no charging is happening
-    st.session_state.charger_state.car_is_charging = False
-    st.session_state.charger_state.charge_is_override = False
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state, car_is_charging=False, charge_is_override=False
+    )
 
     # Test during non-charging hours
     demo_state = DemoAdminState(
@@ -44,8 +67,9 @@ def test_get_future_states_no_charging(setup_session_state):
 def test_get_future_states_scheduled_charging(setup_session_state):
     """Test getting future states during scheduled charging hours."""
     # Set up a state where scheduled charging is active
-    st.session_state.charger_state.car_is_charging = True
-    st.session_state.charger_state.charge_is_override = False
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state, car_is_charging=True, charge_is_override=False
+    )
 
     # Test during scheduled charging hours
     demo_state = DemoAdminState(
@@ -78,11 +102,12 @@ def test_get_future_states_scheduled_charging(setup_session_state):
 def test_get_future_states_override_charging(setup_session_state):
     """Test getting future states during override charging."""
     # Set up a state where override charging is active
-    st.session_state.charger_state.car_is_charging = True
-    st.session_state.charger_state.charge_is_override = True
-    st.session_state.charger_state.override_end_time = datetime(
-        2025, 1, 1, 13, 0
-    )  # 1 PM
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state,
+        car_is_charging=True,
+        charge_is_override=True,
+        override_end_time=datetime(2025, 1, 1, 13, 0),  # 1 PM
+    )
 
     # Test during override charging
     demo_state = DemoAdminState(
@@ -111,9 +136,12 @@ def test_get_future_states_override_charging(setup_session_state):
 def test_get_future_states_unplugged(setup_session_state):
     """Test that unplugged cars don't charge regardless of schedule or override."""
     # Set up a state with active schedule and override
-    st.session_state.charger_state.car_is_charging = True
-    st.session_state.charger_state.charge_is_override = True
-    st.session_state.charger_state.override_end_time = datetime(2025, 1, 1, 13, 0)
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state,
+        car_is_charging=True,
+        charge_is_override=True,
+        override_end_time=datetime(2025, 1, 1, 13, 0),
+    )
 
     # Test with car unplugged
     demo_state = DemoAdminState(
@@ -133,7 +161,9 @@ def test_get_future_states_unplugged(setup_session_state):
 def test_handle_start_charge_unplugged(mock_toast, setup_session_state):
     """Test starting a charge when unplugged."""
     # Set up unplugged state
-    st.session_state.demo_state.car_is_plugged_in = False
+    st.session_state.demo_state = replace(
+        st.session_state.demo_state, car_is_plugged_in=False
+    )
 
     # Try to start charge while unplugged
     handle_start_charge()
@@ -147,7 +177,9 @@ def test_handle_start_charge_unplugged(mock_toast, setup_session_state):
 def test_handle_start_charge_plugged_in(mock_toast, setup_session_state):
     """Test starting a charge when plugged in."""
     # Set plugged in
-    st.session_state.demo_state.car_is_plugged_in = True
+    st.session_state.demo_state = replace(
+        st.session_state.demo_state, car_is_plugged_in=True
+    )
 
     # Try to start charge while plugged in
     handle_start_charge()
@@ -163,9 +195,12 @@ def test_handle_start_charge_plugged_in(mock_toast, setup_session_state):
 def test_handle_stop_charge_with_override(mock_toast, setup_session_state):
     """Test stopping a charge that was started with override."""
     # Set up override charging state
-    st.session_state.charger_state.car_is_charging = True
-    st.session_state.charger_state.charge_is_override = True
-    st.session_state.charger_state.override_end_time = datetime(2025, 1, 1, 13, 0)
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state,
+        car_is_charging=True,
+        charge_is_override=True,
+        override_end_time=datetime(2025, 1, 1, 13, 0),
+    )
 
     # Stop charge
     handle_stop_charge()
@@ -175,14 +210,17 @@ def test_handle_stop_charge_with_override(mock_toast, setup_session_state):
     assert not st.session_state.charger_state.charge_is_override
     assert st.session_state.charger_state.override_end_time is None
     assert st.session_state.charge_schedule.is_enabled
+    # Charging carries on until the rules are next evaluated against the schedule
+    assert st.session_state.charger_state.car_is_charging
 
 
 @patch("streamlit.toast")
 def test_handle_stop_charge_with_schedule(mock_toast, setup_session_state):
     """Test stopping a charge that was started by schedule."""
     # Set up scheduled charging state
-    st.session_state.charger_state.car_is_charging = True
-    st.session_state.charger_state.charge_is_override = False
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state, car_is_charging=True, charge_is_override=False
+    )
 
     # Stop charge
     handle_stop_charge()
@@ -197,7 +235,9 @@ def test_handle_stop_charge_with_schedule(mock_toast, setup_session_state):
 def test_handle_stop_charge_not_charging(mock_toast, setup_session_state):
     """Test stopping a charge when not charging."""
     # Set up not charging state
-    st.session_state.charger_state.car_is_charging = False
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state, car_is_charging=False
+    )
 
     # Try to stop charge
     handle_stop_charge()
@@ -205,3 +245,368 @@ def test_handle_stop_charge_not_charging(mock_toast, setup_session_state):
     # Should show info message
     mock_toast.assert_called_once()
     mock_toast.assert_called_with("Car is not currently charging", icon="ℹ️")
+
+
+def test_project_segments_month_horizon():
+    """Test that a long horizon only produces segments at behaviour changes."""
+    start_time = datetime(2025, 1, 1, 12, 0)
+    segments = project_segments(
+        BatteryState(current_soc=0.1, target_soc=1.0),
+        ChargerState(car_is_charging=False, charge_is_override=False),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        True,
+        start_time,
+        start_time + timedelta(days=30),
+    )
+
+    # One charging and one idle segment per night, plus the leading idle one
+    assert len(segments) <= 2 * 31 + 1
+    assert segments[0].start_time == start_time
+    assert segments[-1].end_time == start_time + timedelta(days=30)
+    for previous, segment in zip(segments, segments[1:]):
+        assert previous.end_time == segment.start_time
+        assert (
+            previous.end_battery_state.current_soc
+            == segment.start_battery_state.current_soc
+        )
+
+
+def test_project_segments_exact_charge_complete_time():
+    """Test that the exact time the target is reached is reported."""
+    start_time = datetime(2025, 1, 1, 12, 0)
+    segments = project_segments(
+        BatteryState(current_soc=0.6, target_soc=0.8),
+        ChargerState(car_is_charging=True, charge_is_override=True, charge_rate_kw=7.0),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        True,
+        start_time,
+        start_time + timedelta(days=1),
+    )
+
+    hours = 0.2 * BATTERY_CAPACITY_KWH / 7.0
+    complete_time = get_charge_complete_time(segments)
+    assert abs(complete_time - (start_time + timedelta(hours=hours))) <= timedelta(
+        microseconds=1
+    )
+    assert get_soc_at(segments, complete_time) == pytest.approx(0.8)
+    assert get_soc_at(segments, start_time + timedelta(hours=hours / 2)) == (
+        pytest.approx(0.7)
+    )
+
+
+def test_segments_to_states_matches_segment_lookups():
+    """Test that the single pass over segments matches looking each period up."""
+    start_time = datetime(2025, 1, 1, 12, 0)
+    segments = project_segments(
+        BatteryState(current_soc=0.1, target_soc=0.9),
+        ChargerState(car_is_charging=False, charge_is_override=False),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(3, 0)),
+        True,
+        start_time,
+        start_time + timedelta(days=5),
+    )
+    assert len(segments) > 8
+
+    states = segments_to_states(segments, num_periods=5 * 48)
+    period = timedelta(minutes=30)
+    starts = [segment.start_time for segment in segments]
+    for state in states:
+        segment = segments[bisect_right(starts, state.time) - 1]
+        assert state.charger_state is segment.charger_state
+        assert state.battery_state.current_soc == get_soc_at(
+            segments, state.time + period
+        )
+
+
+def test_project_segments_unplugged():
+    """Test that an unplugged car has a single idle segment."""
+    start_time = datetime(2025, 1, 1, 1, 0)
+    segments = project_segments(
+        BatteryState(current_soc=0.6, target_soc=0.8),
+        ChargerState(car_is_charging=True, charge_is_override=True),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        False,
+        start_time,
+        start_time + timedelta(days=7),
+    )
+
+    assert len(segments) == 1
+    assert not segments[0].charger_state.car_is_charging
+    assert get_charge_complete_time(segments) is None
+
+
+@pytest.mark.parametrize(
+    "schedule",
+    [
+        ChargeSchedule(start_time=time(22, 0), end_time=time(0, 0)),
+        ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0)),
+        ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+    ],
+)
+def test_project_segments_match_charging_rules(schedule):
+    """Test that segments charge exactly when the charging rules say so."""
+    # Sunday evening, so the projection crosses the end of the week
+    start_time = datetime(2025, 2, 16, 21, 0)
+    charger_state = ChargerState(car_is_charging=False, charge_is_override=False)
+    segments = project_segments(
+        BatteryState(current_soc=0.1, target_soc=1.0),
+        charger_state,
+        schedule,
+        True,
+        start_time,
+        start_time + timedelta(days=3),
+    )
+
+    starts = [segment.start_time for segment in segments]
+    for minutes in range(0, 3 * 24 * 60, 7):
+        at_time = start_time + timedelta(minutes=minutes, seconds=30)
+        segment = segments[bisect_right(starts, at_time) - 1]
+        expected = update_charger_state(
+            charger_state,
+            DemoAdminState(car_is_plugged_in=True, current_time=at_time),
+            schedule,
+        )
+        assert (
+            segment.charger_state.car_is_charging == expected.car_is_charging
+        ), at_time
+
+
+def test_charge_complete_time_matches_estimate_across_midnight():
+    """Test that a window ending at midnight gives the same ETA both ways."""
+    start_time = datetime(2025, 2, 16, 21, 0)
+    battery_state = BatteryState(current_soc=0.1, target_soc=1.0)
+    charger_state = ChargerState(car_is_charging=False, charge_is_override=False)
+    schedule = ChargeSchedule(start_time=time(22, 0), end_time=time(0, 0))
+    segments = project_segments(
+        battery_state,
+        charger_state,
+        schedule,
+        True,
+        start_time,
+        start_time + timedelta(days=7),
+    )
+
+    # Sunday night's two hours count towards the charge
+    assert get_soc_at(segments, datetime(2025, 2, 17, 0, 0)) > 0.1
+    complete_time = get_charge_complete_time(segments)
+    assert abs(
+        complete_time
+        - estimate_time_to_soc(battery_state, charger_state, schedule, start_time)
+    ) <= timedelta(microseconds=1)
+
+
+def test_segments_to_states_matches_periodic_override(setup_session_state):
+    """Test that the periodic view matches get_future_states for an override."""
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state,
+        car_is_charging=True,
+        charge_is_override=True,
+        override_end_time=datetime(2025, 1, 1, 13, 0),
+    )
+    demo_state = setup_session_state
+
+    expected = get_future_states(demo_state, num_periods=6)
+    states = segments_to_states(
+        get_forecast_segments(demo_state, timedelta(hours=3)), num_periods=6
+    )
+
+    assert [s.time for s in states] == [s.time for s in expected]
+    assert [s.charger_state.car_is_charging for s in states] == [
+        s.charger_state.car_is_charging for s in expected
+    ]
+    assert [s.battery_state.current_soc for s in states] == pytest.approx(
+        [s.battery_state.current_soc for s in expected]
+    )
+
+
+def test_get_future_states_advances_last_forecast(setup_session_state):
+    """Test that moving the clock forward only projects the new periods."""
+    forecast_cache.clear()
+    demo_state = setup_session_state
+    get_future_states(demo_state)
+
+    later = DemoAdminState(
+        car_is_plugged_in=True, current_time=datetime(2025, 1, 1, 13, 0)
+    )
+    with patch("src.services.scheduler.forecast_fleet") as full_forecast:
+        states = get_future_states(later)
+    full_forecast.assert_not_called()
+
+    # Same result as a full recompute from scratch
+    forecast_cache.clear()
+    expected = get_future_states(later)
+    assert [s.time for s in states] == [s.time for s in expected]
+    assert [s.battery_state.current_soc for s in states] == [
+        s.battery_state.current_soc for s in expected
+    ]
+
+
+def test_get_future_states_advances_interleaved_sessions(setup_session_state):
+    """Test that sessions at different clocks each advance their own forecast."""
+    forecast_cache.clear()
+    demo_state = setup_session_state
+    other_session = replace(
+        demo_state, current_time=demo_state.current_time + timedelta(hours=6)
+    )
+    get_future_states(demo_state)
+    get_future_states(other_session)
+
+    # Each moves on by one period from its own clock, not the other's
+    for session in (demo_state, other_session):
+        later = replace(
+            session, current_time=session.current_time + timedelta(minutes=30)
+        )
+        with patch("src.services.scheduler.forecast_fleet") as full_forecast:
+            get_future_states(later)
+        full_forecast.assert_not_called()
+
+
+def test_get_future_states_advances_despite_soc_rounding(setup_session_state):
+    """Test that a SoC rounded on its way through storage still matches."""
+    forecast_cache.clear()
+    demo_state = setup_session_state
+    states = get_future_states(demo_state)
+
+    # The SoC now is what the forecast projected, give or take rounding
+    st.session_state.battery_state = replace(
+        st.session_state.battery_state,
+        current_soc=states[1].battery_state.current_soc * (1 + 1e-12),
+    )
+    later = DemoAdminState(
+        car_is_plugged_in=True,
+        current_time=demo_state.current_time + timedelta(hours=1),
+    )
+    with patch("src.services.scheduler.forecast_fleet") as full_forecast:
+        get_future_states(later)
+    full_forecast.assert_not_called()
+
+
+def test_get_future_states_recomputes_on_input_change(setup_session_state):
+    """Test that a change other than time forces a full recompute."""
+    forecast_cache.clear()
+    demo_state = setup_session_state
+    get_future_states(demo_state)
+
+    st.session_state.battery_state = replace(
+        st.session_state.battery_state, target_soc=0.9
+    )
+    later = DemoAdminState(
+        car_is_plugged_in=True, current_time=datetime(2025, 1, 1, 12, 30)
+    )
+    with patch(
+        "src.services.scheduler.forecast_fleet", wraps=forecast_fleet
+    ) as full_forecast:
+        get_future_states(later)
+    full_forecast.assert_called_once()
+
+
+def test_iter_future_states_matches_get_future_states(setup_session_state):
+    """Test that the lazy projection yields the same states as the list."""
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state,
+        charge_is_override=True,
+        override_end_time=datetime(2025, 1, 1, 13, 0),
+    )
+    demo_state = setup_session_state
+
+    expected = get_future_states(demo_state, num_periods=6)
+    states = list(iter_future_states(demo_state, num_periods=6))
+
+    assert [s.time for s in states] == [s.time for s in expected]
+    assert [s.battery_state.current_soc for s in states] == [
+        s.battery_state.current_soc for s in expected
+    ]
+    assert [s.charger_state for s in states] == [s.charger_state for s in expected]
+
+
+def test_iter_future_states_stops_when_target_reached(setup_session_state):
+    """Test that an unbounded projection stops once the target is reached."""
+    demo_state = setup_session_state
+
+    states = list(iter_future_states(demo_state, stop_when=target_reached))
+
+    # Scheduled charging from 2am the next day takes the car from 60% to 80%
+    assert target_reached(states[-1])
+    assert not any(target_reached(state) for state in states[:-1])
+    assert states[-1].time.date() == datetime(2025, 1, 2).date()
+
+
+def test_iter_future_states_stops_when_charging_ends(setup_session_state):
+    """Test stopping at the end of the schedule window."""
+    st.session_state.battery_state = replace(
+        st.session_state.battery_state, current_soc=0.1
+    )
+    demo_state = setup_session_state
+
+    states = list(iter_future_states(demo_state, stop_when=charging_ended()))
+
+    assert states[-1].time == datetime(2025, 1, 2, 5, 30)
+    assert not states[-1].charger_state.car_is_charging
+    assert states[-2].charger_state.car_is_charging
+
+
+def test_get_forecast_frame_matches_future_states(setup_session_state):
+    """Test that the columnar forecast matches the compatibility view."""
+    demo_state = DemoAdminState(
+        car_is_plugged_in=True, current_time=datetime(2025, 1, 1, 1, 0)
+    )
+
+    frame = get_forecast_frame(demo_state, num_periods=12)
+    states = get_future_states(demo_state, num_periods=12)
+
+    assert frame.times.tolist() == [s.time for s in states]
+    assert frame.soc.tolist() == [s.battery_state.current_soc for s in states]
+    assert frame.is_charging.tolist() == [
+        s.charger_state.car_is_charging for s in states
+    ]
+    assert frame.is_override.tolist() == [
+        s.charger_state.charge_is_override for s in states
+    ]
+
+
+@patch("streamlit.toast")
+def test_handle_start_charge_retries_on_conflict(mock_toast, setup_session_state):
+    """Test that starting a charge is retried when the charger changes under it."""
+    from src.domain.charging import start_override_charge
+
+    calls = []
+
+    def racing_start(charger_state, current_time):
+        calls.append(charger_state)
+        if len(calls) == 1:
+            # Another tab changes the charge rate before this commit lands
+            state_manager.commit(
+                {"charger_state": replace(charger_state, charge_rate_kw=11)}
+            )
+        return start_override_charge(charger_state, current_time)
+
+    with patch("src.services.scheduler.start_override_charge", racing_start):
+        handle_start_charge()
+
+    # The retry started from the other tab's state, so its change is kept
+    assert len(calls) == 2
+    assert st.session_state.charger_state.charge_is_override
+    assert st.session_state.charger_state.charge_rate_kw == 11
+    mock_toast.assert_called_once_with("Starting charge for 60 minutes!", icon="🚀")
+
+
+@patch("streamlit.toast")
+def test_handle_stop_charge_rejects_persistent_conflict(
+    mock_toast, setup_session_state
+):
+    """Test that a command which keeps conflicting is reported, not forced through."""
+    st.session_state.charger_state = replace(
+        st.session_state.charger_state, car_is_charging=True, charge_is_override=True
+    )
+
+    def contended(charger_state):
+        state_manager.commit({"charger_state": replace(charger_state)})
+        return replace(charger_state, charge_is_override=False)
+
+    with patch("src.services.scheduler.end_override", contended):
+        handle_stop_charge()
+
+    assert st.session_state.charger_state.charge_is_override
+    mock_toast.assert_called_once_with(
+        "Charger was changed elsewhere, please try again", icon="⚠️"
+    )
@@ -0,0 +1,266 @@
+import sqlite3
+from datetime import datetime, time
+
+import pytest
+import streamlit as st
+
+from src.domain.models import (
+    BatteryState,
+    ChargeSchedule,
+    ChargerState,
+    DemoAdminState,
+    ScheduleWindow,
+)
+from src.services import state_manager
+from src.services.state_backends import (
+    SessionStateBackend,
+    SQLiteStateBackend,
+    StateConflictError,
+    deserialize_state,
+    serialize_state,
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path to a fresh SQLite database."""
+    return str(tmp_path / "state.db")
+
+
+def _stored_rows(db_path):
+    """Read the stored rows with a separate connection."""
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute(
+            "SELECT vehicle_id, key FROM vehicle_state ORDER BY vehicle_id, key"
+        ).fetchall()
+
+
+def test_serialize_state_round_trip():
+    """Test that every state type survives serialization."""
+    states = [
+        BatteryState(current_soc=0.6, target_soc=0.8),
+        ChargerState(
+            car_is_charging=True,
+            charge_is_override=True,
+            override_end_time=datetime(2025, 1, 1, 13, 0),
+        ),
+        ChargerState(car_is_charging=False, charge_is_override=False),
+        ChargeSchedule(start_time=time(22, 0), end_time=time(5, 0), is_enabled=False),
+        ChargeSchedule.from_windows(
+            [
+                ScheduleWindow(time(1, 0), time(4, 0)),
+                ScheduleWindow(time(9, 0), time(17, 0), weekdays=(5, 6)),
+            ]
+        ),
+        DemoAdminState(car_is_plugged_in=True, current_time=datetime(2025, 1, 1)),
+    ]
+
+    for state in states:
+        assert deserialize_state(type(state).__name__, serialize_state(state)) == state
+
+
+def test_session_state_backend(clean_session_state):
+    """Test that the default backend stores state in session state."""
+    backend = SessionStateBackend()
+    battery_state = BatteryState(current_soc=0.5)
+
+    assert backend.load("battery_state") is None
+    backend.save("battery_state", battery_state)
+    assert st.session_state.battery_state is battery_state
+
+
+def test_sqlite_backend_uses_wal(db_path):
+    """Test that the database is opened in WAL mode."""
+    SQLiteStateBackend(db_path, "car-1")
+
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_backend_batches_writes(db_path):
+    """Test that writes are only persisted, together, on flush."""
+    backend = SQLiteStateBackend(db_path, "car-1")
+    backend.save("battery_state", BatteryState(current_soc=0.5))
+    backend.save(
+        "charge_schedule", ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+    )
+
+    assert backend.load("battery_state").current_soc == 0.5
+    assert _stored_rows(db_path) == []
+
+    backend.flush()
+    assert _stored_rows(db_path) == [
+        ("car-1", "battery_state"),
+        ("car-1", "charge_schedule"),
+    ]
+
+
+def test_sqlite_backend_shares_state_by_vehicle(db_path):
+    """Test that processes see each other's writes per vehicle after a refresh."""
+    writer = SQLiteStateBackend(db_path, "car-1")
+    reader = SQLiteStateBackend(db_path, "car-1")
+    other_vehicle = SQLiteStateBackend(db_path, "car-2")
+
+    writer.save("battery_state", BatteryState(current_soc=0.5))
+    writer.flush()
+    assert reader.load("battery_state") == BatteryState(current_soc=0.5)
+    assert other_vehicle.load("battery_state") is None
+
+    # Reads are cached until the next refresh
+    writer.save("battery_state", BatteryState(current_soc=0.7))
+    writer.flush()
+    assert reader.load("battery_state").current_soc == 0.5
+    reader.refresh()
+    assert reader.load("battery_state").current_soc == 0.7
+
+
+def test_session_backend_versions(clean_session_state):
+    """Test that saves bump versions and stale compare-and-swap saves are rejected."""
+    backend = SessionStateBackend()
+    assert backend.load_versions(["battery_state"]) == {"battery_state": 0}
+
+    backend.save("battery_state", BatteryState(current_soc=0.5))
+    backend.save_many(
+        {"battery_state": BatteryState(current_soc=0.6)}, {"battery_state": 1}
+    )
+    assert backend.current_versions(["battery_state"]) == {"battery_state": 2}
+
+    with pytest.raises(StateConflictError) as error:
+        backend.save_many(
+            {"battery_state": BatteryState(current_soc=0.9)}, {"battery_state": 1}
+        )
+    assert error.value.keys == ["battery_state"]
+    assert backend.load("battery_state").current_soc == 0.6
+
+
+def test_sqlite_backend_compare_and_swap(db_path):
+    """Test that a writer with a stale version is rejected without a refresh."""
+    first = SQLiteStateBackend(db_path, "car-1")
+    second = SQLiteStateBackend(db_path, "car-1")
+    first.save(
+        "charger_state", ChargerState(car_is_charging=False, charge_is_override=False)
+    )
+    first.flush()
+
+    # Both read version 1, then the first writer wins
+    seen = second.load_versions(["charger_state"])
+    assert first.load_versions(["charger_state"]) == seen == {"charger_state": 1}
+    first.save_many(
+        {"charger_state": ChargerState(car_is_charging=True, charge_is_override=True)},
+        seen,
+    )
+
+    # Others' writes are visible in the versions before any refresh
+    assert second.current_versions(["charger_state"]) == {"charger_state": 2}
+    with pytest.raises(StateConflictError):
+        second.save_many(
+            {"charger_state": ChargerState(False, False, charge_rate_kw=11)}, seen
+        )
+
+    second.refresh()
+    assert second.load("charger_state").car_is_charging
+    second.save_many(
+        {"charger_state": ChargerState(False, False, charge_rate_kw=11)},
+        second.load_versions(["charger_state"]),
+    )
+    assert second.load_versions(["charger_state"]) == {"charger_state": 3}
+
+
+def test_sqlite_backend_adds_version_column(db_path):
+    """Test that databases written before versioning are upgraded."""
+    with sqlite3.connect(db_path) as connection:
+        connection.execute(
+            "CREATE TABLE vehicle_state (vehicle_id TEXT NOT NULL, key TEXT NOT NULL,"
+            " type TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (vehicle_id, key))"
+        )
+        connection.execute(
+            "INSERT INTO vehicle_state VALUES (?, ?, ?, ?)",
+            (
+                "car-1",
+                "battery_state",
+                "BatteryState",
+                serialize_state(BatteryState(current_soc=0.5)),
+            ),
+        )
+
+    backend = SQLiteStateBackend(db_path, "car-1")
+    assert backend.load("battery_state") == BatteryState(current_soc=0.5)
+    assert backend.load_versions(["battery_state"]) == {"battery_state": 0}
+
+
+@pytest.fixture
+def clean_session_state():
+    """Clear session state before and after the test, including its backend."""
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    yield
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+
+def test_state_manager_with_sqlite_backend(db_path, clean_session_state):
+    """Test that the state manager reads and writes through the SQLite backend."""
+    state_manager.set_state_backend(SQLiteStateBackend(db_path, "car-1"))
+
+    state_manager.init_session_state()
+    state_manager.update_battery_state(BatteryState(current_soc=0.3))
+    state_manager.flush_state()
+
+    # A new session for the same vehicle sees the stored state
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    state_manager.set_state_backend(SQLiteStateBackend(db_path, "car-1"))
+
+    assert state_manager.get_battery_state().current_soc == 0.3
+    assert "battery_state" not in st.session_state
+    assert len(_stored_rows(db_path)) == 4
+
+
+def test_sqlite_backend_refresh_rereads_only_after_changes(db_path):
+    """Test that a refresh keeps the read cache until another writer changes state."""
+    first = SQLiteStateBackend(db_path, "car-1")
+    second = SQLiteStateBackend(db_path, "car-1")
+    first.save("battery_state", BatteryState(current_soc=0.5))
+    first.flush()
+    second.load("battery_state")
+
+    cache = second._cache
+    second.refresh()
+    assert second._cache is cache
+
+    first.save("battery_state", BatteryState(current_soc=0.7))
+    first.flush()
+    assert second.load("battery_state").current_soc == 0.5
+    second.refresh()
+    assert second.load("battery_state").current_soc == 0.7
+
+
+def test_sqlite_backend_compare_and_swap_after_buffered_write(db_path):
+    """Test that versions read after a buffered write match once it is flushed."""
+    backend = SQLiteStateBackend(db_path, "car-1")
+    backend.save("battery_state", BatteryState(current_soc=0.5))
+    backend.flush()
+
+    backend.save("battery_state", BatteryState(current_soc=0.6))
+    backend.save("battery_state", BatteryState(current_soc=0.7))
+    seen = backend.load_versions(["battery_state"])
+    assert seen == {"battery_state": 2}
+
+    backend.save_many({"battery_state": BatteryState(current_soc=0.8)}, seen)
+    assert backend.current_versions(["battery_state"]) == {"battery_state": 3}
+
+
+def test_sqlite_backend_closes_connection(db_path):
+    """Test that the connection is closed on close, or when the backend is dropped."""
+    backend = SQLiteStateBackend(db_path, "car-1")
+    connection = backend._connection
+    backend.save("battery_state", BatteryState(current_soc=0.5))
+    backend.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+    assert _stored_rows(db_path) == [("car-1", "battery_state")]
+
+    connection = SQLiteStateBackend(db_path, "car-1")._connection
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
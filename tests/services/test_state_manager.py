@@ -1,6 +1,11 @@
 from datetime import time
+from unittest.mock import patch
+
+import pytest
 import streamlit as st
 
+from src.services import state_manager
+from src.services.state_backends import SessionStateBackend, StateConflictError
 from src.services.state_manager import init_session_state
 from src.domain.models import BatteryState, ChargeSchedule, ChargerState
 
@@ -33,3 +38,110 @@ def test_init_session_state():
     assert isinstance(st.session_state.charge_schedule.start_time, time)
     assert isinstance(st.session_state.charge_schedule.end_time, time)
     assert isinstance(st.session_state.charge_schedule.is_enabled, bool)
+
+
+def test_snapshot_reads_all_states(setup_session_state):
+    """Test that a snapshot returns all four states at once."""
+    state = state_manager.snapshot()
+
+    assert state.battery_state is st.session_state.battery_state
+    assert state.charger_state is st.session_state.charger_state
+    assert state.charge_schedule is st.session_state.charge_schedule
+    assert state.demo_state is st.session_state.demo_state
+
+
+def test_init_session_state_runs_once(setup_session_state):
+    """Test that state is only checked for initialization once per session."""
+    with patch.object(
+        SessionStateBackend,
+        "load_many",
+        wraps=state_manager.get_state_backend().load_many,
+    ) as load_many:
+        for _ in range(5):
+            state_manager.get_battery_state()
+            state_manager.get_charger_state()
+
+    # One load per read, plus a single one to check initialization
+    assert load_many.call_count == 10 + 1
+
+
+def test_commit_writes_only_changed_states(setup_session_state):
+    """Test that commit writes the given states in one step and nothing else."""
+    battery_state = BatteryState(current_soc=0.3)
+    backend = state_manager.get_state_backend()
+
+    with patch.object(backend, "save_many", wraps=backend.save_many) as save_many:
+        state_manager.commit({"battery_state": battery_state})
+
+    save_many.assert_called_once_with({"battery_state": battery_state}, None)
+    assert state_manager.snapshot().battery_state is battery_state
+
+
+def test_commit_rejects_unknown_keys(setup_session_state):
+    """Test that commit only accepts known state keys."""
+    with pytest.raises(ValueError):
+        state_manager.commit({"not_a_state": 1})
+
+
+def test_has_changed_since(setup_session_state):
+    """Test that readers can tell whether any state was written since they looked."""
+    versions = state_manager.get_versions()
+    assert not state_manager.has_changed_since(versions)
+    assert state_manager.has_changed_since(None)
+
+    state_manager.commit({"battery_state": BatteryState(current_soc=0.3)})
+    assert state_manager.has_changed_since(versions)
+
+
+def test_commit_with_stale_versions_conflicts(setup_session_state):
+    """Test that a commit expecting versions that have moved on is rejected."""
+    state = state_manager.snapshot()
+    state_manager.commit({"battery_state": BatteryState(current_soc=0.3)})
+
+    with pytest.raises(StateConflictError):
+        state_manager.commit(
+            {"battery_state": BatteryState(current_soc=0.9)}, state.versions
+        )
+    assert state_manager.get_battery_state().current_soc == 0.3
+
+
+def test_retry_on_conflict(setup_session_state):
+    """Test that a conflicting command is rerun on a fresh snapshot, then given up."""
+    seen = []
+
+    def command(state):
+        seen.append(state.versions["battery_state"])
+        # Another writer gets in between the read and the commit
+        state_manager.update_battery_state(BatteryState(current_soc=0.1))
+        state_manager.commit({"battery_state": state.battery_state}, state.versions)
+
+    with pytest.raises(StateConflictError):
+        state_manager.retry_on_conflict(command, attempts=3)
+
+    # Each attempt read the state the previous one lost to
+    assert len(seen) == 3
+    assert seen == sorted(set(seen))
+
+
+def test_get_current_states_rederives_after_concurrent_write(setup_session_state):
+    """Test that the derived charger state never overwrites another writer's."""
+    from src.domain import charging
+
+    calls = []
+
+    def update(charger_state, demo_state, charge_schedule):
+        calls.append(charger_state)
+        if len(calls) == 1:
+            # Another session commits while this one derives
+            state_manager.commit(
+                {"charger_state": ChargerState(False, False, charge_rate_kw=11)}
+            )
+        return ChargerState(True, False, charge_rate_kw=charger_state.charge_rate_kw)
+
+    with patch.object(charging, "update_charger_state", update):
+        charger_state, _ = state_manager.get_current_states()
+
+    # The second attempt derived from the other session's state
+    assert len(calls) == 2
+    assert charger_state.charge_rate_kw == 11
+    assert state_manager.get_charger_state() == charger_state
@@ -0,0 +1,142 @@
+import pytest
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from src.config import BATTERY_CAPACITY_KWH
+from src.domain.models import BatteryState, ChargeSchedule, ChargerState
+from src.services.fleet_forecast import build_fleet_state
+from src.services.scheduler import get_charge_plan
+from src.services.tariff_planner import plan_cheapest_charging, select_cheapest_slots
+
+START = datetime(2025, 1, 1, 18, 0)
+SCHEDULE = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+
+
+def _fleet(*vehicles):
+    """Build a fleet from (current_soc, charger_state, plugged_in) tuples."""
+    return build_fleet_state(
+        (BatteryState(current_soc=soc, target_soc=0.8), charger, SCHEDULE, plugged)
+        for soc, charger, plugged in vehicles
+    )
+
+
+def _charger(charge_is_override=False, override_end_time=None):
+    """Create a 7 kW charger, without an override by default."""
+    return ChargerState(
+        car_is_charging=False,
+        charge_is_override=charge_is_override,
+        override_end_time=override_end_time,
+    )
+
+
+def test_select_cheapest_slots_matches_brute_force():
+    """Test the selection against sorting each vehicle's slots by hand."""
+    rng = np.random.default_rng(0)
+    prices = rng.choice([0.1, 0.2, 0.3, np.nan], size=(20, 50))
+    first_slot = rng.integers(0, 10, 20)
+    end_slot = rng.integers(10, 51, 20)
+    num_slots = rng.integers(-1, 30, 20)
+
+    for shared in (True, False):
+        tariff = prices[0] if shared else prices
+        selected = select_cheapest_slots(tariff, first_slot, end_slot, num_slots)
+
+        for i in range(20):
+            row = prices[0] if shared else prices[i]
+            slots = [
+                t for t in range(first_slot[i], end_slot[i]) if not np.isnan(row[t])
+            ]
+            expected = sorted(slots, key=lambda t: (row[t], t))[: max(num_slots[i], 0)]
+            assert np.flatnonzero(selected[i]).tolist() == sorted(expected)
+
+
+def test_plan_cheapest_charging_picks_cheapest_slots():
+    """Test that the plan buys the cheapest energy and reaches the target."""
+    # Two hours of charging needed at 7 kW; cheap energy from 1 AM to 3 AM
+    fleet = _fleet((0.8 - 14 / BATTERY_CAPACITY_KWH, _charger(), True))
+    hours = np.arange(0, 16, 5 / 60)
+    prices = np.where((hours >= 7) & (hours < 9), 0.1, 0.3)
+
+    plan = plan_cheapest_charging(fleet, prices, START, START + timedelta(hours=16))
+
+    assert (
+        plan.forecast.is_charging[0].tolist() == ((hours >= 7) & (hours < 9)).tolist()
+    )
+    assert plan.reaches_target[0]
+    assert plan.cost[0] == pytest.approx(14 * 0.1)
+    assert plan.forecast.soc[0, -1] == pytest.approx(0.8)
+
+    # The frame feeds the chart like any other forecast
+    frame = plan.forecast.frame(0)
+    assert len(frame) == len(prices)
+    assert not frame.is_override.any()
+
+
+def test_plan_cheapest_charging_respects_departure():
+    """Test that slots ending after departure are never used."""
+    fleet = _fleet((0.2, _charger(), True), (0.2, _charger(), False))
+    prices = np.linspace(1.0, 0.1, 24)
+
+    plan = plan_cheapest_charging(fleet, prices, START, START + timedelta(minutes=62))
+
+    # Twelve whole slots fit before departure, and none is enough
+    assert plan.forecast.is_charging[0].tolist() == [True] * 12 + [False] * 12
+    assert plan.reaches_target.tolist() == [False, False]
+
+    # Unplugged cars never charge
+    assert not plan.forecast.is_charging[1].any()
+    assert plan.cost[1] == 0.0
+
+
+def test_plan_cheapest_charging_counts_override():
+    """Test that an override charges regardless of price and shortens the plan."""
+    override = _charger(
+        charge_is_override=True, override_end_time=START + timedelta(minutes=30)
+    )
+    # Needs 12 slots, 6 of them covered by the override
+    fleet = _fleet((0.8 - 7 / BATTERY_CAPACITY_KWH, override, True))
+    prices = np.concatenate([np.full(6, 0.5), np.full(12, 0.2), np.full(6, 0.1)])
+
+    plan = plan_cheapest_charging(fleet, prices, START, START + timedelta(hours=2))
+
+    assert plan.forecast.is_override[0].tolist() == [True] * 6 + [False] * 18
+    assert np.flatnonzero(plan.forecast.is_charging[0]).tolist() == list(
+        range(6)
+    ) + list(range(18, 24))
+    assert plan.cost[0] == pytest.approx(3.5 * 0.5 + 3.5 * 0.1)
+    assert plan.reaches_target[0]
+
+
+def test_plan_cheapest_charging_per_vehicle_prices():
+    """Test that per-vehicle tariffs give the same plan as shared ones."""
+    rng = np.random.default_rng(1)
+    fleet = _fleet(*[(soc, _charger(), True) for soc in rng.uniform(0.2, 0.7, 8)])
+    prices = rng.uniform(0.05, 0.4, 7 * 24 * 12)
+    departure = np.datetime64(START, "us") + rng.integers(6, 48, 8) * np.timedelta64(
+        1, "h"
+    )
+
+    shared = plan_cheapest_charging(fleet, prices, START, departure)
+    per_vehicle = plan_cheapest_charging(
+        fleet, np.tile(prices, (8, 1)), START, departure
+    )
+
+    assert (shared.forecast.is_charging == per_vehicle.forecast.is_charging).all()
+    assert shared.cost == pytest.approx(per_vehicle.cost)
+    assert shared.reaches_target.all()
+
+
+def test_get_charge_plan(setup_session_state):
+    """Test planning the session's car as a fleet of one."""
+    demo_state = setup_session_state
+    prices = np.full(12 * 12, 0.2)
+
+    plan = get_charge_plan(
+        demo_state, prices, demo_state.current_time + timedelta(hours=12)
+    )
+
+    # 0.6 to 0.8 at 7 kW is about two hours, taken as early as possible
+    assert plan.forecast.is_charging[0, :26].all()
+    assert not plan.forecast.is_charging[0, 26:].any()
+    assert plan.cost[0] == pytest.approx(0.2 * 0.2 * BATTERY_CAPACITY_KWH)
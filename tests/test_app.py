@@ -0,0 +1,85 @@
+import os
+import re
+import subprocess
+import sys
+
+# Import time allowed for the app's own modules and their dependencies, on top
+# of Streamlit itself, before the first paint. Wall-clock time depends on the
+# machine, so the default is generous; set COLD_START_BUDGET_MS to tighten it
+COLD_START_BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", 1000))
+
+# Top-level packages the app may load on top of Streamlit's own before the
+# first paint, which holds on any machine
+COLD_START_PACKAGES = {"src", "numpy", "sqlite3", "_sqlite3", "ctypes", "_ctypes"}
+
+# Modules that should only be loaded once the chart is drawn
+DEFERRED_MODULES = ("pandas", "plotly.express", "src.ui.visualization")
+
+
+def _loaded_modules(module: str) -> set[str]:
+    """Import a module in a fresh interpreter and list every module it loaded."""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print('\\n'.join(sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(result.stdout.splitlines())
+
+
+def _import_time_report(module: str) -> dict[str, tuple[int, int]]:
+    """Import a module in a fresh interpreter and report per-module import times."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    report = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)", line)
+        if match:
+            self_us, cumulative_us, name = match.groups()
+            report[name] = (int(self_us), int(cumulative_us))
+    return report
+
+
+def test_app_defers_heavy_imports():
+    """Test that importing the app does not load the charting dependencies."""
+    modules = _loaded_modules("src.app")
+
+    assert "src.app" in modules
+    assert [module for module in DEFERRED_MODULES if module in modules] == []
+
+
+def test_app_cold_start_package_budget():
+    """Test that importing the app loads no packages beyond the allowed ones."""
+    extra = _loaded_modules("src.app") - _loaded_modules("streamlit")
+    packages = {module.split(".")[0] for module in extra}
+
+    assert packages - COLD_START_PACKAGES == set()
+
+
+def test_app_cold_start_import_budget():
+    """Test that the app's own import cost stays within the cold-start budget."""
+    report = _import_time_report("src.app")
+
+    app_ms = (report["src.app"][1] - report["streamlit"][1]) / 1000
+    slowest = sorted(
+        (
+            (cumulative // 1000, name)
+            for name, (_, cumulative) in report.items()
+            if name.startswith("src") or "." not in name
+        ),
+        reverse=True,
+    )[:10]
+
+    assert app_ms <= COLD_START_BUDGET_MS, (
+        f"Importing src.app took {app_ms:.0f}ms on top of Streamlit, over the "
+        f"{COLD_START_BUDGET_MS:.0f}ms budget. Slowest modules (ms): {slowest}"
+    )
@@ -0,0 +1,140 @@
+import pytest
+import streamlit as st
+
+from benchmarks.cases import BENCHMARKS
+from benchmarks.runner import (
+    Benchmark,
+    Measurement,
+    find_regressions,
+    load_baseline,
+    main,
+    matches,
+    measure,
+    save_baseline,
+)
+
+BASELINE = {
+    "fast": Measurement(
+        ops_per_sec=1000.0, allocations=100, peak_kib=100.0, relative_speed=10.0
+    ),
+    "tiny": Measurement(
+        ops_per_sec=1000.0, allocations=2, peak_kib=0.5, relative_speed=10.0
+    ),
+}
+
+
+@pytest.fixture
+def clean_session_state():
+    """Clear the session state the scheduler benchmarks fill."""
+    yield
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+
+
+def test_find_regressions_uses_thresholds():
+    """Test slowdowns and memory growth beyond the thresholds are reported."""
+    within = {"fast": Measurement(800.0, 120, 120.0, 8.0)}
+    assert find_regressions(within, BASELINE, max_slowdown=0.25) == []
+
+    slower = {"fast": Measurement(700.0, 100, 100.0, 7.0)}
+    assert len(find_regressions(slower, BASELINE, max_slowdown=0.25)) == 1
+    assert find_regressions(slower, BASELINE, max_slowdown=0.5) == []
+
+    # Memory depends on the environment, so it is only checked on request
+    bigger = {"fast": Measurement(1000.0, 200, 200.0, 10.0)}
+    assert find_regressions(bigger, BASELINE) == []
+    assert len(find_regressions(bigger, BASELINE, check_memory=True)) == 2
+
+
+def test_find_regressions_compares_relative_speed():
+    """Test a slower machine passes and slower code on a faster machine fails."""
+    slower_machine = {"fast": Measurement(400.0, 100, 100.0, 10.0)}
+    assert find_regressions(slower_machine, BASELINE) == []
+
+    slower_code = {"fast": Measurement(2000.0, 100, 100.0, 5.0)}
+    assert len(find_regressions(slower_code, BASELINE)) == 1
+
+
+def test_find_regressions_allows_slack_and_new_benchmarks():
+    """Test tiny absolute growth and benchmarks without a baseline pass."""
+    results = {
+        "tiny": Measurement(1000.0, 10, 8.0, 10.0),
+        "new": Measurement(1.0, 10**6, 10.0**6, 0.001),
+    }
+    assert find_regressions(results, BASELINE, check_memory=True) == []
+
+
+def test_baseline_round_trip(tmp_path):
+    """Test baselines are merged with, not replaced by, partial runs."""
+    path = str(tmp_path / "baseline.json")
+    assert load_baseline(path) == {}
+
+    save_baseline(path, BASELINE)
+    save_baseline(path, {"tiny": Measurement(2000.0, 3, 1.0, 20.0)})
+
+    assert load_baseline(path) == {
+        "fast": BASELINE["fast"],
+        "tiny": Measurement(2000.0, 3, 1.0, 20.0),
+    }
+
+
+def test_measure_counts_allocations():
+    """Test a call's speed, retained allocations and peak memory are measured."""
+    result = measure(
+        Benchmark("lists", lambda: lambda: [[i] for i in range(1000)]),
+        min_round_seconds=0.001,
+        rounds=2,
+    )
+
+    assert result.ops_per_sec > 0
+    assert result.relative_speed > 0
+    # The outer list and its thousand inner lists are kept
+    assert result.allocations >= 1000
+    assert result.peak_kib > 1000 * 56 / 1024
+
+
+def test_matches_bracketed_names():
+    """Test bracketed names are matched literally, and globs still work."""
+    assert matches("scheduler.get_future_states[9]", "scheduler.get_future_states[9]")
+    assert not matches(
+        "scheduler.get_future_states[1000]", "scheduler.get_future_states[9]"
+    )
+    assert matches("scheduler.get_future_states[100]", "states[100]")
+    assert not matches("scheduler.get_future_states[1000]", "states[100]")
+    assert matches("scheduler.get_future_states[9]", "scheduler.*")
+    assert not matches("domain.project_battery_state", "scheduler.*")
+
+
+def test_every_benchmark_runs(clean_session_state):
+    """Test each benchmark in the suite can be set up and called."""
+    names = [benchmark.name for benchmark in BENCHMARKS]
+    assert len(set(names)) == len(names)
+
+    for benchmark in BENCHMARKS:
+        benchmark.setup()()
+
+
+def test_main_fails_on_regression(tmp_path, capsys, clean_session_state):
+    """Test the command line exits with an error when a benchmark regresses."""
+    path = str(tmp_path / "baseline.json")
+    # Timing is noisy on shared machines, so only a large slowdown fails
+    args = [
+        "domain.project_battery_state",
+        f"--baseline={path}",
+        "--rounds=1",
+        "--max-slowdown=0.9",
+    ]
+    main([*args, "--update"])
+    main(args)
+
+    save_baseline(
+        path,
+        {
+            "domain.project_battery_state": Measurement(
+                float("inf"), 0, 0.0, float("inf")
+            )
+        },
+    )
+    with pytest.raises(SystemExit):
+        main(args)
+    assert "domain.project_battery_state" in capsys.readouterr().err
@@ -0,0 +1,125 @@
+from datetime import date, time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.domain.models import ChargeSchedule
+from src.domain.schedule import index_schedule
+from src.simulate import (
+    PROFILES,
+    SimulationConfig,
+    charge_sessions,
+    generate_sessions,
+    main,
+    parse_args,
+    simulate_shard,
+)
+
+
+def _config(tmp_path, **changes) -> SimulationConfig:
+    settings = dict(
+        num_vehicles=25,
+        start_date=date(2025, 1, 6),
+        num_days=14,
+        profile=PROFILES["home"],
+        schedule=ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0)),
+        charge_rate_kw=7.0,
+        target_soc=0.8,
+        seed=1,
+        shard_size=10,
+        output_dir=str(tmp_path),
+        output_format="csv",
+    )
+    settings.update(changes)
+    return SimulationConfig(**settings)
+
+
+def test_generate_sessions_are_ordered_and_seeded(tmp_path):
+    """Test every car leaves before it next arrives, the same on every run."""
+    config = _config(tmp_path)
+    sessions = generate_sessions(config, 10, 5)
+
+    assert sessions["vehicle"].tolist() == np.repeat(np.arange(10, 15), 14).tolist()
+    arrivals = sessions["arrival"].reshape(5, 14)
+    departures = sessions["departure"].reshape(5, 14)
+    assert np.all(arrivals <= departures)
+    assert np.all(departures[:, :-1] <= arrivals[:, 1:])
+
+    again = generate_sessions(config, 10, 5)
+    for column, values in sessions.items():
+        assert np.array_equal(values, again[column])
+
+
+def test_charge_sessions_follow_the_schedule():
+    """Test charging is limited by the scheduled time plugged in and the target."""
+    sessions = {
+        "vehicle": np.arange(3),
+        "arrival": np.array(["2025-01-06T18:00"] * 3, dtype="datetime64[us]"),
+        "departure": np.array(
+            ["2025-01-07T07:00", "2025-01-07T03:00", "2025-01-06T23:00"],
+            dtype="datetime64[us]",
+        ),
+        "arrival_soc": np.array([0.2, 0.2, 0.2]),
+    }
+    schedule = ChargeSchedule(start_time=time(2, 0), end_time=time(5, 0))
+
+    charged = charge_sessions(sessions, index_schedule(schedule), 7.5, 0.8)
+
+    # 3 scheduled hours at 7.5 kW is 22.5 kWh, or 0.3 of the battery
+    assert charged["charging_hours"].tolist() == [3.0, 1.0, 0.0]
+    assert charged["energy_kwh"].tolist() == pytest.approx([22.5, 7.5, 0.0])
+    assert charged["departure_soc"].tolist() == pytest.approx([0.5, 0.3, 0.2])
+
+    # Charging on arrival stops at the target
+    immediate = charge_sessions(sessions, None, 7.5, 0.8)
+    assert immediate["departure_soc"].tolist() == pytest.approx([0.8, 0.8, 0.7])
+    assert immediate["charging_hours"].tolist() == pytest.approx([6.0, 6.0, 5.0])
+
+
+def test_simulate_shard_writes_sessions_and_totals(tmp_path):
+    """Test a shard writes its sessions and per-vehicle totals that agree."""
+    config = _config(tmp_path)
+    for table in ("sessions", "vehicles"):
+        (tmp_path / table).mkdir()
+
+    summary = simulate_shard(config, 2)
+
+    sessions = pd.read_csv(tmp_path / "sessions" / "part-00002.csv")
+    vehicles = pd.read_csv(tmp_path / "vehicles" / "part-00002.csv")
+    # The last shard holds the remaining 5 vehicles
+    assert summary["vehicles"] == 5
+    assert summary["sessions"] == len(sessions) == 5 * 14
+    assert vehicles["vehicle"].tolist() == list(range(20, 25))
+    assert vehicles["energy_kwh"].tolist() == pytest.approx(
+        sessions.groupby("vehicle")["energy_kwh"].sum().tolist()
+    )
+    assert summary["energy_kwh"] == pytest.approx(vehicles["energy_kwh"].sum())
+
+
+def test_main_runs_every_shard(tmp_path, capsys):
+    """Test the command line simulates every shard across worker processes."""
+    output = tmp_path / "out"
+    main(
+        [
+            "--vehicles=25",
+            "--days=3",
+            "--shard-size=10",
+            "--workers=2",
+            "--format=parquet",
+            f"--output={output}",
+        ]
+    )
+
+    parts = sorted(path.name for path in (output / "vehicles").iterdir())
+    assert parts == [f"part-0000{shard}.parquet" for shard in range(3)]
+    vehicles = pd.concat(pd.read_parquet(output / "vehicles" / part) for part in parts)
+    assert vehicles["vehicle"].tolist() == list(range(25))
+    assert "Simulated 25 vehicles, 75 sessions" in capsys.readouterr().err
+
+
+def test_parse_args_limits_the_period():
+    """Test simulations are limited to about a year."""
+    assert parse_args(["--days=365"]).days == 365
+    with pytest.raises(SystemExit):
+        parse_args(["--days=400"])
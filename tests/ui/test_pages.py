@@ -1,8 +1,14 @@
+from pathlib import Path
+
+import pytest
 import streamlit as st
+from streamlit.testing.v1 import AppTest
 
 from src.ui.pages import main_panel
 from src.services.state_manager import init_session_state
 
+APP_PATH = str(Path(__file__).parents[2] / "src" / "app.py")
+
 
 def test_init_session_state_in_pages():
     """Test that session state initialization works correctly for pages."""
@@ -24,3 +30,46 @@ def test_main_panel_existence():
     # This is a basic existence test, since properly testing the UI output
     # would require more complex Streamlit mocking
     assert callable(main_panel)
+
+
+@pytest.fixture
+def app_test():
+    """Run the app once in Streamlit's test harness."""
+    return AppTest.from_file(APP_PATH).run()
+
+
+def test_main_panel_renders(app_test):
+    """Test that the page renders the status, controls and chart."""
+    assert not app_test.exception
+    assert [button.label for button in app_test.button] == [
+        "Start Charging",
+        "Stop Charging",
+    ]
+    assert app_test.session_state["chart_figure"] is not None
+
+
+def test_forecast_chart_skips_rebuild_when_unchanged(app_test):
+    """Test that the chart figure is reused while its inputs are unchanged."""
+    figure = app_test.session_state["chart_figure"]
+
+    app_test.run()
+    assert app_test.session_state["chart_figure"] is figure
+
+    # Starting a charge changes the forecast, so the chart is rebuilt
+    app_test.button[0].click().run()
+    assert not app_test.exception
+    assert app_test.session_state["charger_state"].charge_is_override
+    assert app_test.session_state["chart_figure"] is not figure
+
+
+def test_controls_update_status_and_chart(app_test):
+    """Test that a control click reruns the nested status and chart fragments."""
+    figure = app_test.session_state["chart_figure"]
+
+    app_test.button[0].click().run()
+
+    assert not app_test.exception
+    assert "⚡ Charging: Override active" in [
+        markdown.value for markdown in app_test.markdown
+    ]
+    assert app_test.session_state["chart_figure"] is not figure
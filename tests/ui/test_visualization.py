@@ -1,12 +1,16 @@
 import pytest
 from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
 
-from src.domain.models import BatteryState, ChargerState, CombinedState
+from src.domain.models import BatteryState, ChargerState, CombinedState, ForecastFrame
 from src.ui.visualization import (
+    _convert_frame_to_dataframe,
+    _charging_bands,
     _convert_states_to_dataframe,
+    _downsample_indices,
     plot_charge_forecast,
 )
 
@@ -91,3 +95,142 @@ def test_plot_charge_forecast(sample_states):
 
     # Check Y-axis range is set to percentage scale
     assert list(fig.layout.yaxis.range) == [0, 100]
+
+
+def test_convert_frame_to_dataframe(sample_states):
+    """Test dataframe conversion straight from a columnar frame."""
+    df = _convert_frame_to_dataframe(ForecastFrame.from_states(sample_states))
+
+    assert len(df) == 5
+    assert df["Time"].tolist() == [state.time for state in sample_states]
+    assert df["Car is Charging"].tolist() == [True, True, True, False, False]
+    assert df["Charge is Override"].tolist() == [True, True, False, False, False]
+
+
+def test_plot_charge_forecast_from_frame(sample_states):
+    """Test that a frame and a list of states produce the same figure."""
+    current_time = datetime(2025, 1, 1, 12, 0)
+
+    from_frame = plot_charge_forecast(
+        ForecastFrame.from_states(sample_states), current_time
+    )
+    from_states = plot_charge_forecast(sample_states, current_time)
+
+    assert from_frame.to_json() == from_states.to_json()
+
+
+def test_charging_bands():
+    """Test run-length encoding of the charging masks."""
+    frame = ForecastFrame(
+        times=np.arange(8).astype("datetime64[h]").astype("datetime64[us]"),
+        soc=np.zeros(8),
+        is_charging=np.array([1, 1, 1, 0, 1, 1, 0, 1], dtype=bool),
+        is_override=np.array([1, 1, 0, 0, 0, 0, 0, 0], dtype=bool),
+    )
+
+    assert _charging_bands(frame) == [
+        (0, 2, True),
+        (2, 3, False),
+        (4, 6, False),
+        (7, 8, False),
+    ]
+    assert _charging_bands(ForecastFrame.from_states([])) == []
+
+
+def test_plot_charge_forecast_one_band_per_session():
+    """Test that a long charging session is drawn as a single band."""
+    base_time = datetime(2025, 1, 1, 0, 0)
+    frame = ForecastFrame(
+        times=np.array(
+            [base_time + i * PERIOD for i in range(500)], dtype="datetime64[us]"
+        ),
+        soc=np.linspace(0.2, 0.8, 500),
+        is_charging=np.arange(500) < 300,
+        is_override=np.zeros(500, dtype=bool),
+    )
+
+    fig = plot_charge_forecast(frame, base_time)
+
+    bands = [shape for shape in fig.layout.shapes if shape.type == "rect"]
+    assert len(bands) == 1
+    assert pd.Timestamp(bands[0].x1) == pd.Timestamp(base_time + 300 * PERIOD)
+    assert [a.text for a in fig.layout.annotations] == ["Now", "Scheduled"]
+
+
+@pytest.fixture
+def long_frame():
+    """Create a week-long forecast at minute resolution with nightly charging."""
+    num_points = 7 * 24 * 60
+    minutes = np.arange(num_points)
+    is_charging = (minutes % (24 * 60)) < 180  # Midnight to 3am
+    soc = np.minimum(0.2 + np.cumsum(is_charging) * 0.001, 0.8)
+    return ForecastFrame(
+        times=np.datetime64("2025-01-01T00:00", "us")
+        + minutes.astype("timedelta64[m]"),
+        soc=soc,
+        is_charging=is_charging,
+        is_override=np.zeros(num_points, dtype=bool),
+    )
+
+
+def test_downsample_indices_keeps_inflection_points(long_frame):
+    """Test that charge start, stop and target reached survive downsampling."""
+    indices = _downsample_indices(long_frame, 500)
+
+    assert len(indices) <= 500
+    assert indices[0] == 0
+    assert indices[-1] == len(long_frame) - 1
+
+    # Every charge start and stop
+    changes = np.flatnonzero(np.diff(long_frame.is_charging)) + 1
+    assert set(changes) <= set(indices)
+
+    # The moment the target is reached
+    target_reached = int(np.argmax(long_frame.soc >= 0.8))
+    assert target_reached in indices
+
+    # Short forecasts are left alone
+    assert _downsample_indices(long_frame, len(long_frame)).tolist() == list(
+        range(len(long_frame))
+    )
+
+
+def test_plot_charge_forecast_long_horizon_uses_webgl(long_frame):
+    """Test that long forecasts are bounded and drawn with WebGL."""
+    fig = plot_charge_forecast(long_frame, datetime(2025, 1, 1), max_points=500)
+
+    assert fig.data[0].type == "scattergl"
+    assert len(fig.data[0].x) <= 500
+    assert fig.data[0].mode == "lines"
+
+
+def test_plot_charge_forecast_short_horizon_keeps_every_point(sample_states):
+    """Test that short forecasts draw every period with markers."""
+    fig = plot_charge_forecast(sample_states, datetime(2025, 1, 1, 12, 0))
+
+    assert fig.data[0].type == "scatter"
+    assert len(fig.data[0].x) == len(sample_states)
+    assert fig.data[0].mode == "markers+lines"
+
+
+def test_plot_charge_forecast_bands_follow_frame_period(long_frame):
+    """Test that bands end one of the frame's own periods after the last one."""
+    fig = plot_charge_forecast(long_frame, datetime(2025, 1, 1))
+
+    bands = [shape for shape in fig.layout.shapes if shape.type == "rect"]
+    assert pd.Timestamp(bands[0].x1) == pd.Timestamp(datetime(2025, 1, 1, 3, 0))
+
+
+def test_plot_charge_forecast_draws_history(sample_states, long_frame):
+    """Test that recorded history is drawn as its own bounded line."""
+    fig = plot_charge_forecast(
+        sample_states, datetime(2025, 1, 1, 12, 0), max_points=500, history=long_frame
+    )
+
+    assert len(fig.data) == 2
+    assert fig.data[1].name == "History"
+    assert len(fig.data[1].x) <= 500
+    assert fig.data[1].y[-1] == pytest.approx(long_frame.soc[-1] * 100)
+
+    # Without history only the forecast is drawn
+    assert len(plot_charge_forecast(sample_states, datetime(2025, 1, 1)).data) == 1